@@ -4,18 +4,126 @@ Aralco POS Database Analysis Script
 Connects to SQL Server and analyzes the database schema for migration planning
 """
 
-import pyodbc
 import pandas as pd
+import argparse
+import csv
+import functools
 import json
-from datetime import datetime
+import queue
+import shutil
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import date, datetime
+from decimal import Decimal
 import os
 
+from dimension_cache import DIMENSION_CACHE_FILE, refresh_dimensions
+from instrumentation import PROFILERS, Instrumentation
+
+try:
+    import pyodbc
+except ImportError:  # Only needed to connect; the table layout is importable without it
+    pyodbc = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet staging is optional
+    pa = None
+    pq = None
+
 # Database connection parameters
 SERVER = 'localhost,1433'
 DATABASE = 'AralcoPOS'
 USERNAME = 'sa'
 PASSWORD = 'YourStrong@Password123'
 
+# Full-table extraction settings
+EXTRACT_DIR = 'exports/extract'
+DEFAULT_CHUNK_SIZE = 5000
+DEFAULT_WORKERS = 4
+STAGING_FORMATS = ['csv', 'parquet']
+
+# Delta extraction: per-table watermarks of the last successful run, and
+# where each run's delta files go (one timestamped directory per run)
+WATERMARK_FILE = 'exports/extract/watermarks.json'
+DELTA_DIR = 'exports/extract/delta'
+
+# Tables large enough to be split into key-range partitions that are
+# extracted in parallel (by the first key column)
+DEFAULT_SPLIT_TABLES = ['POSTransItem']
+
+# Tables pulled in full by the extraction mode. Each table is paged by its
+# keyset (an indexed, unique ordering) so every round-trip is a short
+# "WHERE key > last ORDER BY key" seek instead of an ever-growing OFFSET.
+# POSTransItem is keyed by header first so line items come out grouped by
+# their transaction. 'watermark' is the date column used by --delta to find
+# new and changed rows (a rowversion column is preferred when the table has
+# one): the last-update column where the table has one, so edits are picked
+# up. POSTransItem has none and follows its headers by POSTransHeadID.
+# 'snapshot' tables (per-store stock, where quantities change in place and
+# rows disappear) are extracted whole by --delta too; the transform diffs
+# them against the previous snapshot instead. 'lookups' are columns resolved
+# from another table at extraction and written after 'columns':
+# {staging column: (table, key column, value column, this table's column)}.
+EXTRACT_TABLES = {
+    'Customer': {
+        'key': ['CustomerID'],
+        'columns': [
+            'CustomerID', 'POSCustomerID', 'CustomerNo', 'FirstName', 'LastName', 'CompanyName',
+            'Email', 'Phone', 'Fax', 'Cellular', 'Address1', 'City',
+            'ProvinceState', 'PostalCode', 'Country', 'CreditLimit',
+            'AccountBalance', 'Points', 'LastPurchase', 'Remark', 'CreatedDate', 'LastUpdated'
+        ],
+        'watermark': 'LastUpdated'
+    },
+    'Product': {
+        'key': ['ProductID'],
+        'columns': [
+            'ProductID', 'Code', 'Description', 'ShortDescription', 'Category1',
+            'Category2', 'Category3', 'Department', 'Supplier', 'Brand', 'UPC',
+            'Weight', 'Cost', 'SellPrice', 'OnHand', 'Status', 'CreatedDate', 'LastUpdate'
+        ],
+        'watermark': 'LastUpdate'
+    },
+    'POSTransHead': {
+        'key': ['POSTransHeadID'],
+        'columns': [
+            'POSTransHeadID', 'TransNo', 'TransDate', 'CustomerID', 'StoreID',
+            'RegisterID', 'EmployeeID', 'SubTotal', 'DiscountAmount', 'Tax1',
+            'Tax2', 'Total', 'TransType', 'Status', 'CreatedDate'
+        ],
+        # Transactions carry the POS customer code; the Account is keyed by CustomerID
+        'lookups': {'AccountCustomerID': ('Customer', 'POSCustomerID', 'CustomerID', 'CustomerID')},
+        'watermark': 'TransDate'
+    },
+    'POSTransItem': {
+        'key': ['POSTransHeadID', 'POSTransItemID'],
+        'columns': [
+            'POSTransItemID', 'POSTransHeadID', 'ProductID', 'LineNo',
+            'Quantity', 'SellPrice', 'Cost', 'DiscountAmount', 'Tax1', 'Tax2',
+            'Description', 'IsReturn'
+        ],
+        'watermark': None
+    },
+    'Inventory': {
+        'key': ['ProductID', 'StoreID'],
+        'columns': [
+            'ProductID', 'StoreID', 'OnHand', 'Available', 'OnOrder', 'MinQty',
+            'MaxQty', 'LastReceived', 'LastSold'
+        ],
+        'watermark': None,
+        'snapshot': True
+    }
+}
+
+# Stage timings of the current run, written as instrumentation.json next to
+# the analysis or extraction output
+INSTRUMENTATION = Instrumentation()
+
 # Create exports directory if it doesn't exist
 os.makedirs('exports/analysis', exist_ok=True)
 
@@ -38,6 +146,65 @@ def get_connection():
             print(f"❌ Failed with alternative driver: {e2}")
             return None
 
+def connect_sqlite(path):
+    """Open a local SQLite stand-in for AralcoPOS (see generate_synthetic_data.py --sqlite)"""
+    if not os.path.exists(path):
+        print(f"❌ SQLite database {path} does not exist")
+        return None
+    # Pooled connections are handed from thread to thread, one at a time
+    conn = sqlite3.connect(path, check_same_thread=False)
+    print(f"✅ Connected to SQLite stand-in {path}")
+    return conn
+
+def is_sqlite(conn):
+    """True for a SQLite stand-in connection, which pages with LIMIT instead of TOP"""
+    return isinstance(conn, sqlite3.Connection)
+
+class ConnectionPool:
+    """Thread-safe pool of database connections.
+
+    Connections are opened lazily up to ``size`` and handed out one per
+    worker; pyodbc connections must not be shared between threads.
+    """
+
+    def __init__(self, size=DEFAULT_WORKERS, connect=None):
+        self.size = size
+        self._connect = connect or get_connection
+        self._idle = queue.LifoQueue()
+        self._all = []
+        self._lock = threading.Lock()
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if len(self._all) < self.size:
+                conn = self._connect()
+                if conn is None:
+                    raise ConnectionError(f"Could not open a connection to {DATABASE}")
+                self._all.append(conn)
+                return conn
+        return self._idle.get()
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for the duration of a ``with`` block"""
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+    def close_all(self):
+        """Close every connection opened by the pool"""
+        with self._lock:
+            for conn in self._all:
+                conn.close()
+            self._all = []
+        self._idle = queue.LifoQueue()
+
 def analyze_customer_tables(conn):
     """Analyze customer-related tables"""
     print("\n📊 Analyzing Customer Tables...")
@@ -70,22 +237,6 @@ def analyze_customer_tables(conn):
         df.to_csv('exports/analysis/customer_sample.csv', index=False)
         print(f"✅ Exported {len(df)} customer samples")
         
-        # Get customer statistics
-        stats_query = """
-        SELECT 
-            COUNT(*) as TotalCustomers,
-            COUNT(DISTINCT Email) as UniqueEmails,
-            COUNT(CASE WHEN Email IS NOT NULL AND Email != '' THEN 1 END) as CustomersWithEmail,
-            COUNT(CASE WHEN CompanyName IS NOT NULL AND CompanyName != '' THEN 1 END) as BusinessAccounts,
-            COUNT(CASE WHEN FirstName IS NOT NULL AND FirstName != '' THEN 1 END) as PersonAccounts,
-            AVG(CAST(AccountBalance as FLOAT)) as AvgAccountBalance,
-            AVG(CAST(Points as FLOAT)) as AvgPoints
-        FROM Customer
-        """
-        stats = pd.read_sql(stats_query, conn)
-        stats.to_csv('exports/analysis/customer_stats.csv', index=False)
-        print("✅ Customer statistics exported")
-        
     except Exception as e:
         print(f"❌ Error analyzing customers: {e}")
 
@@ -118,30 +269,18 @@ def analyze_product_tables(conn):
         df.to_csv('exports/analysis/product_sample.csv', index=False)
         print(f"✅ Exported {len(df)} product samples")
         
-        # Get product statistics
-        stats_query = """
-        SELECT 
-            COUNT(*) as TotalProducts,
-            COUNT(DISTINCT Category1) as UniqueCategory1,
-            COUNT(DISTINCT Category2) as UniqueCategory2,
-            COUNT(DISTINCT Department) as UniqueDepartments,
-            COUNT(DISTINCT Supplier) as UniqueSuppliers,
-            AVG(CAST(Cost as FLOAT)) as AvgCost,
-            AVG(CAST(SellPrice as FLOAT)) as AvgSellPrice,
-            SUM(CAST(OnHand as FLOAT)) as TotalInventory
-        FROM Product
-        WHERE Status = 'A'
-        """
-        stats = pd.read_sql(stats_query, conn)
-        stats.to_csv('exports/analysis/product_stats.csv', index=False)
-        print("✅ Product statistics exported")
-        
     except Exception as e:
         print(f"❌ Error analyzing products: {e}")
 
-def analyze_transaction_tables(conn):
-    """Analyze transaction-related tables"""
+def analyze_transaction_tables(conn, as_of=None):
+    """Analyze transaction-related tables.
+
+    The six-month sample window ends at ``as_of`` (default: today) rather
+    than at the server's GETDATE(), so a rerun with the same date samples
+    the same transactions.
+    """
     print("\n💰 Analyzing Transaction Tables...")
+    as_of = as_of or date.today()
     
     trans_query = """
     SELECT TOP 100
@@ -158,33 +297,15 @@ def analyze_transaction_tables(conn):
         h.TransType,
         h.Status
     FROM POSTransHead h
-    WHERE h.TransDate >= DATEADD(month, -6, GETDATE())
-    ORDER BY h.TransDate DESC
+    WHERE h.TransDate >= DATEADD(month, -6, ?)
+    ORDER BY h.TransDate DESC, h.POSTransHeadID DESC
     """
     
     try:
-        df = pd.read_sql(trans_query, conn)
+        df = pd.read_sql(trans_query, conn, params=[as_of])
         df.to_csv('exports/analysis/transaction_sample.csv', index=False)
         print(f"✅ Exported {len(df)} transaction samples")
         
-        # Get transaction statistics
-        stats_query = """
-        SELECT 
-            COUNT(*) as TotalTransactions,
-            COUNT(DISTINCT CustomerID) as UniqueCustomers,
-            COUNT(DISTINCT StoreID) as UniqueStores,
-            COUNT(DISTINCT CAST(TransDate as DATE)) as TransactionDays,
-            MIN(TransDate) as EarliestTransaction,
-            MAX(TransDate) as LatestTransaction,
-            AVG(CAST(Total as FLOAT)) as AvgTransactionValue,
-            SUM(CAST(Total as FLOAT)) as TotalRevenue
-        FROM POSTransHead
-        WHERE Status = 'C'
-        """
-        stats = pd.read_sql(stats_query, conn)
-        stats.to_csv('exports/analysis/transaction_stats.csv', index=False)
-        print("✅ Transaction statistics exported")
-        
     except Exception as e:
         print(f"❌ Error analyzing transactions: {e}")
 
@@ -251,27 +372,548 @@ def generate_summary_report(conn):
     except Exception as e:
         print(f"❌ Error generating summary: {e}")
 
+def _keyset_predicate(keys):
+    """Build the "after this key" predicate for a (possibly composite) keyset.
+
+    For keys (a, b) this yields ``(a > ?) OR (a = ? AND b > ?)`` together with
+    a function mapping the last-seen key values to the matching parameters.
+    """
+    clauses = []
+    for i, key in enumerate(keys):
+        terms = [f"[{k}] = ?" for k in keys[:i]] + [f"[{key}] > ?"]
+        clauses.append("(" + " AND ".join(terms) + ")")
+
+    def params(last):
+        values = []
+        for i in range(len(keys)):
+            values.extend(last[:i + 1])
+        return values
+
+    return " OR ".join(clauses), params
+
+def staging_columns(table):
+    """Columns of a table's staging file: its own, then its resolved lookups"""
+    spec = EXTRACT_TABLES[table]
+    return spec['columns'] + list(spec.get('lookups', {}))
+
+def _source(table):
+    """FROM clause of a table, with its lookups resolved alongside its own columns.
+
+    A correlated subquery (rather than a LEFT JOIN) resolves each lookup,
+    so a code shared by two rows of the other table cannot duplicate rows.
+    The derived table keeps the table's name, so the unqualified key,
+    range and delta predicates apply to it unchanged.
+    """
+    lookups = EXTRACT_TABLES[table].get('lookups')
+    if not lookups:
+        return f"[{table}]"
+    resolved = ", ".join(
+        f"(SELECT MIN([{other}].[{value}]) FROM [{other}] WHERE [{other}].[{key}] = [{table}].[{column}]) AS [{name}]"
+        for name, (other, key, value, column) in lookups.items())
+    return f"(SELECT [{table}].*, {resolved} FROM [{table}]) AS [{table}]"
+
+def stream_table(conn, table, chunk_size=DEFAULT_CHUNK_SIZE, key_range=None, row_filter=None):
+    """Yield a table as lists of rows, one keyset page per list.
+
+    Only one page is ever held in memory, so peak memory depends on
+    ``chunk_size`` rather than on the size of the table. ``key_range`` is an
+    optional ``(low, high)`` half-open range on the first key column and
+    ``row_filter`` an optional ``(sql, params)`` predicate (see
+    ``delta_filter``).
+    """
+    spec = EXTRACT_TABLES[table]
+    keys = spec['key']
+    columns = staging_columns(table)
+    key_positions = [columns.index(k) for k in keys]
+    select_list = ", ".join(f"[{c}]" for c in columns)
+    source = _source(table)
+    order_by = ", ".join(f"[{k}]" for k in keys)
+    predicate, predicate_params = _keyset_predicate(keys)
+
+    range_filter = []
+    range_params = []
+    if key_range is not None:
+        range_filter = [f"[{keys[0]}] >= ? AND [{keys[0]}] < ?"]
+        range_params = list(key_range)
+    if row_filter is not None:
+        range_filter.append(f"({row_filter[0]})")
+        range_params.extend(row_filter[1])
+
+    def page_query(filters):
+        where = f" WHERE {' AND '.join(filters)}" if filters else ""
+        if is_sqlite(conn):
+            return f"SELECT {select_list} FROM {source}{where} ORDER BY {order_by} LIMIT {int(chunk_size)}"
+        return f"SELECT TOP ({int(chunk_size)}) {select_list} FROM {source}{where} ORDER BY {order_by}"
+
+    first_page = page_query(range_filter)
+    next_page = page_query(range_filter + [f"({predicate})"])
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute(first_page, range_params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows
+            if len(rows) < chunk_size:
+                break
+            last = [rows[-1][p] for p in key_positions]
+            cursor.execute(next_page, range_params + predicate_params(last))
+    finally:
+        cursor.close()
+
+def partition_ranges(conn, table, partitions):
+    """Split a table into ``partitions`` equal-width ranges of its first key column"""
+    key = EXTRACT_TABLES[table]['key'][0]
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"SELECT MIN([{key}]), MAX([{key}]) FROM [{table}]")
+        low, high = cursor.fetchone()
+    finally:
+        cursor.close()
+
+    if low is None:
+        return [None]
+    low, high = int(low), int(high) + 1
+    width = max(1, -(-(high - low) // partitions))
+    return [(start, min(start + width, high)) for start in range(low, high, width)]
+
+def table_schema(conn, table):
+    """Return the Arrow schema of an extraction table from its cursor description"""
+    columns = staging_columns(table)
+    select_list = ", ".join(f"[{c}]" for c in columns)
+    cursor = conn.cursor()
+    try:
+        if is_sqlite(conn):
+            cursor.execute(f"SELECT {select_list} FROM {_source(table)} LIMIT 0")
+        else:
+            cursor.execute(f"SELECT TOP (0) {select_list} FROM {_source(table)}")
+        description = cursor.description
+        cursor.fetchall()
+    finally:
+        cursor.close()
+
+    fields = []
+    for name, type_code, _, _, precision, scale, _ in description:
+        if type_code is bool:
+            arrow_type = pa.bool_()
+        elif type_code is int:
+            arrow_type = pa.int64()
+        elif type_code is float:
+            arrow_type = pa.float64()
+        elif type_code is Decimal and precision and precision <= 38:
+            arrow_type = pa.decimal128(precision, scale or 0)
+        elif type_code is datetime:
+            arrow_type = pa.timestamp('us')
+        elif type_code is date:
+            arrow_type = pa.date32()
+        elif type_code is bytes or type_code is bytearray:
+            arrow_type = pa.binary()
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(name, arrow_type))
+    return pa.schema(fields)
+
+class CsvStagingWriter:
+    """Writes extracted rows as headerless CSV"""
+
+    def __init__(self, path, table, schema=None):
+        self._file = open(path, 'w', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._file)
+
+    def write_rows(self, rows):
+        self._writer.writerows(rows)
+
+    def close(self):
+        self._file.close()
+
+class ParquetStagingWriter:
+    """Writes extracted rows as one typed Parquet row group per chunk"""
+
+    def __init__(self, path, table, schema):
+        self._schema = schema
+        self._writer = pq.ParquetWriter(path, schema, compression='snappy')
+
+    def write_rows(self, rows):
+        columns = list(zip(*rows))
+        arrays = []
+        for field, values in zip(self._schema, columns):
+            if pa.types.is_string(field.type):
+                values = [None if v is None else str(v) for v in values]
+            arrays.append(pa.array(values, type=field.type))
+        self._writer.write_table(pa.Table.from_arrays(arrays, schema=self._schema))
+
+    def close(self):
+        self._writer.close()
+
+STAGING_WRITERS = {
+    'csv': CsvStagingWriter,
+    'parquet': ParquetStagingWriter
+}
+
+def _extract_partition(pool, table, chunk_size, key_range, part_file, fmt='csv', schema=None,
+                       row_filter=None):
+    """Stream one key range of a table to a part file"""
+    started = time.perf_counter()
+    row_count = 0
+    writer = STAGING_WRITERS[fmt](part_file, table, schema)
+    with INSTRUMENTATION.stage(f"extract:{table}", partition=os.path.basename(part_file)) as record:
+        try:
+            with pool.connection() as conn:
+                for rows in stream_table(conn, table, chunk_size, key_range, row_filter):
+                    writer.write_rows(rows)
+                    row_count += len(rows)
+        finally:
+            writer.close()
+            record['rows'] = row_count
+    return {'rows': row_count, 'started': started, 'finished': time.perf_counter()}
+
+def _assemble_table(table, part_files, output_file, fmt='csv', schema=None):
+    """Concatenate part files, in key order, into the final staging file"""
+    if fmt == 'parquet':
+        writer = pq.ParquetWriter(output_file, schema, compression='snappy')
+        try:
+            for part_file in part_files:
+                part = pq.ParquetFile(part_file)
+                for i in range(part.num_row_groups):
+                    writer.write_table(part.read_row_group(i))
+                part.close()
+                os.remove(part_file)
+        finally:
+            writer.close()
+        return
+
+    with open(output_file, 'w', newline='', encoding='utf-8') as out:
+        csv.writer(out).writerow(staging_columns(table))
+        for part_file in part_files:
+            with open(part_file, 'r', newline='', encoding='utf-8') as part:
+                shutil.copyfileobj(part, out, 1024 * 1024)
+            os.remove(part_file)
+
+def extract_full_tables(pool, chunk_size=DEFAULT_CHUNK_SIZE, output_dir=EXTRACT_DIR,
+                        workers=DEFAULT_WORKERS, split_tables=DEFAULT_SPLIT_TABLES, fmt='csv',
+                        row_filters=None):
+    """Extract every table in EXTRACT_TABLES in keyset-paged chunks.
+
+    Tables are extracted concurrently on ``workers`` threads, each with its
+    own pooled connection. Tables listed in ``split_tables`` are further
+    divided into key-range partitions so a single large table is not
+    bound to one connection. ``fmt='parquet'`` writes typed Parquet staging
+    files (one row group per chunk) instead of CSV. ``row_filters`` maps
+    tables to a ``(sql, params)`` predicate limiting the rows extracted.
+    """
+    row_filters = row_filters or {}
+    if fmt == 'parquet' and pq is None:
+        print("⚠️  pyarrow is not installed, falling back to CSV staging")
+        fmt = 'csv'
+
+    print(f"\n📤 Extracting full tables (chunk size {chunk_size}, {workers} workers, {fmt})...")
+    os.makedirs(output_dir, exist_ok=True)
+
+    summary = {
+        "extraction_date": datetime.now().isoformat(),
+        "database": DATABASE,
+        "chunk_size": chunk_size,
+        "workers": workers,
+        "format": fmt,
+        "tables": {}
+    }
+
+    # Plan all work units up front so no task ever waits on another task
+    plan = {}
+    schemas = {}
+    for table in EXTRACT_TABLES:
+        with pool.connection() as conn:
+            if fmt == 'parquet':
+                schemas[table] = table_schema(conn, table)
+            if table in split_tables and workers > 1:
+                plan[table] = partition_ranges(conn, table, workers)
+            else:
+                plan[table] = [None]
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {}
+        for table, ranges in plan.items():
+            futures[table] = [
+                executor.submit(_extract_partition, pool, table, chunk_size, key_range,
+                                os.path.join(output_dir, f"{table}.part{i:03d}.{fmt}"),
+                                fmt, schemas.get(table), row_filters.get(table))
+                for i, key_range in enumerate(ranges)
+            ]
+
+        for table, table_futures in futures.items():
+            part_files = [os.path.join(output_dir, f"{table}.part{i:03d}.{fmt}")
+                          for i in range(len(table_futures))]
+            try:
+                results = [future.result() for future in table_futures]
+                output_file = os.path.join(output_dir, f"{table}.{fmt}")
+                _assemble_table(table, part_files, output_file, fmt, schemas.get(table))
+            except Exception as e:
+                print(f"❌ Error extracting {table}: {e}")
+                summary["tables"][table] = {"error": str(e)}
+                continue
+
+            row_count = sum(r['rows'] for r in results)
+            elapsed = max(r['finished'] for r in results) - min(r['started'] for r in results)
+            rows_per_sec = row_count / elapsed if elapsed > 0 else 0.0
+            print(f"✅ Extracted {row_count} {table} rows in {elapsed:.1f}s "
+                  f"({rows_per_sec:,.0f} rows/sec, {len(results)} partition(s))")
+            summary["tables"][table] = {
+                'file': output_file,
+                'rows': row_count,
+                'bytes': os.path.getsize(output_file),
+                'partitions': len(results),
+                'seconds': round(elapsed, 3),
+                'rows_per_sec': round(rows_per_sec, 1)
+            }
+
+    with open(os.path.join(output_dir, 'extract_summary.json'), 'w') as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+def _rowversion_column(conn, table):
+    """Name of the table's rowversion column, or None"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+        SELECT c.name
+        FROM sys.columns c
+        JOIN sys.types t ON c.user_type_id = t.user_type_id
+        WHERE c.object_id = OBJECT_ID(?) AND t.name IN ('timestamp', 'rowversion')
+        """, [table])
+        row = cursor.fetchone()
+        return row[0] if row else None
+    except Exception:
+        return None  # No catalog views (not SQL Server); fall back to dates
+    finally:
+        cursor.close()
+
+def current_watermark(conn, table):
+    """Read the high watermark a delta run extracts up to.
+
+    Uses the table's rowversion column when it has one, otherwise the max
+    of its 'watermark' date column and of its first key column.
+    """
+    spec = EXTRACT_TABLES[table]
+    key = spec['key'][0]
+    rowversion = _rowversion_column(conn, table)
+    cursor = conn.cursor()
+    try:
+        if rowversion:
+            cursor.execute(f"SELECT MAX([{rowversion}]) FROM [{table}]")
+            value = cursor.fetchone()[0]
+            return {'rowversion_column': rowversion,
+                    'rowversion': value.hex() if value is not None else None}
+
+        if spec['watermark']:
+            cursor.execute(f"SELECT MAX([{spec['watermark']}]), MAX([{key}]) FROM [{table}]")
+            max_date, max_key = cursor.fetchone()
+        else:
+            cursor.execute(f"SELECT MAX([{key}]) FROM [{table}]")
+            max_date, max_key = None, cursor.fetchone()[0]
+        if isinstance(max_date, (date, datetime)):
+            max_date = max_date.isoformat()
+        return {'date_column': spec['watermark'], 'date': max_date,
+                'key_column': key, 'key': max_key}
+    finally:
+        cursor.close()
+
+def _watermark_date(value):
+    """Turn a stored watermark date back into a query parameter"""
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return value
+
+def delta_filter(since, until):
+    """Build the ``(sql, params)`` predicate for rows in (since, until].
+
+    ``since`` is the watermark saved by the last successful run, or None
+    for a first run (everything up to ``until``). Bounding the top end by
+    the watermark read at the start of the run keeps reruns reproducible
+    and hands rows arriving mid-run to the next delta.
+    """
+    if 'rowversion_column' in until:
+        column = f"[{until['rowversion_column']}]"
+        high = bytes.fromhex(until['rowversion']) if until['rowversion'] else b''
+        if since and since.get('rowversion'):
+            return f"{column} > ? AND {column} <= ?", [bytes.fromhex(since['rowversion']), high]
+        return f"{column} <= ?", [high]
+
+    key = f"[{until['key_column']}]"
+    if until['date_column'] is None:
+        if since and since.get('key') is not None:
+            return f"{key} > ? AND {key} <= ?", [since['key'], until['key']]
+        return f"{key} <= ?", [until['key']]
+
+    column = f"[{until['date_column']}]"
+    upper = f"{key} <= ? AND ({column} <= ? OR {column} IS NULL)"
+    upper_params = [until['key'], _watermark_date(until['date'])]
+    if since and since.get('key') is not None:
+        # New rows by key, changed rows by date
+        lower = f"({key} > ? OR {column} > ?)"
+        return f"{lower} AND {upper}", [since['key'], _watermark_date(since['date'])] + upper_params
+    return upper, upper_params
+
+def load_watermarks(watermark_file=WATERMARK_FILE):
+    """Load the per-table watermarks of the last successful delta run"""
+    if not os.path.exists(watermark_file):
+        return {}
+    with open(watermark_file) as f:
+        return json.load(f)
+
+def save_watermarks(watermarks, watermark_file=WATERMARK_FILE):
+    """Write watermarks atomically so a crash never leaves a partial file"""
+    os.makedirs(os.path.dirname(watermark_file) or '.', exist_ok=True)
+    temp_file = f"{watermark_file}.tmp"
+    with open(temp_file, 'w') as f:
+        json.dump(watermarks, f, indent=2)
+    os.replace(temp_file, watermark_file)
+
+def extract_delta(pool, chunk_size=DEFAULT_CHUNK_SIZE, workers=DEFAULT_WORKERS,
+                  split_tables=DEFAULT_SPLIT_TABLES, fmt='csv', watermark_file=WATERMARK_FILE,
+                  delta_dir=DELTA_DIR):
+    """Extract only rows new or changed since the last successful run.
+
+    Each run writes complete staging files (same layout as --extract) to
+    its own timestamped directory under ``delta_dir``, so the transformer
+    can process a delta on its own with --input-dir. A table's watermark
+    only advances when its extraction succeeded.
+    """
+    watermarks = load_watermarks(watermark_file)
+    run_id = datetime.now().strftime('%Y%m%dT%H%M%S')
+    output_dir = os.path.join(delta_dir, run_id)
+
+    bounds = {}
+    row_filters = {}
+    for table in EXTRACT_TABLES:
+        with pool.connection() as conn:
+            bounds[table] = current_watermark(conn, table)
+        since = watermarks.get(table)
+        if EXTRACT_TABLES[table].get('snapshot'):
+            print(f"🔄 {table} is a snapshot table, extracting it in full")
+            continue
+        if since is None:
+            print(f"⚠️  No watermark for {table}, extracting it in full")
+        elif {k for k in since if k.endswith('_column')} != {k for k in bounds[table] if k.endswith('_column')}:
+            print(f"⚠️  Watermark columns of {table} changed, extracting it in full")
+            since = None
+        row_filters[table] = delta_filter(since, bounds[table])
+
+    summary = extract_full_tables(pool, chunk_size, output_dir, workers, split_tables, fmt, row_filters)
+
+    for table, result in summary['tables'].items():
+        if 'error' not in result:
+            watermarks[table] = dict(bounds[table], run=run_id)
+    save_watermarks(watermarks, watermark_file)
+
+    summary['watermarks'] = {table: watermarks.get(table) for table in EXTRACT_TABLES}
+    with open(os.path.join(output_dir, 'extract_summary.json'), 'w') as f:
+        json.dump(summary, f, indent=2, default=str)
+    return output_dir
+
+def _run_with_connection(pool, name, analysis):
+    """Run one analyze_* step on a pooled connection"""
+    with INSTRUMENTATION.stage(name):
+        with pool.connection() as conn:
+            analysis(conn)
+
+def profile_tables(conn, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Profile every column of the extracted tables in one keyset scan per table.
+
+    Replaces the per-entity statistics queries, which each scanned a table
+    for a few fixed metrics (see profile_data.py).
+    """
+    # Imported here: profile_data imports this module
+    from profile_data import profile_database, write_profile
+    print("\n🔍 Profiling table columns...")
+    try:
+        write_profile(profile_database(conn, chunk_size), DATABASE)
+    except Exception as e:
+        print(f"❌ Error profiling tables: {e}")
+
+def run_analysis(pool, workers=DEFAULT_WORKERS, as_of=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Run the independent analysis steps concurrently"""
+    analyses = {
+        'analyze_customer_tables': analyze_customer_tables,
+        'analyze_product_tables': analyze_product_tables,
+        'analyze_transaction_tables': lambda conn: analyze_transaction_tables(conn, as_of),
+        'analyze_relationships': analyze_relationships,
+        'profile_tables': lambda conn: profile_tables(conn, chunk_size),
+        'generate_summary_report': generate_summary_report
+    }
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_run_with_connection, pool, name, analysis)
+                   for name, analysis in analyses.items()]
+        for future in futures:
+            future.result()
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Analyze and extract the Aralco POS database")
+    parser.add_argument('--extract', action='store_true',
+                        help=f"stream full Customer, Product and transaction tables to {EXTRACT_DIR}/ "
+                             f"and refresh the dimension cache ({DIMENSION_CACHE_FILE})")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="rows fetched per keyset page (extraction and column profiling)")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help="concurrent database connections / worker threads")
+    parser.add_argument('--split-table', action='append', dest='split_tables',
+                        choices=list(EXTRACT_TABLES),
+                        help="table to extract as parallel key-range partitions "
+                             f"(repeatable, default: {', '.join(DEFAULT_SPLIT_TABLES)})")
+    parser.add_argument('--format', choices=STAGING_FORMATS, default='csv',
+                        help="staging file format for --extract (parquet needs pyarrow)")
+    parser.add_argument('--delta', action='store_true',
+                        help=f"extract only rows new or changed since the last run (watermarks in {WATERMARK_FILE})")
+    parser.add_argument('--as-of', type=date.fromisoformat,
+                        help="end date (YYYY-MM-DD) of the six-month transaction sample window (default: today)")
+    parser.add_argument('--sqlite', metavar='PATH',
+                        help="extract from a local SQLite stand-in instead of SQL Server (--extract only)")
+    parser.add_argument('--profile', choices=PROFILERS,
+                        help="profile the run with cProfile or pyinstrument into exports/analysis/profile.*")
+    return parser.parse_args()
+
 def main():
     """Main analysis function"""
+    args = parse_args()
+    workers = max(1, args.workers)
     print("🚀 Starting Aralco POS Database Analysis...")
     
-    conn = get_connection()
-    if not conn:
+    pool = ConnectionPool(workers, functools.partial(connect_sqlite, args.sqlite) if args.sqlite else None)
+    try:
+        with pool.connection():
+            pass
+    except ConnectionError:
         print("❌ Cannot proceed without database connection")
         return
     
+    output_dir = 'exports/analysis'
     try:
-        analyze_customer_tables(conn)
-        analyze_product_tables(conn)
-        analyze_transaction_tables(conn)
-        analyze_relationships(conn)
-        generate_summary_report(conn)
-        
-        print("\n✅ Analysis complete! Check exports/analysis/ directory for results.")
+        with INSTRUMENTATION.profile(args.profile, os.path.join(output_dir, 'profile')):
+            if args.delta:
+                output_dir = extract_delta(pool, args.chunk_size, workers,
+                                           args.split_tables or DEFAULT_SPLIT_TABLES, args.format)
+                with pool.connection() as conn:
+                    refresh_dimensions(conn)
+                print(f"\n✅ Delta extraction complete! Check {output_dir}/ directory for results.")
+            elif args.extract:
+                output_dir = EXTRACT_DIR
+                extract_full_tables(pool, args.chunk_size, workers=workers,
+                                    split_tables=args.split_tables or DEFAULT_SPLIT_TABLES,
+                                    fmt=args.format)
+                with pool.connection() as conn:
+                    refresh_dimensions(conn)
+                print(f"\n✅ Extraction complete! Check {EXTRACT_DIR}/ directory for results.")
+            else:
+                run_analysis(pool, workers, args.as_of, max(1, args.chunk_size))
+                print("\n✅ Analysis complete! Check exports/analysis/ directory for results.")
         
     finally:
-        conn.close()
-        print("🔒 Database connection closed")
+        pool.close_all()
+        print("🔒 Database connections closed")
+        INSTRUMENTATION.write(os.path.join(output_dir, 'instrumentation.json'))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Aralco Transformation Benchmark
+Times DataTransformer end to end and per normalizer on synthetic data, tracking regressions across commits
+"""
+
+import argparse
+import contextlib
+import csv
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+
+from generate_synthetic_data import BASE_COUNTS, DEFAULT_SEED, SYNTHETIC_DIR, generate
+from transform_data import NORMALIZER_CACHE_SIZE, DataTransformer, pd
+
+# Results of every run, one JSON object per line
+HISTORY_FILE = 'benchmarks/history.jsonl'
+
+# End-to-end cases; each runs in a fresh process so peak RSS is its own
+CASES = ['accounts', 'accounts_batch', 'products', 'products_batch', 'orders', 'inventory']
+
+# Normalizer micro-benchmarks: normalizer -> (staging table, columns feeding it)
+NORMALIZER_INPUTS = {
+    'clean_phone': ('Customer', ['Phone', 'Fax', 'Cellular']),
+    'clean_email': ('Customer', ['Email']),
+    'clean_currency': ('Product', ['Cost', 'SellPrice']),
+    'transform_date': ('POSTransHead', ['TransDate']),
+    'transform_datetime': ('Customer', ['CreatedDate'])
+}
+
+DEFAULT_REPEAT = 3
+
+# A run regresses when throughput drops or peak memory grows by more than this
+THROUGHPUT_TOLERANCE = 0.10
+MEMORY_TOLERANCE = 0.20
+
+def _run_case(task):
+    """Worker: run one end-to-end case and return its instrumentation stage"""
+    case, input_dir, cache_size = task
+    transformer = DataTransformer(cache_size)
+    batch = case.endswith('_batch')
+    with tempfile.TemporaryDirectory() as output_dir, contextlib.redirect_stdout(io.StringIO()):
+        def out(name):
+            return os.path.join(output_dir, name)
+        if case.startswith('accounts'):
+            transformer.transform_accounts(os.path.join(input_dir, 'Customer.csv'), out('accounts.csv'), batch=batch)
+        elif case.startswith('products'):
+            transformer.transform_products(os.path.join(input_dir, 'Product.csv'), out('products.csv'),
+                                           out('pricebook.csv'), batch=batch)
+        elif case == 'inventory':
+            transformer.transform_inventory(os.path.join(input_dir, 'Inventory.csv'), out('inventory.csv'),
+                                            out('inventory_rollup.csv'))
+        else:
+            transformer.transform_orders(os.path.join(input_dir, 'POSTransHead.csv'),
+                                         os.path.join(input_dir, 'POSTransItem.csv'),
+                                         out('orders.csv'), out('order_items.csv'))
+    stage = transformer.instrumentation.stages[-1]
+    stage['errors'] = transformer.stats['errors']
+    return stage
+
+def run_cases(cases, input_dir, cache_size, repeat):
+    """Best-of-``repeat`` wall time of each case, each repeat in a new process"""
+    results = {}
+    for case in cases:
+        if case.endswith('_batch') and pd is None:
+            print(f"⚠️  pandas is not installed, skipping {case}")
+            continue
+        best = None
+        for _ in range(repeat):
+            # Spawned (not forked) so the child does not inherit this process's memory
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as executor:
+                stage = executor.submit(_run_case, (case, input_dir, cache_size)).result()
+            if best is None or stage['seconds'] < best['seconds']:
+                best = stage
+        results[case] = {
+            'rows': best['rows'],
+            'seconds': best['seconds'],
+            'rows_per_sec': best.get('rows_per_sec'),
+            # The case has the process to itself, so the process peak is the case's peak
+            'peak_rss_mb': round(best['process_peak_rss_mb'], 1) if best.get('process_peak_rss_mb') else None,
+            'errors': best['errors']
+        }
+        print(f"  {case:<16} {best['rows']:>9} rows  {best['seconds']:>8.3f}s  "
+              f"{results[case]['rows_per_sec'] or 0:>10.0f} rows/s  {results[case]['peak_rss_mb'] or 0:>7.1f} MB")
+    return results
+
+def normalizer_values(input_dir, table, columns):
+    """Every value of ``columns`` in one staging file, in file order"""
+    values = []
+    with open(os.path.join(input_dir, f"{table}.csv"), 'r', newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            values.extend(row[c] for c in columns)
+    return values
+
+def run_normalizers(input_dir, cache_size, repeat):
+    """Nanoseconds per call of each scalar normalizer over its real column values.
+
+    Each repeat uses a fresh transformer, so cache hit rates match a single
+    pass over the file.
+    """
+    results = {}
+    for name, (table, columns) in NORMALIZER_INPUTS.items():
+        values = normalizer_values(input_dir, table, columns)
+        column = columns[0] if name.startswith('transform_') else None
+        best = None
+        for _ in range(repeat):
+            func = getattr(DataTransformer(cache_size), name)
+            if column:
+                start = time.perf_counter()
+                for value in values:
+                    func(value, column)
+            else:
+                start = time.perf_counter()
+                for value in values:
+                    func(value)
+            seconds = time.perf_counter() - start
+            best = seconds if best is None else min(best, seconds)
+        results[name] = {
+            'calls': len(values),
+            'ns_per_call': round(best * 1e9 / len(values), 1) if values else None
+        }
+    return results
+
+def git_commit():
+    """Current commit (with a -dirty suffix for uncommitted changes), or None"""
+    repo = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, check=True, cwd=repo).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                               capture_output=True, text=True, cwd=repo).stdout.strip()
+        return f"{commit}-dirty" if dirty else commit
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def load_history(history_file=HISTORY_FILE):
+    """Previous benchmark runs, oldest first"""
+    if not os.path.exists(history_file):
+        return []
+    with open(history_file) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def find_regressions(current, previous):
+    """Messages for cases slower or hungrier than the previous run beyond tolerance"""
+    regressions = []
+    for case, result in current['cases'].items():
+        before = previous.get('cases', {}).get(case)
+        if not before:
+            continue
+        if before.get('rows_per_sec') and result.get('rows_per_sec') is not None:
+            change = result['rows_per_sec'] / before['rows_per_sec'] - 1
+            if change < -THROUGHPUT_TOLERANCE:
+                regressions.append(f"{case}: throughput {change:+.1%} "
+                                   f"({before['rows_per_sec']:.0f} -> {result['rows_per_sec']:.0f} rows/s)")
+        if before.get('peak_rss_mb') and result.get('peak_rss_mb') is not None:
+            change = result['peak_rss_mb'] / before['peak_rss_mb'] - 1
+            if change > MEMORY_TOLERANCE:
+                regressions.append(f"{case}: peak memory {change:+.1%} "
+                                   f"({before['peak_rss_mb']:.1f} -> {result['peak_rss_mb']:.1f} MB)")
+    for name, result in current['normalizers'].items():
+        before = previous.get('normalizers', {}).get(name)
+        if before and before.get('ns_per_call') and result.get('ns_per_call') is not None:
+            change = before['ns_per_call'] / result['ns_per_call'] - 1
+            if change < -THROUGHPUT_TOLERANCE:
+                regressions.append(f"{name}: {change:+.1%} calls/s "
+                                   f"({before['ns_per_call']:.0f} -> {result['ns_per_call']:.0f} ns/call)")
+    return regressions
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Benchmark the Aralco transformation on synthetic data")
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help="multiple of production volume to generate (1 to 100)")
+    parser.add_argument('--data-dir', help=f"existing synthetic data (default: {SYNTHETIC_DIR}/<scale>x, "
+                                           "generated when missing)")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--case', action='append', dest='cases', choices=CASES,
+                        help="end-to-end case to run (repeatable, default: all)")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT,
+                        help="runs per measurement; the fastest is kept")
+    parser.add_argument('--cache-size', type=int, default=NORMALIZER_CACHE_SIZE,
+                        help="normalizer cache size of the end-to-end cases")
+    parser.add_argument('--history', default=HISTORY_FILE)
+    parser.add_argument('--no-record', action='store_true',
+                        help="compare with the history without appending this run")
+    parser.add_argument('--fail-on-regression', action='store_true',
+                        help="exit with status 1 when a regression is found")
+    return parser.parse_args()
+
+def main():
+    """Main benchmark process"""
+    args = parse_args()
+    print("🚀 Starting Aralco transformation benchmark...")
+
+    data_dir = args.data_dir or os.path.join(SYNTHETIC_DIR, f"{args.scale:g}x")
+    if not all(os.path.exists(os.path.join(data_dir, f"{table}.csv")) for table in BASE_COUNTS):
+        generate(args.scale, data_dir, args.seed)
+    repeat = max(1, args.repeat)
+
+    print(f"\n📊 End-to-end ({data_dir}, best of {repeat}):")
+    cases = run_cases(args.cases or CASES, data_dir, args.cache_size, repeat)
+
+    print("\n📊 Normalizers (ns per call, uncached / cached):")
+    uncached = run_normalizers(data_dir, 0, repeat)
+    cached = run_normalizers(data_dir, NORMALIZER_CACHE_SIZE, repeat)
+    normalizers = {}
+    for name in NORMALIZER_INPUTS:
+        normalizers[name] = uncached[name]
+        normalizers[f"{name}_cached"] = cached[name]
+        print(f"  {name:<20} {uncached[name]['calls']:>9} calls  "
+              f"{uncached[name]['ns_per_call'] or 0:>8.0f}  {cached[name]['ns_per_call'] or 0:>8.0f}")
+
+    run = {
+        'date': datetime.now().isoformat(),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'scale': args.scale,
+        'data_dir': data_dir,
+        'seed': args.seed,
+        'cache_size': args.cache_size,
+        'cases': cases,
+        'normalizers': normalizers
+    }
+
+    # Compare with the last run at the same scale and seed on this machine
+    history = [h for h in load_history(args.history)
+               if (h.get('scale'), h.get('seed'), h.get('platform')) == (args.scale, args.seed, run['platform'])]
+    regressions = find_regressions(run, history[-1]) if history else []
+    if not history:
+        print("\n⚠️  No previous run at this scale to compare with")
+    elif regressions:
+        print(f"\n⚠️  {len(regressions)} regression(s) since {history[-1].get('commit')}:")
+        for message in regressions:
+            print(f"  - {message}")
+    else:
+        print(f"\n✅ No regressions since {history[-1].get('commit')}")
+
+    if not args.no_record:
+        os.makedirs(os.path.dirname(args.history) or '.', exist_ok=True)
+        with open(args.history, 'a') as f:
+            f.write(json.dumps(run) + '\n')
+        print(f"📊 Results appended to {args.history}")
+
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
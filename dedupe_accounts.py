@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Aralco Customer Deduplication Script
+Finds duplicate customers within blocking keys (external sort), merges each cluster into its most complete record and writes survivors plus a merge map
+"""
+
+import argparse
+import csv
+import heapq
+import itertools
+import json
+import os
+import re
+import tempfile
+from datetime import datetime
+
+from transform_data import DataTransformer, _join_key, read_staging_rows
+
+# Survivor staging file and merge map (CustomerID -> SurvivorCustomerID)
+DEDUPE_DIR = 'exports/salesforce_ready/dedupe'
+SURVIVORS_FILE = os.path.join(DEDUPE_DIR, 'Customer.csv')
+MERGE_MAP_FILE = os.path.join(DEDUPE_DIR, 'account_merge_map.csv')
+
+# (blocking key, CustomerID, match profile) rows sorted in memory per spill run
+DEDUPE_RUN_SIZE = 500000
+
+# Blocks larger than this are placeholders (store phone, noemail@...) rather
+# than one person, and are not used for matching
+MAX_BLOCK_SIZE = 25
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+def match_profile(row, transformer):
+    """(name, email, phones) a customer is compared on, all normalized"""
+    email = transformer.clean_email(row.get('Email', ''))
+    phones = []
+    for column in ('Phone', 'Cellular'):
+        phone = transformer.clean_phone(row.get(column, ''))
+        # Only full 10-digit numbers are comparable
+        if phone and phone.startswith('(') and phone not in phones:
+            phones.append(phone)
+    name = row.get('CompanyName') or f"{row.get('FirstName') or ''} {row.get('LastName') or ''}"
+    name = _WHITESPACE_RE.sub(' ', str(name)).strip().lower()
+    return name, email, phones
+
+def blocking_keys(profile):
+    """Blocking keys of a customer: its email and phones.
+
+    Customers sharing a key are only candidates; ``match`` decides.
+    """
+    name, email, phones = profile
+    return ([f"email:{email}"] if email else []) + [f"phone:{phone}" for phone in phones]
+
+def match(a, b):
+    """What two candidate profiles matched on ('email', 'phone'), or None.
+
+    The names must agree and so must an email or a phone: a shared phone
+    (a household, a store line) or a shared name alone is never a match.
+    """
+    if not a[0] or a[0] != b[0]:
+        return None
+    matched_on = []
+    if a[1] and a[1] == b[1]:
+        matched_on.append('email')
+    if set(a[2]) & set(b[2]):
+        matched_on.append('phone')
+    return matched_on or None
+
+def _spill(rows, spill_dir, runs):
+    """Write one sorted run of (key, id, name, email, phones) rows and return its path"""
+    rows.sort()
+    path = os.path.join(spill_dir, f"run_{len(runs):05d}.csv")
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        csv.writer(f).writerows(rows)
+    runs.append(path)
+    rows.clear()
+
+def _read_run(path):
+    with open(path, 'r', newline='', encoding='utf-8') as f:
+        for key, customer_id, name, email, phones in csv.reader(f):
+            yield key, customer_id, name, email, phones
+
+def _blocks(runs):
+    """Merge the sorted runs and yield (key, [(customer id, profile)]) per blocking key"""
+    current, members = None, []
+    for key, customer_id, name, email, phones in heapq.merge(*(_read_run(path) for path in runs)):
+        if key != current:
+            if len(members) > 1:
+                yield current, members
+            current, members = key, []
+        if len(members) <= MAX_BLOCK_SIZE:
+            members.append((customer_id, (name, email, phones.split('|') if phones else [])))
+    if len(members) > 1:
+        yield current, members
+
+class _Clusters:
+    """Union-find over the customers matched to someone.
+
+    Only matched customers are held, not the whole table. Every match needs
+    the names to agree, so a chain of matches never links different names.
+    """
+
+    def __init__(self):
+        self.parent = {}
+        self.matched_on = {}
+
+    def find(self, customer_id):
+        root = customer_id
+        while self.parent.get(root, root) != root:
+            root = self.parent[root]
+        while customer_id != root:
+            self.parent[customer_id], customer_id = root, self.parent[customer_id]
+        return root
+
+    def union(self, a, b, matched_on):
+        for customer_id in (a, b):
+            self.matched_on.setdefault(customer_id, set()).update(matched_on)
+        roots = sorted({self.find(a), self.find(b)}, key=_join_key)
+        for root in roots[1:]:
+            self.parent[root] = roots[0]
+
+    def clusters(self):
+        """{root: [CustomerID, ...]} of every cluster, members in CustomerID order"""
+        clusters = {}
+        for customer_id in sorted(self.matched_on, key=_join_key):
+            clusters.setdefault(self.find(customer_id), []).append(customer_id)
+        return clusters
+
+def _survivor_rank(row, transformer):
+    """Most filled-in fields first, then the most recently updated"""
+    filled = sum(1 for value in row.values() if value is not None and str(value).strip())
+    updated = (transformer.transform_datetime(row.get('LastUpdated'), 'LastUpdated')
+               or transformer.transform_datetime(row.get('CreatedDate'), 'CreatedDate'))
+    return filled, updated
+
+def merge_cluster(rows, transformer):
+    """Pick a cluster's survivor and fill its empty fields from the merged rows.
+
+    The most complete record survives (the most recently updated one on a
+    tie, then the lowest CustomerID); each field it lacks is taken from the
+    next-ranked record that has it. Returns (survivor row, merged rows).
+    """
+    rows = sorted(rows, key=lambda row: _join_key(row.get('CustomerID', '')))
+    ranked = sorted(rows, key=lambda row: _survivor_rank(row, transformer), reverse=True)
+    survivor = dict(ranked[0])
+    for column, value in survivor.items():
+        if value is None or not str(value).strip():
+            survivor[column] = next((row[column] for row in ranked[1:]
+                                     if row.get(column) is not None and str(row[column]).strip()), value)
+    return survivor, ranked[1:]
+
+def dedupe_customers(input_file, survivors_file=SURVIVORS_FILE, merge_map_file=MERGE_MAP_FILE,
+                     transformer=None, run_size=DEDUPE_RUN_SIZE):
+    """Find duplicate customers and write the survivor staging file and merge map.
+
+    Every customer contributes a (blocking key, CustomerID, profile) row
+    per email and phone; these are sorted in bounded runs on disk and
+    merged, so only customers sharing a key are compared. Within a block
+    each pair is checked with ``match``, and matched customers form
+    clusters that ``merge_cluster`` folds into one survivor.
+    """
+    print(f"🔄 Deduplicating customers in {input_file}...")
+    transformer = transformer or DataTransformer()
+    stats = {'customers': 0, 'blocks': 0, 'oversized_blocks': 0, 'compared': 0, 'merged': 0, 'survivors': 0}
+
+    clusters = _Clusters()
+    with tempfile.TemporaryDirectory(prefix='dedupe_') as spill_dir:
+        runs, rows = [], []
+        for row in read_staging_rows(input_file):
+            customer_id = str(row.get('CustomerID', ''))
+            if not customer_id:
+                continue
+            stats['customers'] += 1
+            profile = match_profile(row, transformer)
+            rows.extend((key, customer_id, profile[0], profile[1], '|'.join(profile[2]))
+                        for key in blocking_keys(profile))
+            if len(rows) >= run_size:
+                _spill(rows, spill_dir, runs)
+        if rows:
+            _spill(rows, spill_dir, runs)
+
+        for key, members in _blocks(runs):
+            if len(members) > MAX_BLOCK_SIZE:
+                stats['oversized_blocks'] += 1
+                continue
+            stats['blocks'] += 1
+            for (a, profile_a), (b, profile_b) in itertools.combinations(members, 2):
+                stats['compared'] += 1
+                matched_on = match(profile_a, profile_b)
+                if matched_on:
+                    clusters.union(a, b, matched_on)
+
+    # Matched customers are a small share of the table; hold their rows to merge them
+    members = {customer_id: root for root, ids in clusters.clusters().items() for customer_id in ids}
+    held = {}
+    for row in read_staging_rows(input_file):
+        root = members.get(str(row.get('CustomerID', '')))
+        if root is not None:
+            held.setdefault(root, []).append(row)
+    merged, survivors = {}, {}
+    for cluster_rows in held.values():
+        survivor, duplicates = merge_cluster(cluster_rows, transformer)
+        survivor_id = str(survivor['CustomerID'])
+        survivors[survivor_id] = survivor
+        for row in duplicates:
+            merged[str(row['CustomerID'])] = survivor_id
+
+    os.makedirs(os.path.dirname(merge_map_file) or '.', exist_ok=True)
+    with open(merge_map_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['CustomerID', 'SurvivorCustomerID', 'MatchedOn'])
+        for customer_id in sorted(merged, key=_join_key):
+            writer.writerow([customer_id, merged[customer_id], '+'.join(sorted(clusters.matched_on[customer_id]))])
+    stats['merged'] = len(merged)
+
+    os.makedirs(os.path.dirname(survivors_file) or '.', exist_ok=True)
+    with open(survivors_file, 'w', newline='', encoding='utf-8') as f:
+        writer = None
+        for row in read_staging_rows(input_file):
+            if writer is None:
+                writer = csv.DictWriter(f, fieldnames=list(row))
+                writer.writeheader()
+            customer_id = str(row.get('CustomerID', ''))
+            if customer_id not in merged:
+                writer.writerow(survivors.get(customer_id, row))
+                stats['survivors'] += 1
+
+    print(f"✅ {stats['customers']} customers: {stats['merged']} merged into "
+          f"{len(survivors)} survivors, {stats['survivors']} accounts remain")
+    if stats['oversized_blocks']:
+        print(f"⚠️  Ignored {stats['oversized_blocks']} blocking keys shared by more than "
+              f"{MAX_BLOCK_SIZE} customers (placeholders)")
+    return stats
+
+def load_merge_map(merge_map_file=MERGE_MAP_FILE):
+    """CustomerID -> SurvivorCustomerID for merged customers only"""
+    with open(merge_map_file, 'r', newline='', encoding='utf-8') as f:
+        return {row['CustomerID']: row['SurvivorCustomerID'] for row in csv.DictReader(f)}
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Deduplicate Aralco customers before the Account transform")
+    parser.add_argument('--input', default='exports/extract/Customer.csv',
+                        help="customer staging file, CSV or Parquet")
+    parser.add_argument('--output-dir', default=DEDUPE_DIR,
+                        help="where Customer.csv (survivors) and account_merge_map.csv are written")
+    parser.add_argument('--run-size', type=int, default=DEDUPE_RUN_SIZE,
+                        help="blocking key pairs sorted in memory per spill run")
+    return parser.parse_args()
+
+def main():
+    """Main deduplication process"""
+    args = parse_args()
+    print("🚀 Starting Aralco customer deduplication...")
+
+    try:
+        stats = dedupe_customers(args.input, os.path.join(args.output_dir, 'Customer.csv'),
+                                 os.path.join(args.output_dir, 'account_merge_map.csv'),
+                                 run_size=max(1, args.run_size))
+    except Exception as e:
+        print(f"❌ Error deduplicating customers: {e}")
+        return
+
+    stats['dedupe_date'] = datetime.now().isoformat()
+    with open(os.path.join(args.output_dir, 'dedupe_summary.json'), 'w') as f:
+        json.dump(stats, f, indent=2)
+    print(f"\n✅ Deduplication complete! Check {args.output_dir}/ for results.")
+
+if __name__ == "__main__":
+    main()
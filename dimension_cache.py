@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Aralco Dimension Cache
+Loads the small reference tables (stores, employees, suppliers, categories) once and serves in-memory code -> name lookups
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+from datetime import datetime
+
+# Cached labels and the checksum each dimension was loaded at (next to the watermarks)
+DIMENSION_CACHE_FILE = 'exports/extract/dimensions.json'
+
+# Dimension -> source table, key column and label column(s) joined with a space.
+# Category and Department follow the Code/Description layout of Supplier;
+# databases without those tables keep passing the raw codes through.
+DIMENSION_TABLES = {
+    'Store': {'key': 'StoreID', 'label': ['Name']},
+    'Employee': {'key': 'EmployeeID', 'label': ['FirstName', 'LastName']},
+    'Supplier': {'key': 'Code', 'label': ['Name']},
+    'Category': {'key': 'Code', 'label': ['Description']},
+    'Department': {'key': 'Code', 'label': ['Description']}
+}
+
+def _columns(table):
+    spec = DIMENSION_TABLES[table]
+    return [spec['key']] + spec['label']
+
+def table_checksum(conn, table):
+    """Row count and checksum of a dimension table's key and label columns.
+
+    SQL Server aggregates BINARY_CHECKSUM on the server, so an unchanged
+    table costs one scan and no rows over the wire. SQLite has no checksum
+    aggregate, so the (small) table is hashed here instead.
+    """
+    columns = ', '.join(f"[{c}]" for c in _columns(table))
+    cursor = conn.cursor()
+    try:
+        if isinstance(conn, sqlite3.Connection):
+            cursor.execute(f"SELECT {columns} FROM [{table}] ORDER BY [{DIMENSION_TABLES[table]['key']}]")
+            digest, count = hashlib.blake2b(digest_size=16), 0
+            for row in cursor:
+                digest.update(repr(tuple(row)).encode('utf-8'))
+                count += 1
+            return [count, digest.hexdigest()]
+        cursor.execute(f"SELECT COUNT_BIG(*), CHECKSUM_AGG(BINARY_CHECKSUM({columns})) FROM [{table}]")
+        count, checksum = cursor.fetchone()
+        return [count, checksum]
+    finally:
+        cursor.close()
+
+def load_dimension(conn, table):
+    """Read a dimension table into {key: label}, interning every string.
+
+    Keys are stringified the way the staging writers write them, so they
+    match the codes in the staging files. Labels repeat (shared supplier and
+    category names), and interning stores each distinct one once.
+    """
+    columns = ', '.join(f"[{c}]" for c in _columns(table))
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"SELECT {columns} FROM [{table}]")
+        labels = {}
+        for key, *parts in cursor:
+            if key is None:
+                continue
+            label = ' '.join(str(p).strip() for p in parts if p is not None and str(p).strip())
+            labels[sys.intern(str(key))] = sys.intern(label)
+        return labels
+    finally:
+        cursor.close()
+
+class DimensionCache:
+    """In-memory code -> label maps of every loaded dimension.
+
+    Lookups are plain dict reads, so resolving a code costs no query; an
+    unloaded dimension or unknown code returns the default. The cache is
+    small enough to be pickled to process-pool workers.
+    """
+
+    def __init__(self, dimensions=None):
+        # {dimension: {'checksum': [...], 'loaded': iso date, 'labels': {key: label}}}
+        self.dimensions = dimensions or {}
+
+    @classmethod
+    def load(cls, path=DIMENSION_CACHE_FILE):
+        """Load a saved cache, or an empty one when the file does not exist"""
+        if not os.path.exists(path):
+            return cls()
+        with open(path, 'r', encoding='utf-8') as f:
+            dimensions = json.load(f)
+        for entry in dimensions.values():
+            entry['labels'] = {sys.intern(k): sys.intern(v) for k, v in entry['labels'].items()}
+        return cls(dimensions)
+
+    def save(self, path=DIMENSION_CACHE_FILE):
+        """Write the cache atomically so a crash never leaves a partial file"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        temp_file = f"{path}.tmp"
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.dimensions, f, indent=2, ensure_ascii=False)
+        os.replace(temp_file, path)
+
+    def labels(self, dimension):
+        """{key: label} of a dimension ({} when not loaded), e.g. for pandas ``Series.map``"""
+        entry = self.dimensions.get(dimension)
+        return entry['labels'] if entry else {}
+
+    def lookup(self, dimension, key, default=''):
+        """Label of one code, or ``default``"""
+        return self.labels(dimension).get(str(key), default)
+
+    def lookup_many(self, dimension, keys, default=''):
+        """Labels of ``keys`` in order, ``default`` for unknown codes"""
+        labels = self.labels(dimension)
+        return [labels.get(str(key), default) for key in keys]
+
+    def checksums(self):
+        """Checksum of each loaded dimension, to fingerprint output that used them"""
+        return {name: entry['checksum'] for name, entry in sorted(self.dimensions.items())}
+
+    def refresh(self, conn, tables=None):
+        """Reload the dimensions whose table checksum changed since they were cached.
+
+        Tables that do not exist are dropped from the cache with a warning,
+        and so are cached dimensions no longer in DIMENSION_TABLES. Returns
+        the names of the dimensions that were (re)loaded.
+        """
+        reloaded = []
+        for name in set(self.dimensions) - set(DIMENSION_TABLES):
+            del self.dimensions[name]
+        for table in tables or DIMENSION_TABLES:
+            try:
+                checksum = table_checksum(conn, table)
+                cached = self.dimensions.get(table)
+                if cached and cached['checksum'] == checksum:
+                    continue
+                self.dimensions[table] = {'checksum': checksum, 'loaded': datetime.now().isoformat(),
+                                          'labels': load_dimension(conn, table)}
+                reloaded.append(table)
+            except Exception as e:
+                print(f"⚠️  Dimension {table} not available, codes pass through unresolved: {e}")
+                self.dimensions.pop(table, None)
+        return reloaded
+
+def refresh_dimensions(conn, cache_file=DIMENSION_CACHE_FILE):
+    """Bring the saved dimension cache up to date with the database"""
+    print("🔄 Checking dimension tables...")
+    cache = DimensionCache.load(cache_file)
+    reloaded = cache.refresh(conn)
+    cache.save(cache_file)
+    for name in cache.dimensions:
+        state = 'reloaded' if name in reloaded else 'unchanged'
+        print(f"✅ {name}: {len(cache.labels(name))} codes ({state})")
+    return cache
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Load or refresh the cached Aralco dimension tables")
+    parser.add_argument('--sqlite', metavar='PATH',
+                        help="read a local SQLite stand-in instead of SQL Server "
+                             "(see generate_synthetic_data.py --sqlite)")
+    parser.add_argument('--cache', default=DIMENSION_CACHE_FILE)
+    return parser.parse_args()
+
+def main():
+    """Refresh the dimension cache"""
+    from analyze_database import connect_sqlite, get_connection
+
+    args = parse_args()
+    print("🚀 Refreshing Aralco dimension cache...")
+    conn = connect_sqlite(args.sqlite) if args.sqlite else get_connection()
+    if not conn:
+        print("❌ Cannot proceed without database connection")
+        return
+    try:
+        refresh_dimensions(conn, args.cache)
+    finally:
+        conn.close()
+    print(f"\n✅ Dimension cache up to date in {args.cache}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Salesforce Field Metadata Validator
+Checks import rows against field types, lengths and picklists before they are written, diverting bad rows to reject files
+"""
+
+import argparse
+import csv
+import glob
+import itertools
+import os
+import re
+import xml.etree.ElementTree as ET
+
+from output_writer import create_import, import_parts, open_import, refresh_manifest
+
+# SFDX source of the org's field definitions (<object>/fields/*.field-meta.xml)
+METADATA_DIR = 'salesforce-metadata/force-app/main/default/objects'
+
+# Rows checked per pass when validating a file
+VALIDATION_BATCH = 50000
+
+# Limits of the standard fields the import files write. The metadata files
+# of standard fields carry no type or length, so these fill the gaps;
+# anything the metadata does state takes precedence.
+STANDARD_FIELDS = {
+    'Account': {
+        'Name': {'type': 'Text', 'length': 255, 'required': True},
+        'AccountNumber': {'type': 'Text', 'length': 40},
+        'Phone': {'type': 'Phone'},
+        'Fax': {'type': 'Phone'},
+        'Website': {'type': 'Url', 'length': 255},
+        'BillingStreet': {'type': 'TextArea', 'length': 255},
+        'BillingCity': {'type': 'Text', 'length': 40},
+        'BillingState': {'type': 'Text', 'length': 80},
+        'BillingPostalCode': {'type': 'Text', 'length': 20},
+        'BillingCountry': {'type': 'Text', 'length': 80},
+        'ShippingStreet': {'type': 'TextArea', 'length': 255},
+        'ShippingCity': {'type': 'Text', 'length': 40},
+        'ShippingState': {'type': 'Text', 'length': 80},
+        'ShippingPostalCode': {'type': 'Text', 'length': 20},
+        'ShippingCountry': {'type': 'Text', 'length': 80},
+        'Description': {'type': 'LongTextArea', 'length': 32000},
+        'PersonEmail': {'type': 'Email'},
+        'PersonMobilePhone': {'type': 'Phone'},
+        'PersonHomePhone': {'type': 'Phone'},
+        'FirstName': {'type': 'Text', 'length': 40},
+        'LastName': {'type': 'Text', 'length': 80}
+    },
+    'Product2': {
+        'Name': {'type': 'Text', 'length': 255, 'required': True},
+        'ProductCode': {'type': 'Text', 'length': 255},
+        'Description': {'type': 'TextArea', 'length': 4000},
+        'IsActive': {'type': 'Checkbox'}
+    },
+    'PricebookEntry': {
+        'IsActive': {'type': 'Checkbox'},
+        'UseStandardPrice': {'type': 'Checkbox'}
+    },
+    'Order': {
+        'EffectiveDate': {'type': 'Date', 'required': True},
+        'Status': {'type': 'Picklist', 'required': True}
+    },
+    'OrderItem': {
+        'Description': {'type': 'Text', 'length': 255}
+    }
+}
+
+# Fixed lengths of field types whose metadata has no <length>
+TYPE_LENGTHS = {
+    'Email': 80,
+    'Phone': 40,
+    'Url': 255
+}
+
+_NS = {'sf': 'http://soap.sforce.com/2006/04/metadata'}
+_EMAIL_RE = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+_DATE_RE = re.compile(r'^[0-9]{4}-[0-9]{2}-[0-9]{2}$')
+_DATETIME_RE = re.compile(r'^[0-9]{4}-[0-9]{2}-[0-9]{2}[T ][0-9]{2}:[0-9]{2}:[0-9]{2}')
+
+def _text(element, path):
+    found = element.find(path, _NS)
+    return found.text.strip() if found is not None and found.text else None
+
+def parse_field(path):
+    """Read one .field-meta.xml into a spec: type, length, precision, scale, required, values"""
+    root = ET.parse(path).getroot()
+    spec = {'type': _text(root, 'sf:type')}
+    for key in ('length', 'precision', 'scale'):
+        value = _text(root, f'sf:{key}')
+        if value is not None:
+            spec[key] = int(value)
+    if _text(root, 'sf:required') == 'true':
+        spec['required'] = True
+    # Only a restricted picklist rejects values outside its value set
+    if _text(root, 'sf:valueSet/sf:restricted') == 'true':
+        spec['values'] = {_text(value, 'sf:fullName')
+                          for value in root.findall('sf:valueSet/sf:valueSetDefinition/sf:value', _NS)}
+    return _text(root, 'sf:fullName') or os.path.basename(path).split('.')[0], spec
+
+def load_field_metadata(sobject, metadata_dir=METADATA_DIR):
+    """Field specs of an object: the standard limits overlaid with its metadata files"""
+    specs = {field: dict(spec) for field, spec in STANDARD_FIELDS.get(sobject, {}).items()}
+    for path in sorted(glob.glob(os.path.join(metadata_dir, sobject, 'fields', '*.field-meta.xml'))):
+        field, spec = parse_field(path)
+        specs.setdefault(field, {}).update({k: v for k, v in spec.items() if v is not None})
+    return specs
+
+def _number_check(precision, scale):
+    integer_digits = precision - scale
+
+    def check(value):
+        digits = value[1:] if value[0] in '+-' else value
+        whole, _, fraction = digits.partition('.')
+        if not (whole or fraction) or not (whole or '0').isdigit() or (fraction and not fraction.isdigit()):
+            return "not a number"
+        if len(whole.lstrip('0')) > integer_digits or len(fraction) > scale:
+            return f"exceeds {integer_digits} digits before / {scale} after the decimal point"
+        return None
+    return check
+
+def compile_check(spec):
+    """Turn a field spec into ``check(value) -> problem or None`` for non-empty values, or None"""
+    field_type = spec.get('type')
+    checks = []
+    length = spec.get('length') or TYPE_LENGTHS.get(field_type)
+    if length:
+        checks.append(lambda value: f"longer than {length} characters" if len(value) > length else None)
+    if spec.get('values'):
+        values = spec['values']
+        checks.append(lambda value: f"'{value}' is not a picklist value" if value not in values else None)
+    if field_type == 'Email':
+        checks.append(lambda value: None if _EMAIL_RE.match(value) else "not a valid email address")
+    elif field_type == 'Checkbox':
+        checks.append(lambda value: None if value in ('true', 'false') else "not true/false")
+    elif field_type == 'Date':
+        checks.append(lambda value: None if _DATE_RE.match(value) else "not a YYYY-MM-DD date")
+    elif field_type == 'DateTime':
+        checks.append(lambda value: None if _DATETIME_RE.match(value) else "not an ISO date and time")
+    elif field_type in ('Currency', 'Number', 'Percent') and 'precision' in spec:
+        checks.append(_number_check(spec['precision'], spec.get('scale', 0)))
+
+    if not checks:
+        return None
+    if len(checks) == 1:
+        return checks[0]
+
+    def check_all(value):
+        for check in checks:
+            problem = check(value)
+            if problem:
+                return problem
+        return None
+    return check_all
+
+class FieldValidator:
+    """Compiled field checks per (object, import file columns).
+
+    The metadata of each object is parsed once; checks are compiled once
+    per column layout and cover only the columns that have a spec, so
+    relationship columns (Account.Aralco_Customer_ID__c) pass untouched.
+    """
+
+    def __init__(self, metadata_dir=METADATA_DIR):
+        self.metadata_dir = metadata_dir
+        self._specs = {}
+        self._compiled = {}
+
+    def __reduce__(self):
+        # Compiled checks are closures; a process-pool worker recompiles them
+        return (FieldValidator, (self.metadata_dir,))
+
+    def checks(self, sobject, fieldnames):
+        """[(column index, field, required, check or None)] for the checked columns"""
+        key = (sobject, tuple(fieldnames))
+        if key not in self._compiled:
+            if sobject not in self._specs:
+                self._specs[sobject] = load_field_metadata(sobject, self.metadata_dir)
+            specs = self._specs[sobject]
+            compiled = []
+            for i, field in enumerate(fieldnames):
+                spec = specs.get(field)
+                if not spec:
+                    continue
+                check = compile_check(spec)
+                if check or spec.get('required'):
+                    compiled.append((i, field, bool(spec.get('required')), check))
+            self._compiled[key] = compiled
+        return self._compiled[key]
+
+    def problems(self, checks, rows):
+        """Map row position -> problems for the failing rows of a batch, column by column"""
+        failed = {}
+        for i, field, required, check in checks:
+            for n, row in enumerate(rows):
+                value = row[i]
+                if not value:
+                    if required:
+                        failed.setdefault(n, []).append(f"{field}: required")
+                    continue
+                if check:
+                    problem = check(value)
+                    if problem:
+                        failed.setdefault(n, []).append(f"{field}: {problem}")
+        return failed
+
+def rejects_file(output_file):
+    """Path of the rejects file written next to an import file"""
+    stem, ext = os.path.splitext(output_file)
+    return f"{stem}_rejects{ext}"
+
+class _CheckedRows:
+    """csv writer stand-in that validates rows and diverts failures to the rejects writer"""
+
+    def __init__(self, writer, reject_writer, validator, checks, on_reject):
+        self._writer = writer
+        self._reject_writer = reject_writer
+        self._validator = validator
+        self._checks = checks
+        self._on_reject = on_reject
+
+    def writerow(self, row):
+        """Write a row that passes, else reject it and return False"""
+        row = row if isinstance(row, list) else list(row)
+        failed = self._validator.problems(self._checks, [row])
+        if failed:
+            self._reject(row, failed[0])
+            return False
+        return self._writer.writerow(row)
+
+    def writerows(self, rows):
+        """Write the rows that pass and return the positions of the rejected ones"""
+        rows = [row if isinstance(row, list) else list(row) for row in rows]
+        failed = self._validator.problems(self._checks, rows)
+        if not failed:
+            self._writer.writerows(rows)
+            return set()
+        for n, row in enumerate(rows):
+            if n in failed:
+                self._reject(row, failed[n])
+            else:
+                self._writer.writerow(row)
+        return set(failed)
+
+    def _reject(self, row, problems):
+        self._reject_writer.writerow(list(row) + ['; '.join(problems)])
+        if self._on_reject:
+            self._on_reject(row, problems)
+
+def checked_rows(writer, reject_writer, fieldnames, sobject, validator, on_reject=None):
+    """Wrap a csv writer (or an output_writer.RollingCsvWriter) so failing rows go to ``reject_writer``"""
+    return _CheckedRows(writer, reject_writer, validator, validator.checks(sobject, fieldnames), on_reject)
+
+class ValidatingWriter(csv.DictWriter):
+    """DictWriter whose rows (``writerow``, or ``writer.writerows`` in batch
+    mode) are checked against the field metadata before they are written.
+    """
+
+    def __init__(self, f, fieldnames, reject_file, sobject, validator, on_reject=None):
+        super().__init__(f, fieldnames=fieldnames)
+        self._output = self.writer
+        reject_writer = csv.writer(reject_file)
+        reject_writer.writerow(list(fieldnames) + ['ERROR'])
+        self.writer = checked_rows(self._output, reject_writer, fieldnames, sobject, validator, on_reject)
+
+    def writeheader(self):
+        return self._output.writerow(self.fieldnames)
+
+def validate_file(input_file, sobject, validator=None, batch_size=VALIDATION_BATCH):
+    """Split an existing import file, or the parts of a split one, into valid
+    rows (kept in place) and its rejects file"""
+    validator = validator or FieldValidator()
+    parts = import_parts(input_file)
+    if not parts:
+        raise FileNotFoundError(f"No such import file or manifest: {input_file}")
+    counts = {'rows': 0, 'rejected': 0}
+
+    def count_reject(row, problems):
+        counts['rejected'] += 1
+
+    with open(rejects_file(input_file), 'w', newline='', encoding='utf-8') as reject_out:
+        reject_writer = csv.writer(reject_out)
+        for i, part in enumerate(parts):
+            temp_file = f"{part}.tmp"
+            with open_import(part) as infile, create_import(temp_file, part.endswith('.gz')) as outfile:
+                reader = csv.reader(infile)
+                header = next(reader)
+                if i == 0:
+                    reject_writer.writerow(header + ['ERROR'])
+                writer = csv.writer(outfile)
+                writer.writerow(header)
+                rows = checked_rows(writer, reject_writer, header, sobject, validator, count_reject)
+                while True:
+                    batch = list(itertools.islice(reader, batch_size))
+                    if not batch:
+                        break
+                    rows.writerows(batch)
+                    counts['rows'] += len(batch)
+            os.replace(temp_file, part)
+    if parts != [input_file]:
+        refresh_manifest(input_file)
+    return counts['rows'] - counts['rejected'], counts['rejected']
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Validate a Salesforce import file against the field metadata")
+    parser.add_argument('input_file', help="import CSV, or the name of a split one (see output_writer.py); "
+                             "failing rows move to <name>_rejects.csv")
+    parser.add_argument('--object', required=True, help="Salesforce object of the file, e.g. Account")
+    parser.add_argument('--metadata-dir', default=METADATA_DIR)
+    return parser.parse_args()
+
+def main():
+    """Validate one import file"""
+    args = parse_args()
+    print(f"🔍 Validating {args.input_file} against {args.object} field metadata...")
+    try:
+        kept, rejected = validate_file(args.input_file, args.object, FieldValidator(args.metadata_dir))
+    except Exception as e:
+        print(f"❌ Error validating {args.input_file}: {e}")
+        return
+    print(f"✅ {kept} rows valid")
+    if rejected:
+        print(f"⚠️  {rejected} rows rejected to {rejects_file(args.input_file)}")
+
+if __name__ == "__main__":
+    main()
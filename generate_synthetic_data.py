@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""
+Synthetic Aralco Data Generator
+Writes Customer, Product, POSTransHead, POSTransItem and Inventory staging files with realistic, dirty values
+"""
+
+import argparse
+import csv
+import os
+import random
+import sqlite3
+from collections import deque
+from datetime import datetime, timedelta
+
+from analyze_database import EXTRACT_TABLES, staging_columns
+
+# Production volumes from MIGRATION_STRATEGY.md (scale 1)
+BASE_COUNTS = {
+    'Customer': 13111,
+    'Product': 37028,
+    'POSTransHead': 37677,
+    'POSTransItem': 49788,
+    'Inventory': 19611
+}
+
+# Reference table sizes (PROGRESS.md); transactions use stores 1-6 and employees 1-60
+DIMENSION_COUNTS = {
+    'Store': 6,
+    'Employee': 65,
+    'Supplier': 266
+}
+
+SYNTHETIC_DIR = 'exports/synthetic'
+DEFAULT_SEED = 20240101
+
+# Share of customers with an email address, and of those the share that is malformed
+EMAIL_RATE = 0.30
+BAD_EMAIL_RATE = 0.10
+
+# Share of customers entered again as a new record (same person, new CustomerID)
+DUPLICATE_RATE = 0.04
+
+# Transactions reference customers by POSCustomerID, numbered from here
+POS_CUSTOMER_BASE = 500000
+
+# Share of transactions without a customer (walk-in sales)
+WALK_IN_RATE = 0.20
+
+# Line items per transaction and their weights (about 1.32 on average)
+ITEMS_PER_TRANSACTION = [1, 2, 3, 4]
+ITEMS_WEIGHTS = [0.75, 0.20, 0.04, 0.01]
+
+# Transaction history window
+HISTORY_START = datetime(2015, 1, 1)
+HISTORY_DAYS = 365 * 10
+
+FIRST_NAMES = ['John', 'Mary', 'Robert', 'Linda', 'Michael', 'Susan', 'David', 'Karen', 'James',
+               'Patricia', 'José', 'Zoë', 'François', 'Siobhán', 'Wei', 'Priya', 'Ahmed', 'Olga']
+LAST_NAMES = ['Smith', 'Brown', 'Tremblay', 'Martin', 'Roy', 'Wilson', 'MacDonald', 'Gagnon',
+              'Lee', 'Côté', "O'Neil", 'Müller', 'García', 'Nguyen', 'Patel', 'Singh']
+COMPANY_SUFFIXES = ['Inc.', 'Ltd.', 'Corp', '& Sons', 'Supply Co.', 'Holdings, LLC']
+CITIES = [('Toronto', 'ON'), ('Montreal', 'QC'), ('Vancouver', 'BC'), ('Calgary', 'AB'),
+          ('Ottawa', 'ON'), ('Halifax', 'NS'), ('Winnipeg', 'MB'), ('Québec', 'QC')]
+DOMAINS = ['gmail.com', 'hotmail.com', 'yahoo.ca', 'rogers.com', 'sympatico.ca', 'example.org']
+CATEGORIES = ['Hardware', 'Plumbing', 'Electrical', 'Paint', 'Garden', 'Tools', 'Lighting',
+              'Flooring', 'Kitchen', 'Bath', 'Seasonal', 'Automotive']
+BRANDS = ['Acme', 'Stanley', 'DeWalt', 'Makita', 'Benjamin Moore', 'Moen', 'Philips', '']
+TRANS_TYPES = ['SALE', 'SALE', 'SALE', 'SALE', 'SALE', 'SALE', 'SALE', 'SALE', 'RETURN', 'LAYAWAY']
+
+def messy_phone(rng):
+    """A phone number in one of the formats found in the POS data"""
+    area, exchange, line = rng.randint(200, 999), rng.randint(200, 999), rng.randint(0, 9999)
+    return rng.choice([
+        f"({area}) {exchange}-{line:04d}",
+        f"{area}-{exchange}-{line:04d}",
+        f"{area}.{exchange}.{line:04d}",
+        f"{area}{exchange}{line:04d}",
+        f"+1 {area} {exchange} {line:04d}",
+        f"{exchange}-{line:04d}",
+        f"{area} {exchange} {line:04d} ext. {rng.randint(1, 999)}",
+        '',
+        ''
+    ])
+
+def messy_email(rng, first, last):
+    """An email address: mostly valid, sometimes malformed, often missing"""
+    if rng.random() >= EMAIL_RATE:
+        return ''
+    local = f"{first}.{last}".lower().replace(' ', '').replace("'", '')
+    domain = rng.choice(DOMAINS)
+    if rng.random() < BAD_EMAIL_RATE:
+        return rng.choice([f"{local}@", f"{local} at {domain}", f"{local}@{domain.split('.')[0]}",
+                           f"@{domain}", f"{local}@@{domain}"])
+    local += str(rng.randint(1, 9999))
+    return rng.choice([f"{local}@{domain}", f" {local.upper()}@{domain} ", f"{local}@{domain}"])
+
+def messy_date(rng, value):
+    """A date in one of the formats Aralco exports contain"""
+    return rng.choice([
+        value.strftime('%Y-%m-%d %H:%M:%S') + '.000',
+        value.strftime('%Y-%m-%d %H:%M:%S'),
+        value.strftime('%Y-%m-%d'),
+        value.strftime('%m/%d/%Y'),
+        value.strftime('%d/%m/%Y') if value.day > 12 else value.strftime('%m/%d/%Y'),
+    ])
+
+def messy_currency(rng, amount):
+    """A money amount, sometimes with symbols, separators or junk"""
+    roll = rng.random()
+    if roll < 0.70:
+        return f"{amount:.2f}"
+    if roll < 0.85:
+        return f"${amount:,.2f}"
+    if roll < 0.92:
+        return f"{amount:.4f}"
+    if roll < 0.97:
+        return ''
+    return rng.choice(['N/A', '-', '1,00', '$'])
+
+def skewed_id(rng, count):
+    """An ID in 1..count where low IDs are much more popular (best sellers, regulars)"""
+    return min(count, int(rng.paretovariate(1.1)))  if rng.random() < 0.3 else rng.randint(1, count)
+
+def customer_rows(rng, count):
+    recent = deque(maxlen=1000)
+    for customer_id in range(1, count + 1):
+        if recent and rng.random() < DUPLICATE_RATE:
+            # Re-entered at the till: same details, differently typed email
+            row = dict(rng.choice(recent))
+            row['CustomerID'] = customer_id
+            row['POSCustomerID'] = POS_CUSTOMER_BASE + customer_id
+            row['CustomerNo'] = f"C{customer_id:07d}"
+            row['Email'] = row['Email'].upper()
+            yield row
+            continue
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        company = f"{last} {rng.choice(COMPANY_SUFFIXES)}" if rng.random() < 0.15 else ''
+        if company and rng.random() < 0.7:
+            first = last = ''
+        city, province = rng.choice(CITIES)
+        created = HISTORY_START + timedelta(days=rng.randint(0, HISTORY_DAYS), seconds=rng.randint(0, 86399))
+        last_purchase = created + timedelta(days=rng.randint(0, 900))
+        row = {
+            'CustomerID': customer_id,
+            'POSCustomerID': POS_CUSTOMER_BASE + customer_id,
+            'CustomerNo': f"C{customer_id:07d}",
+            'FirstName': first,
+            'LastName': last,
+            'CompanyName': company,
+            'Email': messy_email(rng, first or 'info', last or company.split(' ')[0]),
+            'Phone': messy_phone(rng),
+            'Fax': messy_phone(rng) if rng.random() < 0.05 else '',
+            'Cellular': messy_phone(rng) if rng.random() < 0.4 else '',
+            'Address1': f"{rng.randint(1, 9999)} {rng.choice(LAST_NAMES)} St.",
+            'City': city,
+            'ProvinceState': province,
+            'PostalCode': f"{rng.choice('KLMNHJ')}{rng.randint(0, 9)}{rng.choice('ABCEGH')} {rng.randint(0, 9)}{rng.choice('JKLMNP')}{rng.randint(0, 9)}",
+            'Country': rng.choice(['Canada', 'Canada', 'Canada', 'CA', '']),
+            'CreditLimit': messy_currency(rng, rng.choice([0, 0, 500, 1000, 2500, 10000])),
+            'AccountBalance': messy_currency(rng, rng.uniform(-200, 3000)),
+            'Points': rng.randint(0, 20000) if rng.random() < 0.6 else '',
+            'LastPurchase': messy_date(rng, last_purchase) if rng.random() < 0.8 else '',
+            'Remark': rng.choice(['', '', '', 'VIP', 'Pays by cheque, call first', 'Line one\nLine two', 'Says "no flyers"']),
+            'CreatedDate': created.strftime('%Y-%m-%d %H:%M:%S'),
+            'LastUpdated': (last_purchase + timedelta(seconds=rng.randint(0, 86399))).strftime('%Y-%m-%d %H:%M:%S')
+        }
+        recent.append(row)
+        yield row
+
+def product_rows(rng, count):
+    for product_id in range(1, count + 1):
+        category = rng.choice(CATEGORIES)
+        cost = round(rng.lognormvariate(2.5, 1.0), 2)
+        created = HISTORY_START + timedelta(days=rng.randint(0, HISTORY_DAYS))
+        yield {
+            'ProductID': product_id,
+            'Code': f"{category[:3].upper()}-{product_id:06d}",
+            'Description': f"{rng.choice(BRANDS)} {category} item {product_id}".strip() if rng.random() < 0.97 else '',
+            'ShortDescription': f"{category} item" if rng.random() < 0.5 else '',
+            'Category1': category,
+            'Category2': f"{category} - {rng.choice(['Basic', 'Pro', 'Contractor'])}",
+            'Category3': '',
+            'Department': rng.choice(['Retail', 'Contractor', 'Online']),
+            'Supplier': f"SUP{rng.randint(1, DIMENSION_COUNTS['Supplier']):03d}",
+            'Brand': rng.choice(BRANDS),
+            'UPC': f"{rng.randint(0, 10 ** 12 - 1):012d}" if rng.random() < 0.8 else '',
+            'Weight': f"{rng.uniform(0.1, 40):.2f}" if rng.random() < 0.6 else '',
+            'Cost': messy_currency(rng, cost),
+            'SellPrice': messy_currency(rng, cost * rng.uniform(1.2, 2.5)),
+            'OnHand': rng.randint(-5, 500),
+            'Status': 'A' if rng.random() < 0.85 else 'I',
+            'CreatedDate': created.strftime('%Y-%m-%d %H:%M:%S'),
+            'LastUpdate': (created + timedelta(days=rng.randint(0, 365))).strftime('%Y-%m-%d %H:%M:%S')
+        }
+
+def transaction_rows(rng, head_count, customer_count, product_count):
+    """Yield (header, items) with headers in POSTransHeadID (and date) order"""
+    item_id = 0
+    step = HISTORY_DAYS * 86400 / max(1, head_count)
+    for head_id in range(1, head_count + 1):
+        trans_date = HISTORY_START + timedelta(seconds=int(head_id * step))
+        lines = rng.choices(ITEMS_PER_TRANSACTION, ITEMS_WEIGHTS)[0]
+        items = []
+        subtotal = 0.0
+        for line_no in range(1, lines + 1):
+            item_id += 1
+            quantity = rng.choice([1, 1, 1, 2, 3, 5, 0.5])
+            price = round(rng.lognormvariate(2.8, 0.9), 2)
+            subtotal += quantity * price
+            items.append({
+                'POSTransItemID': item_id,
+                'POSTransHeadID': head_id,
+                'ProductID': skewed_id(rng, product_count),
+                'LineNo': line_no,
+                'Quantity': quantity,
+                'SellPrice': messy_currency(rng, price),
+                'Cost': messy_currency(rng, price * 0.6),
+                'DiscountAmount': '0.00' if rng.random() < 0.9 else f"{price * 0.1:.2f}",
+                'Tax1': f"{quantity * price * 0.05:.2f}",
+                'Tax2': f"{quantity * price * 0.08:.2f}",
+                'Description': '',
+                'IsReturn': 1 if rng.random() < 0.02 else 0
+            })
+        header = {
+            'POSTransHeadID': head_id,
+            'TransNo': f"T{head_id:08d}",
+            'TransDate': messy_date(rng, trans_date),
+            'CustomerID': '' if rng.random() < WALK_IN_RATE else POS_CUSTOMER_BASE + skewed_id(rng, customer_count),
+            'StoreID': rng.randint(1, 6),
+            'RegisterID': rng.randint(1, 4),
+            'EmployeeID': rng.randint(1, 60),
+            'SubTotal': messy_currency(rng, subtotal),
+            'DiscountAmount': '0.00',
+            'Tax1': f"{subtotal * 0.05:.2f}",
+            'Tax2': f"{subtotal * 0.08:.2f}",
+            'Total': messy_currency(rng, subtotal * 1.13),
+            'TransType': rng.choice(TRANS_TYPES),
+            'Status': 'C' if rng.random() < 0.95 else rng.choice(['H', 'V']),
+            'CreatedDate': trans_date.strftime('%Y-%m-%d %H:%M:%S')
+        }
+        # What the extraction resolves the POS customer code to
+        header['AccountCustomerID'] = header['CustomerID'] - POS_CUSTOMER_BASE if header['CustomerID'] else ''
+        yield header, items
+
+def inventory_rows(rng, product_count, count):
+    """Per-store stock rows in (ProductID, StoreID) order, about ``count`` of them"""
+    stores = DIMENSION_COUNTS['Store']
+    rate = min(1.0, count / (product_count * stores))
+    for product_id in range(1, product_count + 1):
+        for store_id in range(1, stores + 1):
+            if rng.random() >= rate:
+                continue
+            on_hand = rng.randint(-3, 250)
+            min_qty = rng.choice([0, 2, 5, 10])
+            received = HISTORY_START + timedelta(days=rng.randint(0, HISTORY_DAYS - 90))
+            yield {
+                'ProductID': product_id,
+                'StoreID': store_id,
+                # Quantities are decimal(18,4) in Aralco
+                'OnHand': f"{on_hand}.0000" if rng.random() < 0.3 else on_hand,
+                'Available': max(0, on_hand - rng.choice([0, 0, 0, 1, 2])),
+                'OnOrder': rng.choice([0, 0, 0, 12, 24, 48]),
+                'MinQty': min_qty,
+                'MaxQty': min_qty * 10 if min_qty else '',
+                'LastReceived': messy_date(rng, received),
+                'LastSold': messy_date(rng, received + timedelta(days=rng.randint(0, 90)))
+                if rng.random() < 0.8 else ''
+            }
+
+def dimension_rows(rng):
+    """Store, Employee and Supplier reference rows: {table: (columns, rows)}"""
+    stores = [(i, f"{city} #{i}", city) for i, (city, _) in
+              enumerate(rng.sample(CITIES, DIMENSION_COUNTS['Store']), start=1)]
+    employees = [(i, rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES), rng.randint(1, DIMENSION_COUNTS['Store']))
+                 for i in range(1, DIMENSION_COUNTS['Employee'] + 1)]
+    suppliers = [(i, f"SUP{i:03d}", f"{rng.choice(LAST_NAMES)} {rng.choice(COMPANY_SUFFIXES)}")
+                 for i in range(1, DIMENSION_COUNTS['Supplier'] + 1)]
+    return {
+        'Store': (['StoreID', 'Name', 'City'], stores),
+        'Employee': (['EmployeeID', 'FirstName', 'LastName', 'StoreID'], employees),
+        'Supplier': (['SupplierID', 'Code', 'Name'], suppliers)
+    }
+
+def _writer(output_dir, table):
+    f = open(os.path.join(output_dir, f"{table}.csv"), 'w', newline='', encoding='utf-8')
+    writer = csv.DictWriter(f, fieldnames=staging_columns(table))
+    writer.writeheader()
+    return f, writer
+
+def generate(scale=1.0, output_dir=None, seed=DEFAULT_SEED):
+    """Write the staging files for ``scale`` times production volume.
+
+    The same scale and seed always produce byte-identical files. Files use
+    the --extract layout (header row, key order), so they can be passed to
+    transform_data.py --input-dir.
+    """
+    output_dir = output_dir or os.path.join(SYNTHETIC_DIR, f"{scale:g}x")
+    os.makedirs(output_dir, exist_ok=True)
+    counts = {table: max(1, int(round(base * scale))) for table, base in BASE_COUNTS.items()}
+    print(f"🔄 Generating {scale:g}x synthetic data in {output_dir}/...")
+
+    # One generator per table so each file is reproducible on its own
+    f, writer = _writer(output_dir, 'Customer')
+    with f:
+        writer.writerows(customer_rows(random.Random(f"{seed}-Customer"), counts['Customer']))
+
+    f, writer = _writer(output_dir, 'Product')
+    with f:
+        writer.writerows(product_rows(random.Random(f"{seed}-Product"), counts['Product']))
+
+    heads, head_writer = _writer(output_dir, 'POSTransHead')
+    items, item_writer = _writer(output_dir, 'POSTransItem')
+    item_count = 0
+    with heads, items:
+        rng = random.Random(f"{seed}-POSTrans")
+        for header, lines in transaction_rows(rng, counts['POSTransHead'], counts['Customer'], counts['Product']):
+            head_writer.writerow(header)
+            item_writer.writerows(lines)
+            item_count += len(lines)
+    counts['POSTransItem'] = item_count
+
+    f, writer = _writer(output_dir, 'Inventory')
+    stock_count = 0
+    with f:
+        for row in inventory_rows(random.Random(f"{seed}-Inventory"), counts['Product'], counts['Inventory']):
+            writer.writerow(row)
+            stock_count += 1
+    counts['Inventory'] = stock_count
+
+    for table, count in counts.items():
+        print(f"✅ {table}: {count} rows")
+    return output_dir, counts
+
+def write_sqlite(input_dir, path):
+    """Load the staging files into a SQLite stand-in for AralcoPOS.
+
+    ID columns are INTEGER so keyset pages sort numerically as on SQL
+    Server; other columns keep the generated text, and empty values are
+    stored as NULL.
+    """
+    if os.path.exists(path):
+        os.remove(path)
+    conn = sqlite3.connect(path)
+    try:
+        for table, spec in EXTRACT_TABLES.items():
+            columns = spec['columns']
+            definitions = ", ".join(f"[{c}] INTEGER" if c.endswith('ID') else f"[{c}]" for c in columns)
+            keys = ", ".join(f"[{k}]" for k in spec['key'])
+            conn.execute(f"CREATE TABLE [{table}] ({definitions}, PRIMARY KEY ({keys}))")
+            # Resolved lookup columns follow the table's own in the staging file
+            with open(os.path.join(input_dir, f"{table}.csv"), 'r', newline='', encoding='utf-8') as f:
+                reader = csv.reader(f)
+                next(reader)
+                conn.executemany(f"INSERT INTO [{table}] VALUES ({', '.join('?' * len(columns))})",
+                                 ([v if v != '' else None for v in row[:len(columns)]] for row in reader))
+            for other, key, _, _ in spec.get('lookups', {}).values():
+                conn.execute(f"CREATE INDEX IF NOT EXISTS [IX_{other}_{key}] ON [{other}] ([{key}])")
+            conn.commit()
+        # Reference tables for dimension_cache.py (no Category/Department tables:
+        # products carry category names, which pass through)
+        for table, (columns, rows) in dimension_rows(random.Random(DEFAULT_SEED)).items():
+            definitions = ", ".join(f"[{c}] INTEGER" if c.endswith('ID') else f"[{c}]" for c in columns)
+            conn.execute(f"CREATE TABLE [{table}] ({definitions}, PRIMARY KEY ([{columns[0]}]))")
+            conn.executemany(f"INSERT INTO [{table}] VALUES ({', '.join('?' * len(columns))})", rows)
+        conn.commit()
+    finally:
+        conn.close()
+    print(f"✅ SQLite stand-in written to {path}")
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Generate synthetic Aralco staging files")
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help="multiple of production volume (1 = 13,111 customers ... 49,788 line items)")
+    parser.add_argument('--output-dir', help=f"default: {SYNTHETIC_DIR}/<scale>x")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--sqlite', metavar='PATH',
+                        help="also load the data into a SQLite stand-in for AralcoPOS "
+                             "(for analyze_database.py --extract --sqlite and pipeline.py --sqlite)")
+    return parser.parse_args()
+
+def main():
+    """Generate the synthetic data set"""
+    args = parse_args()
+    print("🚀 Starting synthetic data generation...")
+    output_dir, _ = generate(args.scale, args.output_dir, args.seed)
+    if args.sqlite:
+        write_sqlite(output_dir, args.sqlite)
+    print(f"\n✅ Generation complete! Use: python3 transform_data.py --input-dir {output_dir}")
+
+if __name__ == "__main__":
+    main()
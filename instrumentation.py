@@ -0,0 +1,183 @@
+"""
+Stage timing and resource instrumentation for the extract, transform and load scripts
+Records wall/CPU time, rows/sec, bytes read and written and RSS per stage as JSON, with the
+process-lifetime peak RSS of this process and of its child processes
+"""
+
+import cProfile
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+try:
+    import pyinstrument
+except ImportError:  # The pyinstrument profiler is optional
+    pyinstrument = None
+
+PROFILERS = ['cprofile', 'pyinstrument']
+
+def _rss_mb():
+    """Current resident set size in MB (Linux), or None"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def _peak_rss_mb(children=False):
+    """Peak resident set size in MB since the process started, or None.
+
+    This is a high-water mark over the whole process lifetime, not over a
+    stage. With ``children`` it is the peak of the largest finished child
+    process (e.g. a --workers shard) instead.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024  # bytes on macOS, KB elsewhere
+
+def _io_bytes():
+    """Bytes read and written by the process so far (Linux), or (None, None)"""
+    try:
+        with open('/proc/self/io') as f:
+            counters = dict(line.split(': ') for line in f.read().splitlines())
+        return int(counters['rchar']), int(counters['wchar'])
+    except (OSError, KeyError, ValueError):
+        return None, None
+
+class Instrumentation:
+    """Collects per-stage measurements and per-function call timers.
+
+    Resource figures (bytes read/written, RSS) are process-wide, so stages
+    that overlap in threads share them. ``process_peak_rss_mb`` and
+    ``children_peak_rss_mb`` are lifetime peaks as of the end of a stage,
+    so they only tell a stage's own peak when it raised them.
+    """
+
+    def __init__(self, function_timers=False):
+        self.function_timers = function_timers
+        self.started = datetime.now()
+        self.stages = []
+        self.timers = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name, **info):
+        """Measure a ``with`` block; set ``record['rows']`` inside it for rows/sec"""
+        record = {'stage': name, 'rows': None}
+        record.update(info)
+        read_start, written_start = _io_bytes()
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            seconds = time.perf_counter() - wall_start
+            read_end, written_end = _io_bytes()
+            record['seconds'] = round(seconds, 6)
+            record['cpu_seconds'] = round(time.process_time() - cpu_start, 6)
+            if record['rows'] is not None:
+                record['rows_per_sec'] = round(record['rows'] / seconds, 1) if seconds > 0 else None
+            if read_start is not None:
+                record['bytes_read'] = read_end - read_start
+                record['bytes_written'] = written_end - written_start
+            record['rss_mb'] = _rss_mb()
+            record['process_peak_rss_mb'] = _peak_rss_mb()
+            if record['rss_mb'] is not None and record['process_peak_rss_mb'] is not None:
+                record['process_peak_rss_mb'] = max(record['rss_mb'], record['process_peak_rss_mb'])
+            record['children_peak_rss_mb'] = _peak_rss_mb(children=True)
+            with self._lock:
+                self.stages.append(record)
+
+    def add(self, record):
+        """Record a stage measured elsewhere (e.g. by a scheduler)"""
+        with self._lock:
+            self.stages.append(record)
+
+    def timer(self, name, func):
+        """Wrap ``func`` to count its calls and accumulate their time.
+
+        Returns ``func`` unchanged when function timers are off, so hot
+        paths such as the normalizers pay nothing by default.
+        """
+        if not self.function_timers:
+            return func
+        entry = self.timers.setdefault(name, {'calls': 0, 'nanoseconds': 0})
+
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            start = time.perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                entry['calls'] += 1
+                entry['nanoseconds'] += time.perf_counter_ns() - start
+        return timed
+
+    @contextmanager
+    def profile(self, profiler, output_file):
+        """Run a ``with`` block under cProfile or pyinstrument, saving the report"""
+        if profiler is None:
+            yield
+            return
+        if profiler == 'pyinstrument' and pyinstrument is None:
+            print("⚠️  pyinstrument is not installed, profiling with cProfile")
+            profiler = 'cprofile'
+
+        os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+        if profiler == 'pyinstrument':
+            session = pyinstrument.Profiler()
+            session.start()
+            try:
+                yield
+            finally:
+                session.stop()
+                output_file = f"{os.path.splitext(output_file)[0]}.html"
+                with open(output_file, 'w') as f:
+                    f.write(session.output_html())
+        else:
+            session = cProfile.Profile()
+            session.enable()
+            try:
+                yield
+            finally:
+                session.disable()
+                output_file = f"{os.path.splitext(output_file)[0]}.prof"
+                session.dump_stats(output_file)
+        print(f"📊 Profile written to {output_file}")
+
+    def summary(self):
+        """All measurements as a JSON-serializable dict"""
+        timers = {}
+        for name, entry in sorted(self.timers.items()):
+            seconds = entry['nanoseconds'] / 1e9
+            timers[name] = {
+                'calls': entry['calls'],
+                'seconds': round(seconds, 6),
+                'microseconds_per_call': round(seconds * 1e6 / entry['calls'], 3) if entry['calls'] else None
+            }
+        return {
+            'started': self.started.isoformat(),
+            'finished': datetime.now().isoformat(),
+            'process_peak_rss_mb': _peak_rss_mb(),
+            'children_peak_rss_mb': _peak_rss_mb(children=True),
+            'stages': self.stages,
+            'function_timers': timers
+        }
+
+    def write(self, output_file):
+        """Write the measurements as JSON"""
+        os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+        with open(output_file, 'w') as f:
+            json.dump(self.summary(), f, indent=2)
+        print(f"📊 Instrumentation written to {output_file}")
@@ -0,0 +1,537 @@
+#!/usr/bin/env python3
+"""
+Aralco to Salesforce Bulk API 2.0 Loader
+Uploads the exports/salesforce_ready/ files as concurrent Bulk API 2.0 ingest jobs
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+import xml.etree.ElementTree as ET
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from instrumentation import PROFILERS, Instrumentation
+from output_writer import import_parts, manifest_file, open_import, verify_parts
+from xref_index import XREF_INDEX_FILE, build_from_results
+
+# Salesforce connection (an OAuth access token, e.g. from `sfdx force:org:display`)
+INSTANCE_URL = os.environ.get('SF_INSTANCE_URL', '')
+ACCESS_TOKEN = os.environ.get('SF_ACCESS_TOKEN', '')
+API_VERSION = 'v60.0'
+
+# Data Loader process definitions; paths in it are relative to its directory
+PROCESS_CONF = 'dataloader/process-conf.xml'
+
+# Processes loaded by default. The scheduler derives the actual order from
+# the external-ID lookup columns of each import file.
+LOAD_ORDER = ['accountImport', 'productImport', 'pricebookImport', 'orderImport', 'orderItemImport',
+              'storeInventoryImport', 'productInventoryImport']
+
+# Bulk API 2.0 accepts up to 150MB of CSV per job; stay under it since the
+# limit applies after Salesforce's own encoding of the upload
+MAX_JOB_BYTES = 100 * 1024 * 1024
+
+# Ingest jobs in flight at once
+DEFAULT_WORKERS = 4
+
+# Job status polling: first delay, backoff factor, longest delay, give up after
+POLL_INITIAL = 1.0
+POLL_BACKOFF = 2.0
+POLL_MAX = 30.0
+POLL_TIMEOUT = 3600
+
+# Final job states
+JOB_DONE_STATES = ['JobComplete', 'Failed', 'Aborted']
+
+class BulkApiError(Exception):
+    """A Bulk API request failed"""
+
+class BulkClient:
+    """Minimal Bulk API 2.0 ingest client over urllib"""
+
+    def __init__(self, instance_url=INSTANCE_URL, access_token=ACCESS_TOKEN, api_version=API_VERSION):
+        self.base_url = f"{instance_url.rstrip('/')}/services/data/{api_version}/jobs/ingest"
+        self.access_token = access_token
+
+    def _request(self, method, path='', body=None, content_type='application/json'):
+        if isinstance(body, dict):
+            body = json.dumps(body).encode('utf-8')
+        request = urllib.request.Request(f"{self.base_url}{path}", data=body, method=method)
+        request.add_header('Authorization', f"Bearer {self.access_token}")
+        request.add_header('Accept', 'application/json')
+        if body is not None:
+            request.add_header('Content-Type', content_type)
+        try:
+            return urllib.request.urlopen(request)
+        except urllib.error.HTTPError as e:
+            raise BulkApiError(f"{method} {path or '/'}: HTTP {e.code} {e.read().decode('utf-8', 'replace')}")
+
+    def _json(self, method, path='', body=None):
+        with self._request(method, path, body) as response:
+            return json.load(response)
+
+    def create_job(self, sobject, operation, external_id_field=None):
+        """Open an ingest job and return its id"""
+        job = {
+            'object': sobject,
+            'operation': operation,
+            'contentType': 'CSV',
+            'lineEnding': 'CRLF'  # csv.writer's default line terminator
+        }
+        if operation == 'upsert':
+            job['externalIdFieldName'] = external_id_field
+        return self._json('POST', '', job)['id']
+
+    def upload(self, job_id, data):
+        """Upload the job's CSV data and mark the upload complete"""
+        self._request('PUT', f"/{job_id}/batches", data, 'text/csv').close()
+        self._json('PATCH', f"/{job_id}", {'state': 'UploadComplete'})
+
+    def wait(self, job_id, timeout=POLL_TIMEOUT):
+        """Poll the job with exponential backoff until it finishes"""
+        delay = POLL_INITIAL
+        deadline = time.monotonic() + timeout
+        while True:
+            info = self._json('GET', f"/{job_id}")
+            if info['state'] in JOB_DONE_STATES:
+                return info
+            if time.monotonic() >= deadline:
+                raise BulkApiError(f"Job {job_id} still {info['state']} after {timeout}s")
+            time.sleep(delay)
+            delay = min(delay * POLL_BACKOFF, POLL_MAX)
+
+    def results(self, job_id, kind):
+        """Yield the rows of a job's successfulResults or failedResults, header first"""
+        with self._request('GET', f"/{job_id}/{kind}/") as response:
+            yield from csv.reader(io.TextIOWrapper(response, encoding='utf-8', newline=''))
+
+    def abort(self, job_id):
+        """Abort a job that could not be uploaded"""
+        try:
+            self._json('PATCH', f"/{job_id}", {'state': 'Aborted'})
+        except Exception:
+            pass
+
+def load_process_conf(conf_file=PROCESS_CONF):
+    """Read the Data Loader beans, with file paths resolved from the repo root"""
+    base_dir = os.path.dirname(os.path.abspath(conf_file))
+    processes = {}
+    for bean in ET.parse(conf_file).getroot().iter('bean'):
+        entries = {entry.get('key'): entry.get('value') for entry in bean.iter('entry')}
+        processes[bean.get('id')] = {
+            'object': entries['sfdc.entity'],
+            'operation': entries.get('process.operation', 'insert'),
+            'external_id': entries.get('sfdc.externalIdField'),
+            'input': os.path.relpath(os.path.join(base_dir, entries['dataAccess.name'])),
+            'success': os.path.relpath(os.path.join(base_dir, entries['process.outputSuccess'])),
+            'error': os.path.relpath(os.path.join(base_dir, entries['process.outputError']))
+        }
+    return processes
+
+def split_csv(input_file, max_bytes=MAX_JOB_BYTES, ref_columns=()):
+    """Yield the file (or gzipped part) as CSV payloads of at most ``max_bytes``, each with the header.
+
+    Records are split on record boundaries (quoted newlines included), so
+    only one payload is held in memory at a time. Each payload comes with
+    the values it holds in ``ref_columns``, as ``{column: set(values)}``.
+    """
+    with open_import(input_file) as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        positions = {column: header.index(column) for column in ref_columns}
+        refs = {column: set() for column in positions}
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(header)
+        header_size = size = len(buffer.getvalue().encode('utf-8'))
+        for row in reader:
+            start = buffer.tell()
+            writer.writerow(row)
+            buffer.seek(start)
+            record = buffer.read()
+            record_size = len(record.encode('utf-8'))
+            if size + record_size > max_bytes and size > header_size:
+                buffer.seek(start)
+                buffer.truncate()
+                yield buffer.getvalue().encode('utf-8'), refs
+                refs = {column: set() for column in positions}
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                writer.writerow(header)
+                buffer.write(record)
+                size = header_size
+            size += record_size
+            for column, position in positions.items():
+                if position < len(row) and row[position]:
+                    refs[column].add(row[position])
+        if size > header_size:
+            yield buffer.getvalue().encode('utf-8'), refs
+
+def split_parts(parts, max_bytes=MAX_JOB_BYTES, ref_columns=()):
+    """split_csv over each part of an import file in turn.
+
+    A function rather than a generator expression, so the arguments are
+    bound when the scheduler sets a process up, not when it reads it.
+    """
+    for part in parts:
+        yield from split_csv(part, max_bytes, ref_columns)
+
+class ResultWriter:
+    """Appends job results to the Data Loader style success and error files.
+
+    Success rows are ``ID, <fields>, STATUS`` and error rows
+    ``<fields>, ERROR``, as in results/*Success.csv and results/*Error.csv.
+    """
+
+    def __init__(self, success_file, error_file, id_field=None):
+        os.makedirs(os.path.dirname(success_file) or '.', exist_ok=True)
+        os.makedirs(os.path.dirname(error_file) or '.', exist_ok=True)
+        self._success = open(success_file, 'w', newline='', encoding='utf-8')
+        self._error = open(error_file, 'w', newline='', encoding='utf-8')
+        self._success_writer = csv.writer(self._success)
+        self._error_writer = csv.writer(self._error)
+        self._header_written = set()
+        self._lock = threading.Lock()
+        self.id_field = id_field
+        self.successes = 0
+        self.errors = 0
+
+    def write_success(self, rows):
+        """Write successful rows; returns their ``id_field`` values"""
+        rows = iter(rows)
+        header = next(rows, None)
+        if header is None:
+            return []
+        created, fields = header.index('sf__Created'), header[2:]
+        id_position = header.index(self.id_field) if self.id_field in fields else None
+        committed = []
+        with self._lock:
+            if 'success' not in self._header_written:
+                self._success_writer.writerow(['ID'] + fields + ['STATUS'])
+                self._header_written.add('success')
+            for row in rows:
+                status = 'Item Created' if row[created] == 'true' else 'Item Updated'
+                self._success_writer.writerow([row[0]] + row[2:] + [status])
+                self.successes += 1
+                if id_position is not None:
+                    committed.append(row[id_position])
+        return committed
+
+    def write_error(self, rows):
+        rows = iter(rows)
+        header = next(rows, None)
+        if header is None:
+            return
+        error, fields = header.index('sf__Error'), header[2:]
+        with self._lock:
+            if 'error' not in self._header_written:
+                self._error_writer.writerow(fields + ['ERROR'])
+                self._header_written.add('error')
+            for row in rows:
+                self._error_writer.writerow(row[2:] + [row[error]])
+                self.errors += 1
+
+    def close(self):
+        self._success.close()
+        self._error.close()
+
+def run_job(client, process, data, results):
+    """Create, upload, await and collect one ingest job.
+
+    Returns the final job info and the external IDs Salesforce committed.
+    """
+    job_id = client.create_job(process['object'], process['operation'], process['external_id'])
+    try:
+        client.upload(job_id, data)
+    except Exception:
+        client.abort(job_id)
+        raise
+    info = client.wait(job_id)
+    committed = results.write_success(client.results(job_id, 'successfulResults'))
+    results.write_error(client.results(job_id, 'failedResults'))
+    return info, committed
+
+def reference_columns(input_file):
+    """Map an import file's external-ID lookup columns to the objects they reference.
+
+    ``Product2.Aralco_Product_ID__c`` references Product2; the relationship
+    names used in the import files are the object names.
+    """
+    parts = import_parts(input_file)
+    if not parts:
+        return {}
+    with open_import(parts[0]) as f:
+        header = next(csv.reader(f), [])
+    return {column: column.split('.', 1)[0] for column in header if '.' in column}
+
+def build_load_graph(processes, names):
+    """Parent processes of each process, keyed by the lookup column referencing them.
+
+    Lookups to objects no selected process loads (e.g. Pricebook2) are
+    assumed to exist already. The first process of an object loads it; a
+    later one (the inventory rollup of Product2) updates the same records
+    and waits for them, keyed by its external ID column. Returns the graph
+    and a topological order.
+    """
+    by_object = {}
+    for name in names:
+        by_object.setdefault(processes[name]['object'], name)
+    graph = {}
+    for name in names:
+        graph[name] = {}
+        for column, sobject in reference_columns(processes[name]['input']).items():
+            parent = by_object.get(sobject)
+            if parent and parent != name:
+                graph[name][column] = parent
+        owner = by_object[processes[name]['object']]
+        if owner != name and processes[name]['external_id']:
+            graph[name][processes[name]['external_id']] = owner
+
+    order = []
+    remaining = list(names)
+    while remaining:
+        ready = [n for n in remaining if all(p in order for p in graph[n].values())]
+        if not ready:
+            raise ValueError(f"Circular lookups between {', '.join(remaining)}")
+        order.extend(ready)
+        remaining = [n for n in remaining if n not in ready]
+    return graph, order
+
+class _ProcessState:
+    """Scheduling state of one process"""
+
+    def __init__(self, process, chunks):
+        self.process = process
+        self.chunks = chunks
+        self.waiting = []
+        self.in_flight = 0
+        self.exhausted = False
+        self.done = False
+        self.committed = set()
+        self.results = ResultWriter(process['success'], process['error'], process['external_id'])
+        self.jobs = 0
+        self.failed_jobs = 0
+        self.bytes_uploaded = 0
+        self.started = None
+        self.finished = None
+
+class LoadScheduler:
+    """Runs ingest jobs for several processes over one pool of workers.
+
+    Processes without lookups between them load side by side. A child
+    payload (e.g. a slice of order_items_import.csv) is submitted as soon
+    as every parent record it references by external ID has been
+    committed, or its parent process has finished, instead of waiting for
+    the whole parent load.
+    """
+
+    def __init__(self, client, processes, names, workers=DEFAULT_WORKERS, max_bytes=MAX_JOB_BYTES):
+        self.client = client
+        self.workers = workers
+        self.graph, self.order = build_load_graph(processes, names)
+        self.state = {}
+        for name in self.order:
+            process = processes[name]
+            # A split import file (transform_data.py --split) loads from its parts
+            parts = import_parts(process['input'])
+            if not parts:
+                print(f"⚠️  {process['input']} not found, skipping {name}")
+                continue
+            if parts != [process['input']]:
+                problems = verify_parts(process['input'])
+                if problems:
+                    print(f"❌ {manifest_file(process['input'])}: {'; '.join(problems)}, skipping {name}")
+                    continue
+            chunks = split_parts(parts, max_bytes, list(self.graph[name]))
+            self.state[name] = _ProcessState(process, chunks)
+        self.futures = {}
+
+    def _ready(self, name, refs):
+        """Whether every parent record a payload references is committed"""
+        for column, ids in refs.items():
+            parent = self.state.get(self.graph[name][column])
+            if parent is None or parent.done or not ids:
+                continue
+            if column.split('.', 1)[-1] != parent.process['external_id']:
+                return False  # Not tracked by external ID; wait for the whole parent
+            if not ids <= parent.committed:
+                return False
+        return True
+
+    def _fill(self):
+        """Read payloads and submit the ready ones, parents first"""
+        for name in self.order:
+            st = self.state.get(name)
+            if st is None or st.done:
+                continue
+            # At most ``workers`` payloads wait per process, bounding memory
+            while not st.exhausted and len(st.waiting) < self.workers:
+                item = next(st.chunks, None)
+                if item is None:
+                    st.exhausted = True
+                else:
+                    st.waiting.append(item)
+            for item in list(st.waiting):
+                if len(self.futures) >= self.workers:
+                    return
+                if self._ready(name, item[1]):
+                    st.waiting.remove(item)
+                    if st.started is None:
+                        st.started = time.perf_counter()
+                        print(f"📤 Loading {st.process['object']} ({name})...")
+                    future = self.executor.submit(run_job, self.client, st.process, item[0], st.results)
+                    self.futures[future] = name
+                    st.in_flight += 1
+                    st.jobs += 1
+                    st.bytes_uploaded += len(item[0])
+            self._check_done(name)
+
+    def _check_done(self, name):
+        st = self.state[name]
+        if st.done or not st.exhausted or st.waiting or st.in_flight:
+            return
+        st.done = True
+        st.finished = time.perf_counter()
+        st.results.close()
+        elapsed = st.finished - (st.started or st.finished)
+        print(f"✅ {st.process['object']}: {st.results.successes} loaded, {st.results.errors} failed "
+              f"in {st.jobs} job(s), {elapsed:.1f}s")
+        if st.failed_jobs:
+            print(f"❌ {st.failed_jobs} {st.process['object']} job(s) did not complete")
+
+    def _collect(self, future):
+        name = self.futures.pop(future)
+        st = self.state[name]
+        st.in_flight -= 1
+        try:
+            info, committed = future.result()
+            st.committed.update(committed)
+            if info['state'] != 'JobComplete':
+                raise BulkApiError(f"Job {info['id']} {info['state']}: {info.get('errorMessage', '')}")
+        except Exception as e:
+            print(f"❌ Error in {name} ingest job: {e}")
+            st.failed_jobs += 1
+        self._check_done(name)
+
+    def run(self):
+        """Load everything; returns per-process stats"""
+        began = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as self.executor:
+                while True:
+                    self._fill()
+                    if not self.futures:
+                        if all(st.done for st in self.state.values()):
+                            break
+                        continue
+                    done, _ = wait(list(self.futures), return_when=FIRST_COMPLETED)
+                    for future in done:
+                        self._collect(future)
+        finally:
+            for st in self.state.values():
+                if not st.done:
+                    st.results.close()
+
+        summary = {}
+        for name, st in self.state.items():
+            summary[name] = {
+                'jobs': st.jobs,
+                'failed_jobs': st.failed_jobs,
+                'successes': st.results.successes,
+                'errors': st.results.errors,
+                'bytes_uploaded': st.bytes_uploaded,
+                'depends_on': sorted(set(self.graph[name].values()) & set(self.state)),
+                'started_at': round((st.started or began) - began, 3),
+                'finished_at': round((st.finished or began) - began, 3)
+            }
+        return summary
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Load exports/salesforce_ready/ files with Bulk API 2.0")
+    parser.add_argument('--process', action='append', dest='processes', choices=LOAD_ORDER,
+                        help="Data Loader process to run (repeatable, default: all)")
+    parser.add_argument('--config', default=PROCESS_CONF,
+                        help="Data Loader process-conf.xml to read files and objects from")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help="ingest jobs run concurrently across all processes")
+    parser.add_argument('--max-job-mb', type=float, default=MAX_JOB_BYTES / (1024 * 1024),
+                        help="largest CSV upload per job, in MB (Salesforce limit: 150)")
+    parser.add_argument('--instance-url', default=INSTANCE_URL,
+                        help="Salesforce instance URL (default: $SF_INSTANCE_URL)")
+    parser.add_argument('--api-version', default=API_VERSION)
+    parser.add_argument('--profile', choices=PROFILERS,
+                        help="profile the run with cProfile or pyinstrument into results/load_profile.*")
+    return parser.parse_args()
+
+def main():
+    """Main load process"""
+    args = parse_args()
+    if not args.instance_url or not ACCESS_TOKEN:
+        print("❌ Set SF_INSTANCE_URL (or --instance-url) and SF_ACCESS_TOKEN")
+        return
+
+    print("🚀 Starting Salesforce Bulk API 2.0 load...")
+    client = BulkClient(args.instance_url, ACCESS_TOKEN, args.api_version)
+    processes = load_process_conf(args.config)
+    max_bytes = int(args.max_job_mb * 1024 * 1024)
+
+    names = [n for n in LOAD_ORDER if n in (args.processes or LOAD_ORDER)]
+
+    instrumentation = Instrumentation()
+    summary = {'load_date': time.strftime('%Y-%m-%dT%H:%M:%S'), 'processes': {}}
+    try:
+        with instrumentation.profile(args.profile, 'results/load_profile'), \
+             instrumentation.stage('load', workers=args.workers) as record:
+            scheduler = LoadScheduler(client, processes, names, max(1, args.workers), max_bytes)
+            summary['processes'] = scheduler.run()
+            record['rows'] = sum(p['successes'] + p['errors'] for p in summary['processes'].values())
+            record['bytes_uploaded'] = sum(p['bytes_uploaded'] for p in summary['processes'].values())
+    except Exception as e:
+        print(f"❌ Error loading: {e}")
+        summary['error'] = str(e)
+    # Per-object timings from the scheduler, as stages of their own
+    for name, result in summary['processes'].items():
+        seconds = result['finished_at'] - result['started_at']
+        instrumentation.add({
+            'stage': f"load:{name}",
+            'rows': result['successes'] + result['errors'],
+            'seconds': round(seconds, 6),
+            'rows_per_sec': round((result['successes'] + result['errors']) / seconds, 1) if seconds > 0 else None,
+            'bytes_uploaded': result['bytes_uploaded']
+        })
+
+    # Record the Salesforce Ids of everything loaded so far for --resolve-ids
+    try:
+        build_from_results({name: processes[name] for name in names})
+        print(f"🔗 Cross-reference index updated: {XREF_INDEX_FILE}")
+    except Exception as e:
+        print(f"❌ Error updating cross-reference index: {e}")
+
+    # Only records in this run's success files count as loaded for --changed-only
+    try:
+        # Lazy import: transform_data is only needed once the load has run
+        from transform_data import HASH_INDEX_FILE, commit_loaded
+        committed = commit_loaded({name: processes[name] for name in summary['processes']})
+        for sobject, count in committed.items():
+            print(f"✅ {sobject}: {count} loaded record(s) committed to {HASH_INDEX_FILE}")
+    except Exception as e:
+        print(f"❌ Error committing loaded record hashes: {e}")
+
+    os.makedirs('results', exist_ok=True)
+    with open('results/load_summary.json', 'w') as f:
+        json.dump(summary, f, indent=2)
+    instrumentation.write('results/instrumentation.json')
+
+    print("\n✅ Load complete! Check results/ for success and error files.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Aralco Mapping Plan Compiler
+Compiles the field mapping CSV into per-object row functions and column plans used by DataTransformer
+"""
+
+import argparse
+import csv
+import os
+import re
+
+try:
+    import numpy as np
+    import pandas as pd
+except ImportError:  # Column plans (batch mode) are optional
+    np = None
+    pd = None
+
+# The mapping is data: every row with a Rule is compiled, in file order, into
+# the import file of its (Source Table, Target Object). Rows without a Rule
+# only document the mapping.
+MAPPING_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            'exports', 'DATA_MAPPING_ARALCO_TO_SALESFORCE.csv')
+
+# Transformer normalizers a row function may call, bound once per transform
+NORMALIZER_NAMES = ['clean_phone', 'clean_email', 'clean_currency', 'clean_quantity', 'transform_date',
+                    'transform_datetime', 'transform_boolean']
+
+# Aralco TransType codes -> Order Type picklist values (as 03_extract_transactions.sql);
+# anything else is 'Other'
+ORDER_TYPES = {'SALE': 'Sale', 'RETURN': 'Return', 'LAYAWAY': 'Layaway', 'QUOTE': 'Quote'}
+
+_LABELS_RE = re.compile(r'\blabels_(\w+)')
+
+def _account_name(is_person, company, first, last, customer_id, length):
+    """Person accounts are named after the person, business accounts after the company"""
+    if is_person:
+        name = f"{(first or '').strip()} {(last or '').strip()}".strip()
+        if not name:
+            name = f"Customer {customer_id}"
+    else:
+        name = company.strip()
+    return name[:length]
+
+# Row rules: (get, source field, argument) -> Python expression of the value.
+# ``get(column, default)`` is the expression reading a source column.
+ROW_RULES = {
+    'copy': lambda get, source, arg: get(source, arg),
+    'const': lambda get, source, arg: repr(arg),
+    'phone': lambda get, source, arg: f"clean_phone({get(source, '')})",
+    'email': lambda get, source, arg: f"clean_email({get(source, '')})",
+    'currency': lambda get, source, arg: f"clean_currency({get(source, '')})",
+    'quantity': lambda get, source, arg: f"clean_quantity({get(source, '')})",
+    'date': lambda get, source, arg: f"transform_date({get(source, '')}, {source!r})",
+    'datetime': lambda get, source, arg: f"transform_datetime({get(source, '')}, {source!r})",
+    'boolean': lambda get, source, arg: f"transform_boolean({get(source, '')})",
+    'active': lambda get, source, arg: f"'true' if {get(source, None)} == {arg or 'A'!r} else 'false'",
+    'order_status': lambda get, source, arg: f"'Completed' if {get(source, None)} == 'C' else 'Draft'",
+    'order_type': lambda get, source, arg: f"order_types.get(str({get(source, '')}).strip().upper(), 'Other')",
+    'suffix': lambda get, source, arg: f"str({get(source, '')}) + {arg!r}",
+    'compound': lambda get, source, arg: f"str({get(source, '')}) + '-' + str({get(arg, '')})",
+    'reference_suffix': lambda get, source, arg: (f"str({get(source, '')}) + {arg!r} "
+                                                  f"if {get(source, '')} != '' else ''"),
+    'label': lambda get, source, arg: f"labels_{arg}.get(str({get(source, '')}), {get(source, '')})",
+    'dimension': lambda get, source, arg: f"labels_{arg}.get(str({get(source, '')}), '')",
+    'merged_account': lambda get, source, arg: f"(merge_map.get(str({get(source, '')}), {get(source, '')}) or {arg!r})",
+    'account_type': lambda get, source, arg: "'PersonAccount' if is_person else 'Business_Account'",
+    'account_name': lambda get, source, arg: (f"account_name(is_person, {get(source, '')}, {get('FirstName', None)}, "
+                                              f"{get('LastName', None)}, {get('CustomerID', 'Unknown')}, {int(arg)})"),
+    'product_name': lambda get, source, arg: f"({get(source, '')} or {get('Code', 'Unknown')})[:{int(arg)}]"
+}
+
+# Shared per-row values and the expression computing them
+ROW_CONTEXT = {
+    'is_person': lambda get: f"not {get('CompanyName', None)} or {get('CompanyName', None)}.strip() == ''"
+}
+
+class _Columns:
+    """What column rules see of a chunk: its columns, the transformer and shared values"""
+
+    def __init__(self, transformer, frame):
+        self.transformer = transformer
+        self.frame = frame
+        self._memo = {}
+
+    def col(self, name, default=''):
+        if name in self.frame:
+            return self.frame[name]
+        return self.constant(default)
+
+    def constant(self, value):
+        return pd.Series([value] * len(self.frame), index=self.frame.index, dtype=object)
+
+    def memo(self, key, build):
+        """Build a column once per chunk (e.g. a phone column feeding two fields)"""
+        if key not in self._memo:
+            self._memo[key] = build()
+        return self._memo[key]
+
+    @property
+    def is_person(self):
+        return self.memo('is_person', lambda: self.col('CompanyName').str.strip() == '')
+
+    def labels(self, codes, dimension, fallback):
+        """Codes mapped to dimension labels; unknown codes become ``fallback`` (a Series or '')"""
+        labels = self.transformer.dimensions.labels(dimension)
+        if not labels:
+            return codes if isinstance(fallback, pd.Series) else self.constant(fallback)
+        resolved = codes.map(labels)
+        return resolved.where(resolved.notna(), fallback)
+
+def _batch(normalizer):
+    """Column rule applying one of the transformer's vectorized normalizers"""
+    def build(c, source, arg):
+        return c.memo((normalizer, source), lambda: getattr(c.transformer, normalizer)(c.col(source)))
+    return build
+
+def _account_name_column(c, source, arg):
+    person_name = (c.col('FirstName').str.strip() + ' ' + c.col('LastName').str.strip()).str.strip()
+    person_name = person_name.where(person_name != '', 'Customer ' + c.col('CustomerID', 'Unknown'))
+    return person_name.where(c.is_person, c.col(source).str.strip()).str[:int(arg)]
+
+def _product_name_column(c, source, arg):
+    description = c.col(source)
+    return description.where(description != '', c.col('Code', 'Unknown')).str[:int(arg)]
+
+def _person_only(rule):
+    """Wrap a column rule so business accounts get ''"""
+    def build(c, source, arg):
+        return COLUMN_RULES[rule](c, source, arg).where(c.is_person, '')
+    return build
+
+# Column rules: (columns, source field, argument) -> output Series for a chunk
+COLUMN_RULES = {
+    'copy': lambda c, source, arg: c.col(source, arg),
+    'const': lambda c, source, arg: c.constant(arg),
+    'phone': _batch('clean_phone_batch'),
+    'email': _batch('clean_email_batch'),
+    'currency': _batch('clean_currency_batch'),
+    'quantity': lambda c, source, arg: c.col(source).map(c.transformer.clean_quantity),
+    'date': lambda c, source, arg: c.transformer.transform_date_batch(c.col(source), source),
+    'datetime': lambda c, source, arg: c.col(source).map(lambda v: c.transformer.transform_datetime(v, source)),
+    'boolean': lambda c, source, arg: c.col(source).map(c.transformer.transform_boolean),
+    'active': lambda c, source, arg: pd.Series(np.where(c.col(source, None) == (arg or 'A'), 'true', 'false'),
+                                               index=c.frame.index),
+    'order_status': lambda c, source, arg: pd.Series(np.where(c.col(source, None) == 'C', 'Completed', 'Draft'),
+                                                     index=c.frame.index),
+    'order_type': lambda c, source, arg: c.col(source).str.strip().str.upper().map(ORDER_TYPES).fillna('Other'),
+    'suffix': lambda c, source, arg: c.col(source) + arg,
+    'compound': lambda c, source, arg: c.col(source) + '-' + c.col(arg),
+    'reference_suffix': lambda c, source, arg: (c.col(source) + arg).where(c.col(source) != '', ''),
+    'label': lambda c, source, arg: c.labels(c.col(source), arg, c.col(source)),
+    'dimension': lambda c, source, arg: c.labels(c.col(source), arg, ''),
+    'merged_account': lambda c, source, arg: c.col(source).map(
+        lambda v: c.transformer.account_merge_map.get(str(v), v) or arg),
+    'account_type': lambda c, source, arg: pd.Series(np.where(c.is_person, 'PersonAccount', 'Business_Account'),
+                                                     index=c.frame.index),
+    'account_name': _account_name_column,
+    'product_name': _product_name_column
+}
+
+def parse_rule(rule):
+    """'person:email' -> (True, 'email', ''), 'copy:Canada' -> (False, 'copy', 'Canada')"""
+    person = rule.startswith('person:')
+    if person:
+        rule = rule[len('person:'):]
+    name, _, arg = rule.partition(':')
+    if name not in ROW_RULES:
+        raise ValueError(f"Unknown mapping rule '{rule}'")
+    return person, name, arg
+
+class MappingPlan:
+    """Compiled transform of one source table into one Salesforce import file.
+
+    ``row_function`` generates and compiles a Python function per input
+    column layout: column positions are resolved once, absent columns
+    become constants, normalizers are bound as locals and values shared by
+    several fields (a phone used twice, the person-account test) are
+    computed once per row. ``columns`` builds the same output for a pandas
+    chunk in batch mode.
+    """
+
+    def __init__(self, source, target, mappings):
+        self.source = source
+        self.target = target
+        # [(target field, source field, person only, rule, argument)]
+        self.mappings = mappings
+        self.fields = [m[0] for m in mappings]
+        self._code = {}
+
+    def __repr__(self):
+        return f"MappingPlan({self.source!r} -> {self.target!r}, {len(self.fields)} fields)"
+
+    def source_code(self, header=None):
+        """Python source of the row function factory: rows are lists in ``header``
+        order, or dicts when ``header`` is None"""
+        if header is None:
+            def get(column, default):
+                return f"r.get({column!r}, {default!r})"
+        else:
+            # Later duplicate columns win, as in csv.DictReader
+            positions = {name: i for i, name in enumerate(header)}
+
+            def get(column, default):
+                return f"r[{positions[column]}]" if column in positions else repr(default)
+
+        expressions = [ROW_RULES[rule](get, source, arg) for _, source, _, rule, arg in self.mappings]
+
+        # Compute calls used by more than one field once (Phone feeds Phone and PersonHomePhone)
+        body, shared = [], {}
+        for expression in expressions:
+            if '(' in expression and expressions.count(expression) > 1 and expression not in shared:
+                shared[expression] = f"shared_{len(shared)}"
+                body.append(f"        {shared[expression]} = {expression}")
+        values = []
+        for expression, (_, _, person, _, _) in zip(expressions, self.mappings):
+            value = shared.get(expression, expression)
+            values.append(f"({value}) if is_person else ''" if person else value)
+
+        text = '\n'.join(expressions)
+        uses_context = text + '\n'.join(values)
+        context = [f"        {name} = {build(get)}" for name, build in ROW_CONTEXT.items() if name in uses_context]
+        bindings = [f"    {name} = t.{name}" for name in NORMALIZER_NAMES if f"{name}(" in text]
+        bindings += [f"    labels_{name} = t.dimensions.labels({name!r})"
+                     for name in sorted(set(_LABELS_RE.findall(text)))]
+        if 'merge_map' in text:
+            bindings.append("    merge_map = t.account_merge_map")
+        lines = ["def factory(t):"] + bindings + [
+            f"    def {self.source.lower()}_to_{self.target.lower()}(r):"
+        ] + context + body + [
+            "        return [",
+            ',\n'.join(f"            {value}" for value in values),
+            "        ]",
+            f"    return {self.source.lower()}_to_{self.target.lower()}"
+        ]
+        return '\n'.join(lines) + '\n'
+
+    def row_function(self, transformer, header=None):
+        """Row -> list of output values (``fields`` order) bound to ``transformer``.
+
+        With a ``header`` rows are lists in that column order and must be at
+        least as long as it; without, rows are dicts.
+        """
+        key = tuple(header) if header is not None else None
+        if key not in self._code:
+            self._code[key] = compile(self.source_code(header), f"<mapping {self.source}->{self.target}>", 'exec')
+        namespace = {'account_name': _account_name, 'order_types': ORDER_TYPES}
+        exec(self._code[key], namespace)
+        return namespace['factory'](transformer)
+
+    def columns(self, transformer, frame):
+        """Output columns (``fields`` order) for a chunk of string columns"""
+        c = _Columns(transformer, frame)
+        return [_person_only(rule)(c, source, arg) if person else COLUMN_RULES[rule](c, source, arg)
+                for _, source, person, rule, arg in self.mappings]
+
+def load_mapping_plans(mapping_file=MAPPING_FILE):
+    """{(source table, target object): MappingPlan} for every mapping with rules"""
+    grouped = {}
+    with open(mapping_file, 'r', newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            rule = (row.get('Rule') or '').strip()
+            if not rule:
+                continue
+            person, name, arg = parse_rule(rule)
+            key = (row['Source Table'], row['Target Object'])
+            grouped.setdefault(key, []).append((row['Target Field'], row['Source Field'], person, name, arg))
+    return {key: MappingPlan(*key, mappings) for key, mappings in grouped.items()}
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="List the compiled mapping plans or show the generated code")
+    parser.add_argument('--mapping', default=MAPPING_FILE)
+    parser.add_argument('--show', metavar='SOURCE:TARGET',
+                        help="print the generated row function, e.g. Customer:Account")
+    parser.add_argument('--header', help="comma-separated input columns to compile --show for (default: dict rows)")
+    return parser.parse_args()
+
+def main():
+    """Compile the mapping file"""
+    args = parse_args()
+    try:
+        plans = load_mapping_plans(args.mapping)
+    except Exception as e:
+        print(f"❌ Error compiling {args.mapping}: {e}")
+        return
+    if args.show:
+        plan = plans.get(tuple(args.show.split(':', 1)))
+        if plan is None:
+            print(f"❌ No mapping from {args.show.replace(':', ' to ')}")
+            return
+        print(plan.source_code(args.header.split(',') if args.header else None))
+        return
+    for (source, target), plan in plans.items():
+        print(f"✅ {source} -> {target}: {len(plan.fields)} fields")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Aralco Import File Splitter
+Rolls Salesforce import files into size-limited, optionally gzipped parts with a manifest of row counts and checksums
+"""
+
+import argparse
+import csv
+import glob
+import gzip
+import hashlib
+import io
+import json
+import os
+from datetime import datetime
+
+# Bulk API 2.0 accepts up to 150MB of CSV per upload; parts stay under the
+# same 100MB load_salesforce.py cuts its jobs at, so each part is one job
+PART_MAX_BYTES = 100 * 1024 * 1024
+
+# Rows per part (0: no row limit)
+PART_MAX_ROWS = 0
+
+# Rows formatted per write; each batch is one write through the file buffer
+WRITE_BATCH = 5000
+
+# File buffer of the part files
+OUTPUT_BUFFER_SIZE = 1024 * 1024
+
+# gzip's default; higher levels barely shrink CSV further and cost much more time
+GZIP_LEVEL = 6
+
+class _HashingFile(io.RawIOBase):
+    """Write-only file that tracks the SHA-256 and size of what it writes"""
+
+    def __init__(self, path):
+        self._file = open(path, 'wb')
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.sha256.update(data)
+        self.size += len(data)
+        return self._file.write(data)
+
+    def close(self):
+        if not self.closed:
+            self._file.close()
+        super().close()
+
+def manifest_file(output_file):
+    """Path of the manifest written next to a split import file"""
+    stem, _ = os.path.splitext(output_file)
+    return f"{stem}_manifest.json"
+
+def part_file(output_file, index, compress=False):
+    stem, ext = os.path.splitext(output_file)
+    return f"{stem}_part{index:03d}{ext}{'.gz' if compress else ''}"
+
+class RollingCsvWriter:
+    """csv writer stand-in that rolls its rows over numbered part files.
+
+    Rows are buffered and formatted in batches. A part is closed before it
+    would exceed ``max_rows`` or ``max_bytes`` of (uncompressed) CSV, and
+    every part starts with the header, so each one loads on its own.
+    ``close`` writes the manifest and returns it.
+    """
+
+    def __init__(self, output_file, header, max_rows=PART_MAX_ROWS, max_bytes=PART_MAX_BYTES, compress=False,
+                 buffer_size=OUTPUT_BUFFER_SIZE):
+        self.output_file = output_file
+        self.header = list(header)
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self.buffer_size = buffer_size
+        self.parts = []
+        self._rows = []
+        self._text = io.StringIO()
+        self._writer = csv.writer(self._text)
+        self._header_bytes = self._format([self.header])
+        self._part = None
+
+    def writerow(self, row):
+        self._rows.append(row)
+        if len(self._rows) >= WRITE_BATCH:
+            self._flush()
+
+    def writerows(self, rows):
+        for row in rows:
+            self.writerow(row)
+
+    def _format(self, rows):
+        self._text.seek(0)
+        self._text.truncate()
+        self._writer.writerows(rows)
+        return self._text.getvalue().encode('utf-8')
+
+    def _fits(self, rows, size):
+        part = self._part
+        return ((not self.max_rows or part['rows'] + rows <= self.max_rows)
+                and (not self.max_bytes or part['bytes'] + size <= self.max_bytes))
+
+    def _flush(self):
+        rows, self._rows = self._rows, []
+        if not rows:
+            return
+        if self._part is None:
+            self._open_part()
+        data = self._format(rows)
+        if self._fits(len(rows), len(data)):
+            self._write(data, len(rows))
+            return
+        # Rare: the batch crosses a part boundary, place it row by row
+        for row in rows:
+            data = self._format([row])
+            if not self._fits(1, len(data)) and self._part['rows']:
+                self._close_part()
+                self._open_part()
+            self._write(data, 1)
+
+    def _open_part(self):
+        path = part_file(self.output_file, len(self.parts) + 1, self.compress)
+        raw = _HashingFile(path)
+        buffered = io.BufferedWriter(raw, self.buffer_size)
+        # mtime=0 keeps the checksum of identical content identical
+        stream = gzip.GzipFile(filename='', mode='wb', fileobj=buffered, compresslevel=GZIP_LEVEL,
+                               mtime=0) if self.compress else buffered
+        self._part = {'path': path, 'raw': raw, 'buffered': buffered, 'stream': stream, 'rows': 0, 'bytes': 0}
+        stream.write(self._header_bytes)
+        self._part['bytes'] = len(self._header_bytes)
+
+    def _write(self, data, rows):
+        self._part['stream'].write(data)
+        self._part['rows'] += rows
+        self._part['bytes'] += len(data)
+
+    def _close_part(self):
+        part = self._part
+        if part['stream'] is not part['buffered']:
+            part['stream'].close()
+        part['buffered'].close()
+        self.parts.append({'file': os.path.basename(part['path']), 'rows': part['rows'], 'bytes': part['bytes'],
+                           'size': part['raw'].size, 'sha256': part['raw'].sha256.hexdigest()})
+        self._part = None
+
+    def close(self):
+        """Finish the last part and write the manifest"""
+        self._flush()
+        if self._part is None and not self.parts:
+            self._open_part()  # An empty file still gets a header-only part
+        if self._part is not None:
+            self._close_part()
+        manifest = {
+            'source': os.path.basename(self.output_file),
+            'created': datetime.now().isoformat(),
+            'header': self.header,
+            'compressed': self.compress,
+            'rows': sum(part['rows'] for part in self.parts),
+            'parts': self.parts
+        }
+        with open(manifest_file(self.output_file), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        return manifest
+
+def remove_parts(output_file):
+    """Delete the parts and manifest of an earlier split"""
+    stem, ext = os.path.splitext(output_file)
+    for path in glob.glob(f"{glob.escape(stem)}_part[0-9][0-9][0-9]{ext}*"):
+        os.remove(path)
+    if os.path.exists(manifest_file(output_file)):
+        os.remove(manifest_file(output_file))
+
+def split_file(output_file, max_rows=PART_MAX_ROWS, max_bytes=PART_MAX_BYTES, compress=False):
+    """Replace an import file with its parts and manifest; returns the manifest"""
+    remove_parts(output_file)
+    with open(output_file, 'r', newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        writer = RollingCsvWriter(output_file, next(reader, []), max_rows, max_bytes, compress)
+        writer.writerows(reader)
+        manifest = writer.close()
+    os.remove(output_file)
+    return manifest
+
+def import_parts(output_file):
+    """Files holding an import file's rows: the file itself, else the parts of its manifest"""
+    if os.path.exists(output_file):
+        return [output_file]
+    if not os.path.exists(manifest_file(output_file)):
+        return []
+    with open(manifest_file(output_file), encoding='utf-8') as f:
+        manifest = json.load(f)
+    base_dir = os.path.dirname(output_file)
+    return [os.path.join(base_dir, part['file']) for part in manifest['parts']]
+
+def open_import(path):
+    """Open an import file or part (gzipped or not) as CSV text"""
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', newline='', encoding='utf-8')
+    return open(path, 'r', newline='', encoding='utf-8')
+
+def create_import(path, compress=False):
+    """Open an import file or part for writing CSV text, gzipped when ``compress``"""
+    if compress:
+        return gzip.open(path, 'wt', compresslevel=GZIP_LEVEL, newline='', encoding='utf-8')
+    return open(path, 'w', newline='', encoding='utf-8')
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(OUTPUT_BUFFER_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def refresh_manifest(output_file):
+    """Recount the rows, sizes and checksums of a split file's parts after they were rewritten in place"""
+    with open(manifest_file(output_file), encoding='utf-8') as f:
+        manifest = json.load(f)
+    for part in manifest['parts']:
+        path = os.path.join(os.path.dirname(output_file), part['file'])
+        with open_import(path) as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            part['rows'] = sum(1 for _ in reader)
+        with (gzip.open(path, 'rb') if path.endswith('.gz') else open(path, 'rb')) as f:
+            part['bytes'] = sum(len(block) for block in iter(lambda: f.read(OUTPUT_BUFFER_SIZE), b''))
+        part['size'] = os.path.getsize(path)
+        part['sha256'] = _sha256(path)
+    manifest['rows'] = sum(part['rows'] for part in manifest['parts'])
+    with open(manifest_file(output_file), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+def verify_parts(output_file):
+    """Problems found checking the parts of a split file against its manifest"""
+    with open(manifest_file(output_file), encoding='utf-8') as f:
+        manifest = json.load(f)
+    problems = []
+    for part in manifest['parts']:
+        path = os.path.join(os.path.dirname(output_file), part['file'])
+        if not os.path.exists(path):
+            problems.append(f"{part['file']}: missing")
+            continue
+        if _sha256(path) != part['sha256']:
+            problems.append(f"{part['file']}: checksum mismatch")
+    return problems
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Split Salesforce import files into parts with a manifest")
+    parser.add_argument('input_files', nargs='+', help="import CSVs; each is replaced by <name>_partNNN.csv[.gz]")
+    parser.add_argument('--part-rows', type=int, default=PART_MAX_ROWS,
+                        help="rows per part (0: no row limit)")
+    parser.add_argument('--part-mb', type=float, default=PART_MAX_BYTES / (1024 * 1024),
+                        help="largest part, in MB of uncompressed CSV")
+    parser.add_argument('--gzip', action='store_true', help="gzip the parts")
+    parser.add_argument('--verify', action='store_true',
+                        help="check existing parts against their manifests instead of splitting")
+    return parser.parse_args()
+
+def main():
+    """Split or verify import files"""
+    args = parse_args()
+    for input_file in args.input_files:
+        try:
+            if args.verify:
+                problems = verify_parts(input_file)
+                for problem in problems:
+                    print(f"❌ {problem}")
+                if not problems:
+                    print(f"✅ {os.path.basename(input_file)}: parts match {manifest_file(input_file)}")
+                continue
+            manifest = split_file(input_file, max(0, args.part_rows), int(args.part_mb * 1024 * 1024), args.gzip)
+            print(f"✅ {manifest['source']}: {manifest['rows']} rows in {len(manifest['parts'])} part(s)")
+        except Exception as e:
+            print(f"❌ Error processing {input_file}: {e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Aralco Pipelined Extraction and Transformation
+Streams keyset pages from the database through bounded queues into DataTransformer, without staging files
+"""
+
+import argparse
+import functools
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from analyze_database import (DEFAULT_CHUNK_SIZE, EXTRACT_TABLES, ConnectionPool, connect_sqlite,
+                              staging_columns, stream_table)
+from dimension_cache import refresh_dimensions
+from field_validator import METADATA_DIR, FieldValidator
+from instrumentation import PROFILERS, Instrumentation
+from transform_data import (ACCOUNTS_OUTPUT, ERRORS_OUTPUT, INSTRUMENTATION_OUTPUT, NORMALIZER_CACHE_SIZE,
+                            ORDER_ITEMS_OUTPUT, ORDERS_OUTPUT, PRICEBOOK_OUTPUT, PRODUCTS_OUTPUT,
+                            DataTransformer, _column_chunk, pd)
+
+# Pages buffered per table between its extractor and its transformer; a
+# full queue blocks the extractor until the transformer catches up
+DEFAULT_QUEUE_SIZE = 8
+
+PROFILE_OUTPUT = 'exports/salesforce_ready/pipeline_profile'
+
+# How long a blocked extractor waits before checking whether its consumer has gone
+_PUT_TIMEOUT = 0.5
+
+_DONE = object()
+
+class PageChannel:
+    """Bounded queue of keyset pages from one extractor to one transformer.
+
+    ``put`` blocks while the queue is full (backpressure) and gives up
+    once the consumer has closed the channel, so a failed transform never
+    leaves its extractor blocked.
+    """
+
+    def __init__(self, table, size=DEFAULT_QUEUE_SIZE):
+        self.table = table
+        self.columns = staging_columns(table)
+        self._queue = queue.Queue(maxsize=size)
+        self._closed = threading.Event()
+        self.pages = 0
+        self.rows_in = 0
+
+    def put(self, item):
+        """Queue a page, the end marker or an exception; False once the consumer has closed"""
+        while not self._closed.is_set():
+            try:
+                self._queue.put(item, timeout=_PUT_TIMEOUT)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def close(self):
+        self._closed.set()
+
+    def _pages(self):
+        while True:
+            item = self._queue.get()
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            self.pages += 1
+            self.rows_in += len(item)
+            # Stringified exactly as CsvStagingWriter writes them, so the
+            # output matches a transform of the staging files
+            yield [['' if v is None else (v if isinstance(v, str) else str(v)) for v in row] for row in item]
+
+    def rows(self):
+        """Row dicts, like read_staging_rows of the table's CSV staging file"""
+        for page in self._pages():
+            for row in page:
+                yield dict(zip(self.columns, row))
+
+    def chunks(self):
+        """Column chunks, like read_column_batches of the staging file (one per page)"""
+        for page in self._pages():
+            yield _column_chunk(self.columns, len(self.columns), page)
+
+def _extract(pool, channel, chunk_size, instrumentation):
+    """Extractor thread: push a table's keyset pages into its channel"""
+    started = time.perf_counter()
+    with instrumentation.stage(f"extract:{channel.table}") as record:
+        record['rows'] = 0
+        try:
+            with pool.connection() as conn:
+                for rows in stream_table(conn, channel.table, chunk_size):
+                    if not channel.put(rows):
+                        break
+                    record['rows'] += len(rows)
+            channel.put(_DONE)
+        except Exception as e:
+            channel.put(e)
+    return started, time.perf_counter()
+
+def _transform(kind, channels, cache_size, batch, instrumentation, dimensions, validator, parents=None):
+    """Transformer thread: run one transform over its channels' rows.
+
+    Each transform has its own DataTransformer so no counters are shared
+    between threads; the caller merges them. The dimension cache and field
+    validator are shared. ``parents`` is the future of the transform whose
+    rejected records this one must know first (the products, for orders).
+    """
+    started = time.perf_counter()
+    transformer = DataTransformer(cache_size, instrumentation)
+    transformer.dimensions = dimensions
+    transformer.validator = validator
+    try:
+        if parents is not None:
+            for sobject, ids in parents.result()[1].errors.failed.items():
+                transformer.errors.add_failed(sobject, ids)
+        if kind == 'accounts':
+            source = channels['Customer'].chunks() if batch else channels['Customer'].rows()
+            ok = transformer.transform_accounts('Customer', ACCOUNTS_OUTPUT, batch=batch, rows=source)
+        elif kind == 'products':
+            source = channels['Product'].chunks() if batch else channels['Product'].rows()
+            ok = transformer.transform_products('Product', PRODUCTS_OUTPUT, PRICEBOOK_OUTPUT,
+                                                batch=batch, rows=source)
+        elif kind == 'inventory':
+            ok = transformer.transform_inventory('Inventory', rows=channels['Inventory'].rows())
+        else:
+            ok = transformer.transform_orders('POSTransHead', 'POSTransItem', ORDERS_OUTPUT, ORDER_ITEMS_OUTPUT,
+                                              header_rows=channels['POSTransHead'].rows(),
+                                              item_rows=channels['POSTransItem'].rows())
+    finally:
+        for channel in channels.values():
+            channel.close()
+    return ok, transformer, started, time.perf_counter()
+
+# Channels feeding each transform
+TRANSFORM_TABLES = {
+    'accounts': ['Customer'],
+    'products': ['Product'],
+    'orders': ['POSTransHead', 'POSTransItem'],
+    'inventory': ['Inventory']
+}
+
+# Transform whose rejected records another one needs before it starts:
+# line items of rejected products go to the rejects file (see
+# transform_data.REJECTED_PARENTS), so orders wait for the products
+TRANSFORM_PARENTS = {'orders': 'products'}
+
+def run_pipeline(pool, transformer, chunk_size=DEFAULT_CHUNK_SIZE, queue_size=DEFAULT_QUEUE_SIZE, batch=False):
+    """Extract every table and transform it concurrently.
+
+    One extractor thread per table streams keyset pages into a bounded
+    channel while one transformer thread per output consumes them, so
+    end-to-end time approaches the longer of extraction and transformation
+    rather than their sum; the orders transform starts once the products
+    are done (TRANSFORM_PARENTS). Results are merged into ``transformer``.
+    Returns the extract and transform wall times and whether every
+    transform succeeded.
+    """
+    print(f"🔄 Pipelining extraction into transformation (chunk size {chunk_size}, queue {queue_size} pages)...")
+    channels = {table: PageChannel(table, queue_size) for table in EXTRACT_TABLES}
+    instrumentation = transformer.instrumentation
+    cache_size = transformer._caches['clean_phone'].cache_info().maxsize
+
+    with ThreadPoolExecutor(max_workers=len(channels) + len(TRANSFORM_TABLES)) as executor:
+        extractors = [executor.submit(_extract, pool, channel, chunk_size, instrumentation)
+                      for channel in channels.values()]
+        transforms = {}
+        for kind, tables in TRANSFORM_TABLES.items():
+            transforms[kind] = executor.submit(_transform, kind, {t: channels[t] for t in tables},
+                                               cache_size, batch, instrumentation, transformer.dimensions,
+                                               transformer.validator, transforms.get(TRANSFORM_PARENTS.get(kind)))
+        extract_times = [future.result() for future in extractors]
+        results = [future.result() for future in transforms.values()]
+
+    succeeded = True
+    for ok, worker, _, _ in results:
+        transformer.merge_results(worker.stats, worker.errors, worker.cache_stats())
+        succeeded = succeeded and ok
+    extract_seconds = max(end for _, end in extract_times) - min(start for start, _ in extract_times)
+    transform_seconds = max(r[3] for r in results) - min(r[2] for r in results)
+    print(f"✅ Extracted {sum(c.rows_in for c in channels.values())} rows in "
+          f"{sum(c.pages for c in channels.values())} pages")
+    return {'extract_seconds': round(extract_seconds, 3), 'transform_seconds': round(transform_seconds, 3),
+            'succeeded': succeeded}
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Extract from AralcoPOS and transform in one pipelined pass")
+    parser.add_argument('--sqlite', metavar='PATH',
+                        help="read a local SQLite stand-in instead of SQL Server "
+                             "(see generate_synthetic_data.py --sqlite)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="rows fetched per keyset page")
+    parser.add_argument('--queue-size', type=int, default=DEFAULT_QUEUE_SIZE,
+                        help="pages buffered per table before the extractor waits")
+    parser.add_argument('--batch', action='store_true',
+                        help="transform each page as a column chunk with pandas")
+    parser.add_argument('--cache-size', type=int, default=NORMALIZER_CACHE_SIZE,
+                        help="entries per normalizer memo cache (0 disables caching)")
+    parser.add_argument('--validate', action='store_true',
+                        help=f"check every row against the field metadata in {METADATA_DIR}, "
+                             "writing failing rows to <file>_rejects.csv")
+    parser.add_argument('--instrument', action='store_true',
+                        help="also time every normalizer call (adds per-call overhead)")
+    parser.add_argument('--profile', choices=PROFILERS,
+                        help=f"profile the run with cProfile or pyinstrument into {PROFILE_OUTPUT}.*")
+    return parser.parse_args()
+
+def main():
+    """Main pipelined extraction and transformation"""
+    args = parse_args()
+    if args.batch and pd is None:
+        print("⚠️  pandas is not installed, using the row-by-row transform")
+        args.batch = False
+    print("🚀 Starting pipelined Aralco extraction and transformation...")
+
+    # One connection per extractor thread
+    pool = ConnectionPool(len(EXTRACT_TABLES), functools.partial(connect_sqlite, args.sqlite) if args.sqlite else None)
+    try:
+        with pool.connection():
+            pass
+    except ConnectionError:
+        print("❌ Cannot proceed without database connection")
+        return
+
+    instrumentation = Instrumentation(function_timers=args.instrument)
+    transformer = DataTransformer(args.cache_size, instrumentation)
+    transformer.errors.stream(ERRORS_OUTPUT)
+    if args.validate:
+        transformer.validator = FieldValidator()
+    started = time.perf_counter()
+    try:
+        with instrumentation.profile(args.profile, PROFILE_OUTPUT):
+            with instrumentation.stage('refresh_dimensions'), pool.connection() as conn:
+                transformer.dimensions = refresh_dimensions(conn)
+            timings = run_pipeline(pool, transformer, max(1, args.chunk_size), max(1, args.queue_size), args.batch)
+    finally:
+        pool.close_all()
+    total = time.perf_counter() - started
+
+    transformer.generate_summary()
+    transformer.errors.close()
+    instrumentation.write(INSTRUMENTATION_OUTPUT)
+    print(f"\n📊 Pipeline: {total:.1f}s end to end (extraction {timings['extract_seconds']:.1f}s, "
+          f"transformation {timings['transform_seconds']:.1f}s, overlapped)")
+    if timings['succeeded']:
+        print(f"\n✅ Pipelined transformation complete! Check {os.path.dirname(INSTRUMENTATION_OUTPUT)}/ for results.")
+    else:
+        print("\n❌ Some transforms failed, see the errors above")
+
+if __name__ == "__main__":
+    main()
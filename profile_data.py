@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""
+Aralco Data Quality Profiler
+Profiles every column of the extracted tables in one streaming pass: null rates, distinct counts, top values, formats and lengths
+"""
+
+import argparse
+import collections
+import csv
+import functools
+import hashlib
+import json
+import math
+import os
+import re
+import time
+from datetime import date, datetime
+from decimal import Decimal
+
+from analyze_database import (DEFAULT_CHUNK_SIZE, EXTRACT_TABLES, ConnectionPool, connect_sqlite, staging_columns,
+                              stream_table)
+from field_validator import METADATA_DIR, TYPE_LENGTHS, load_field_metadata
+from mapping_plan import MAPPING_FILE, parse_rule
+from transform_data import (_CURRENCY_SYMBOLS_RE, _ISO_DATE_PATTERN, _PLAIN_NUMBER_PATTERN, STAGING_BATCH_SIZE,
+                            DataTransformer, _parquet_batches, open_staging_rows, pq, resolve_input)
+
+# JSON report, next to the analysis samples
+PROFILE_OUTPUT = 'exports/analysis/data_profile.json'
+
+# HyperLogLog registers per column are 2**HLL_PRECISION bytes; 14 gives
+# about 0.8% standard error on distinct counts
+HLL_PRECISION = 14
+
+# Top values reported per column, and the Misra-Gries counters kept to find
+# them. Values more frequent than 1/TOP_K_COUNTERS of the rows are never
+# missed; reported counts are lower bounds once a column overflows.
+TOP_K = 10
+TOP_K_COUNTERS = 512
+
+# Length histogram bucket bounds, the common Salesforce text limits
+LENGTH_BUCKETS = [20, 40, 80, 255, 4000]
+
+# Non-conforming values kept per column as examples
+FORMAT_EXAMPLES = 5
+
+# Normalizer rules of the mapping file whose inputs are checked for format
+FORMAT_RULES = ['email', 'phone', 'currency', 'date', 'datetime']
+
+_PHONE_RE = re.compile(r'\([0-9]{3}\) [0-9]{3}-[0-9]{4}')
+_ISO_DATE_RE = re.compile(_ISO_DATE_PATTERN)
+_ISO_DATETIME_RE = re.compile(r'[0-9]{4}-[0-9]{2}-[0-9]{2}T[0-9]{2}:[0-9]{2}:[0-9]{2}\.000Z')
+_PLAIN_NUMBER_RE = re.compile(_PLAIN_NUMBER_PATTERN)
+_TEXT_LENGTH_RE = re.compile(r'^(?:Text|TextArea|LongTextArea)\(([0-9]+)\)$')
+
+class HyperLogLog:
+    """Fixed-memory distinct count estimate of a stream of strings"""
+
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+        self._rest_bits = 64 - precision
+        self._rest_mask = (1 << self._rest_bits) - 1
+
+    def add(self, value):
+        hashed = int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+        index = hashed >> self._rest_bits
+        rank = self._rest_bits - (hashed & self._rest_mask).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def estimate(self):
+        """Estimated number of distinct values added"""
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        # Linear counting is more accurate while most registers are empty
+        if raw <= 2.5 * m and zeros:
+            return round(m * math.log(m / zeros))
+        return round(raw)
+
+class TopValues:
+    """Misra-Gries heavy hitters: the most frequent values in bounded memory"""
+
+    def __init__(self, counters=TOP_K_COUNTERS):
+        self.counters = counters
+        self.counts = {}
+        self.exact = True
+
+    def add(self, value):
+        counts = self.counts
+        if value in counts:
+            counts[value] += 1
+        elif len(counts) < self.counters:
+            counts[value] = 1
+        else:
+            # Decrement every counter; the new value is absorbed by the decrement
+            self.exact = False
+            self.counts = {v: c - 1 for v, c in counts.items() if c > 1}
+
+    def top(self, k=TOP_K):
+        ranked = sorted(self.counts.items(), key=lambda item: (-item[1], item[0]))[:k]
+        return [{'value': value, 'count': count} for value, count in ranked]
+
+def _staging_text(value):
+    """A value as the CSV staging writer writes it"""
+    return value if isinstance(value, str) else str(value)
+
+def _conforms_currency(transformer, value, column):
+    # The parse clean_currency attempts before defaulting to 0.00
+    if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+        return True
+    try:
+        float(_CURRENCY_SYMBOLS_RE.sub('', str(value)))
+        return True
+    except ValueError:
+        return False
+
+# Rule -> check(transformer, value, column): whether the DataTransformer rule
+# normalizes the value rather than falling back (an email blanked, a phone
+# passed through, an amount defaulted to 0.00, a date truncated)
+FORMAT_CHECKS = {
+    'email': lambda t, value, column: bool(t.clean_email(value)),
+    'phone': lambda t, value, column: bool(_PHONE_RE.fullmatch(t.clean_phone(value))),
+    'currency': _conforms_currency,
+    'date': lambda t, value, column: bool(_ISO_DATE_RE.fullmatch(t.transform_date(value, column))),
+    'datetime': lambda t, value, column: bool(_ISO_DATETIME_RE.fullmatch(t.transform_datetime(value, column)))
+}
+
+def column_targets(mapping_file=MAPPING_FILE, metadata_dir=METADATA_DIR):
+    """{(source table, column): {'formats': [rule], 'limits': {Object.Field: length}}} from the mapping file.
+
+    Lengths come from the field metadata where it states one, else from the
+    mapping file's Data Type (Text(40)) or the fixed length of the type.
+    """
+    specs = {}
+    targets = {}
+    with open(mapping_file, 'r', newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            table, column, sobject, field = (row['Source Table'], row['Source Field'],
+                                             row['Target Object'], row['Target Field'])
+            if not column or '.' in field:
+                continue
+            target = targets.setdefault((table, column), {'formats': [], 'limits': {}})
+            rule = (row.get('Rule') or '').strip()
+            if rule:
+                name = parse_rule(rule)[1]
+                if name in FORMAT_RULES and name not in target['formats']:
+                    target['formats'].append(name)
+
+            if sobject not in specs:
+                specs[sobject] = load_field_metadata(sobject, metadata_dir)
+            data_type = (row.get('Data Type') or '').strip()
+            match = _TEXT_LENGTH_RE.match(data_type)
+            length = (specs[sobject].get(field, {}).get('length')
+                      or (int(match.group(1)) if match else TYPE_LENGTHS.get(data_type)))
+            if length:
+                target['limits'][f"{sobject}.{field}"] = length
+    return targets
+
+class ColumnProfile:
+    """Streaming statistics of one column"""
+
+    def __init__(self, name, formats=(), limits=None):
+        self.name = name
+        self.formats = list(formats)
+        self.limits = limits or {}
+        self.count = self.nulls = self.empty = 0
+        self.distinct = HyperLogLog()
+        self.top_values = TopValues()
+        self.lengths = collections.Counter()
+        self.checked = collections.Counter()
+        self.conforming = collections.Counter()
+        self.examples = {rule: [] for rule in self.formats}
+        self._number_range = None
+        self._text_range = None
+        self._date_range = None
+
+    def add(self, value, transformer, check_column):
+        """Fold one value (None for NULL) into the statistics"""
+        self.count += 1
+        if value is None:
+            self.nulls += 1
+            return
+        text = _staging_text(value)
+        if not text.strip():
+            self.empty += 1
+            return
+        self.distinct.add(text)
+        self.top_values.add(text)
+        self.lengths[len(text)] += 1
+
+        if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+            self._number_range = _widen(self._number_range, value)
+        elif isinstance(value, (date, datetime)):
+            self._date_range = _widen(self._date_range, value.isoformat())
+        elif _PLAIN_NUMBER_RE.fullmatch(text):
+            self._number_range = _widen(self._number_range, Decimal(text))
+        else:
+            self._text_range = _widen(self._text_range, text)
+
+        for rule in self.formats:
+            self.checked[rule] += 1
+            if FORMAT_CHECKS[rule](transformer, value, check_column):
+                self.conforming[rule] += 1
+                if rule in ('date', 'datetime') and isinstance(value, str):
+                    self._date_range = _widen(self._date_range, transformer.transform_date(value, check_column))
+            elif len(self.examples[rule]) < FORMAT_EXAMPLES and text not in self.examples[rule]:
+                self.examples[rule].append(text)
+
+    def report(self):
+        """JSON-ready statistics of the column"""
+        report = {
+            'count': self.count,
+            'nulls': self.nulls,
+            'null_rate': _rate(self.nulls, self.count),
+            'empty': self.empty,
+            'empty_rate': _rate(self.empty, self.count),
+            'distinct_estimate': self.distinct.estimate()
+        }
+        # Dates (native or normalized) first, then numbers unless the column is text
+        if self._date_range:
+            value_range = self._date_range
+        elif self._number_range and (not self._text_range or 'currency' in self.formats):
+            value_range = self._number_range
+        else:
+            value_range = self._text_range or self._number_range
+        if value_range:
+            report['min'], report['max'] = (_staging_text(v) for v in value_range)
+        report['top_values'] = self.top_values.top()
+        report['top_values_exact'] = self.top_values.exact
+        if self.formats:
+            report['formats'] = {rule: {'checked': self.checked[rule], 'conforming': self.conforming[rule],
+                                        'conformance_rate': _rate(self.conforming[rule], self.checked[rule]),
+                                        'examples': self.examples[rule]}
+                                 for rule in self.formats}
+        report['lengths'] = self._length_report()
+        return report
+
+    def _length_report(self):
+        histogram = {f"<={bound}": 0 for bound in LENGTH_BUCKETS}
+        histogram[f">{LENGTH_BUCKETS[-1]}"] = 0
+        for length, count in self.lengths.items():
+            bucket = next((f"<={bound}" for bound in LENGTH_BUCKETS if length <= bound), f">{LENGTH_BUCKETS[-1]}")
+            histogram[bucket] += count
+        report = {'max': max(self.lengths, default=0), 'histogram': histogram}
+        if self.limits:
+            report['limits'] = {target: {'limit': limit,
+                                         'over_limit': sum(c for n, c in self.lengths.items() if n > limit)}
+                                for target, limit in self.limits.items()}
+        return report
+
+def _widen(value_range, value):
+    if value_range is None:
+        return (value, value)
+    low, high = value_range
+    return (value if value < low else low, value if value > high else high)
+
+def _rate(part, whole):
+    return round(part / whole, 4) if whole else 0.0
+
+class TableProfile:
+    """Column profiles of one table, filled from rows in ``columns`` order"""
+
+    def __init__(self, table, columns, targets=None, transformer=None):
+        self.table = table
+        self.columns = list(columns)
+        targets = targets or {}
+        self.profiles = [ColumnProfile(c, **targets.get((table, c), {})) for c in self.columns]
+        self.transformer = transformer or DataTransformer()
+        self.rows = 0
+
+    def add_rows(self, rows):
+        """Fold an iterable of row sequences into the profiles"""
+        transformer = self.transformer
+        # Date formats are sniffed per table and column, as the transforms do
+        columns = [(profile, f"{self.table}.{profile.name}") for profile in self.profiles]
+        for row in rows:
+            self.rows += 1
+            for (profile, check_column), value in zip(columns, row):
+                profile.add(value, transformer, check_column)
+
+    def report(self):
+        return {'rows': self.rows, 'columns': {p.name: p.report() for p in self.profiles}}
+
+def _staging_rows(input_file, batch_size=STAGING_BATCH_SIZE):
+    """(columns, rows) of a staging file; Parquet keeps NULLs as None"""
+    if input_file.endswith('.parquet'):
+        columns = pq.ParquetFile(input_file).schema_arrow.names
+
+        def parquet_rows():
+            for batch in _parquet_batches(input_file, batch_size):
+                yield from zip(*[array.to_pylist() for array in batch.columns])
+        return columns, parquet_rows()
+
+    def csv_rows():
+        with open_staging_rows(input_file) as (header, rows):
+            yield header
+            yield from rows
+    rows = csv_rows()
+    return next(rows) or [], rows
+
+def _database_rows(conn, table, chunk_size):
+    for page in stream_table(conn, table, chunk_size):
+        yield from page
+
+def profile_tables(read, tables=None, targets=None):
+    """Profile each table from ``read(table) -> (columns, rows)`` or None when it is missing"""
+    targets = column_targets() if targets is None else targets
+    transformer = DataTransformer()
+    report = {}
+    for table in tables or EXTRACT_TABLES:
+        source = read(table)
+        if source is None:
+            print(f"⚠️  No {table} data, skipping")
+            continue
+        started = time.perf_counter()
+        profile = TableProfile(table, source[0], targets, transformer)
+        profile.add_rows(source[1])
+        report[table] = profile.report()
+        seconds = time.perf_counter() - started
+        report[table]['seconds'] = round(seconds, 3)
+        print(f"✅ Profiled {profile.rows} {table} rows, {len(profile.columns)} columns in {seconds:.1f}s")
+    return report
+
+def profile_staging(input_dir, fmt='csv', tables=None):
+    """Profile the staging files of an extraction, without touching the database"""
+    def read(table):
+        input_file = resolve_input(input_dir, table, fmt)
+        return _staging_rows(input_file) if os.path.exists(input_file) else None
+    return profile_tables(read, tables)
+
+def profile_database(conn, chunk_size=DEFAULT_CHUNK_SIZE, tables=None):
+    """Profile the tables straight from the database, one keyset scan per table"""
+    return profile_tables(lambda table: (staging_columns(table),
+                                         _database_rows(conn, table, chunk_size)), tables)
+
+def write_profile(tables, source, output_file=PROFILE_OUTPUT):
+    """Write the JSON report"""
+    os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+    report = {'profile_date': datetime.now().isoformat(), 'source': source, 'tables': tables}
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"📊 Data profile written to {output_file}")
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Profile the columns of the Aralco tables in one pass")
+    parser.add_argument('--input-dir',
+                        help="profile extraction staging files (e.g. exports/extract) instead of the database")
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv',
+                        help="staging format to read from --input-dir (falls back to CSV)")
+    parser.add_argument('--sqlite', metavar='PATH',
+                        help="profile a local SQLite stand-in instead of SQL Server")
+    parser.add_argument('--table', action='append', dest='tables', choices=list(EXTRACT_TABLES),
+                        help="table to profile (repeatable, default: all extracted tables)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="rows fetched per keyset page from the database")
+    parser.add_argument('--output', default=PROFILE_OUTPUT)
+    return parser.parse_args()
+
+def main():
+    """Profile the extracted tables"""
+    args = parse_args()
+    print("🚀 Starting Aralco data quality profile...")
+
+    if args.input_dir:
+        try:
+            tables = profile_staging(args.input_dir, args.format, args.tables)
+        except Exception as e:
+            print(f"❌ Error profiling {args.input_dir}: {e}")
+            return
+        write_profile(tables, args.input_dir, args.output)
+        return
+
+    pool = ConnectionPool(1, functools.partial(connect_sqlite, args.sqlite) if args.sqlite else None)
+    try:
+        with pool.connection() as conn:
+            tables = profile_database(conn, max(1, args.chunk_size), args.tables)
+    except ConnectionError:
+        print("❌ Cannot proceed without database connection")
+        return
+    except Exception as e:
+        print(f"❌ Error profiling the database: {e}")
+        return
+    finally:
+        pool.close_all()
+    write_profile(tables, args.sqlite or 'AralcoPOS', args.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Aralco to Salesforce Reconciliation Script
+Compares the transformed source records with a Salesforce export by partitioned checksums
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from output_writer import import_parts, open_import
+from transform_data import CHANGE_TRACKED_OUTPUTS, plan_shards, read_staging_rows
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet sources are optional
+    pq = None
+
+# Where reconciliation reports are written
+RECONCILE_DIR = 'validation/reconciliation'
+
+# Numeric external IDs are partitioned into ranges of this many IDs; other
+# IDs are hashed into HASH_PARTITIONS buckets
+PARTITION_WIDTH = 1000
+HASH_PARTITIONS = 1024
+
+DEFAULT_WORKERS = 4
+
+# Largest number of row-level differences written to the report
+MAX_DIFF_ROWS = 100000
+
+_NUMBER_PATTERN = re.compile(r'-?[0-9]+(?:\.[0-9]+)?')
+
+def normalize(value):
+    """Canonical form of a field value, so 1000.5 matches 1000.50 and TRUE matches true"""
+    if value is None:
+        return ''
+    text = (value if isinstance(value, str) else str(value)).strip()
+    if not text:
+        return ''
+    first = text[0]
+    if (first.isdigit() or first == '-') and _NUMBER_PATTERN.fullmatch(text):
+        try:
+            number = Decimal(text).normalize()
+            return format(number, 'f') if number != 0 else '0'
+        except InvalidOperation:
+            return text
+    if first in 'tTfF' and text.lower() in ('true', 'false'):
+        return text.lower()
+    return text
+
+def partition_of(external_id):
+    """Partition label of an external ID: an ID range, or a hash bucket"""
+    text = str(external_id).strip()
+    if text.isdigit():
+        start = int(text) // PARTITION_WIDTH * PARTITION_WIDTH
+        return f"{start}-{start + PARTITION_WIDTH - 1}"
+    digest = hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest()
+    return f"#{int.from_bytes(digest, 'big') % HASH_PARTITIONS}"
+
+def row_hash(key, values):
+    """64-bit hash of a record's key and normalized field values"""
+    data = '\x1f'.join([key] + values).encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'big')
+
+def input_files(path):
+    """Files holding a source or target: the file itself, or the parts of a split import file"""
+    return import_parts(path) or [path]
+
+def file_columns(input_file):
+    """Column names of a CSV or Parquet file, or of the first part of a split one"""
+    input_file = input_files(input_file)[0]
+    if input_file.endswith('.parquet'):
+        return pq.read_schema(input_file).names
+    with open_import(input_file) as f:
+        return next(csv.reader(f), [])
+
+def _read_rows(input_file, shard=None):
+    """Rows of a staging file or import part as dicts; gzipped parts are read whole"""
+    if input_file.endswith('.gz'):
+        with open_import(input_file) as f:
+            yield from csv.DictReader(f)
+        return
+    yield from read_staging_rows(input_file, shard=shard)
+
+def _partition_checksums(task):
+    """Process-pool worker: per-partition [count, sum of row hashes] of one shard.
+
+    Sums of row hashes (mod 2**64) do not depend on row order, so shards
+    and both sides can be aggregated independently.
+    """
+    input_file, shard, key, fields = task
+    checksums = {}
+    for row in _read_rows(input_file, shard):
+        external_id = normalize(row.get(key))
+        partition = partition_of(external_id)
+        digest = row_hash(external_id, [normalize(row.get(f)) for f in fields])
+        entry = checksums.setdefault(partition, [0, 0])
+        entry[0] += 1
+        entry[1] = (entry[1] + digest) % 2 ** 64
+    return checksums
+
+def _partition_rows(task):
+    """Process-pool worker: normalized rows of one file (or its parts) in the given partitions"""
+    input_file, key, fields, partitions = task
+    rows = {}
+    for path in input_files(input_file):
+        for row in _read_rows(path):
+            external_id = normalize(row.get(key))
+            if partition_of(external_id) in partitions:
+                rows[external_id] = [normalize(row.get(f)) for f in fields]
+    return rows
+
+def checksum_file(executor, input_file, key, fields, workers):
+    """Aggregate partition checksums of a whole file (or all its parts) over shards in parallel"""
+    tasks = []
+    for path in input_files(input_file):
+        shards = [None] if path.endswith('.gz') else plan_shards(path, workers)
+        tasks += [(path, shard, key, fields) for shard in shards]
+    return executor.map(_partition_checksums, tasks)
+
+def _merge_checksums(results):
+    merged = {}
+    for checksums in results:
+        for partition, (count, total) in checksums.items():
+            entry = merged.setdefault(partition, [0, 0])
+            entry[0] += count
+            entry[1] = (entry[1] + total) % 2 ** 64
+    return merged
+
+def reconcile(sobject, source_file, target_file, key, fields=None, workers=DEFAULT_WORKERS,
+              output_dir=RECONCILE_DIR):
+    """Compare source and target records of one object.
+
+    Both files are checksummed per external-ID partition in parallel; only
+    partitions whose count or checksum differ are read again and compared
+    row by row. Writes ``<object>_diff.csv`` and ``<object>_summary.json``.
+    """
+    print(f"\n🔍 Reconciling {sobject}: {source_file} vs {target_file}...")
+    started = datetime.now()
+
+    if fields is None:
+        target_columns = set(file_columns(target_file))
+        fields = [c for c in file_columns(source_file) if c in target_columns and c != key]
+    print(f"  Comparing {len(fields)} field(s) keyed by {key}")
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        source_results = checksum_file(executor, source_file, key, fields, workers)
+        target_results = checksum_file(executor, target_file, key, fields, workers)
+        source = _merge_checksums(source_results)
+        target = _merge_checksums(target_results)
+
+        mismatched = sorted(p for p in set(source) | set(target) if source.get(p) != target.get(p))
+        print(f"  {len(source)} source / {len(target)} target partition(s), {len(mismatched)} mismatched")
+
+        differences = []
+        if mismatched:
+            wanted = set(mismatched)
+            source_rows, target_rows = executor.map(_partition_rows, [
+                (source_file, key, fields, wanted),
+                (target_file, key, fields, wanted)
+            ])
+            differences = diff_rows(source_rows, target_rows, fields)
+
+    os.makedirs(output_dir, exist_ok=True)
+    diff_file = os.path.join(output_dir, f"{sobject}_diff.csv")
+    with open(diff_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow([key, 'Difference', 'Field', 'Source Value', 'Target Value'])
+        writer.writerows(differences[:MAX_DIFF_ROWS])
+
+    counts = {}
+    for _, kind, _, _, _ in differences:
+        counts[kind] = counts.get(kind, 0) + 1
+    summary = {
+        'object': sobject,
+        'reconciliation_date': started.isoformat(),
+        'source_file': source_file,
+        'target_file': target_file,
+        'key': key,
+        'fields': fields,
+        'source_records': sum(c for c, _ in source.values()),
+        'target_records': sum(c for c, _ in target.values()),
+        'partitions': len(set(source) | set(target)),
+        'mismatched_partitions': mismatched,
+        'differences': counts,
+        'seconds': round((datetime.now() - started).total_seconds(), 3)
+    }
+    with open(os.path.join(output_dir, f"{sobject}_summary.json"), 'w') as f:
+        json.dump(summary, f, indent=2)
+
+    if differences:
+        print(f"❌ {sobject}: {len(differences)} difference(s) "
+              f"({', '.join(f'{n} {k}' for k, n in sorted(counts.items()))}), see {diff_file}")
+    else:
+        print(f"✅ {sobject}: {summary['source_records']} records match")
+    return summary
+
+def diff_rows(source_rows, target_rows, fields):
+    """Row-level differences as (key, kind, field, source value, target value)"""
+    differences = []
+    for external_id in sorted(set(source_rows) | set(target_rows), key=lambda k: (not k.isdigit(), int(k) if k.isdigit() else k)):
+        source = source_rows.get(external_id)
+        target = target_rows.get(external_id)
+        if target is None:
+            differences.append((external_id, 'missing_in_target', '', '', ''))
+        elif source is None:
+            differences.append((external_id, 'extra_in_target', '', '', ''))
+        else:
+            for field, source_value, target_value in zip(fields, source, target):
+                if source_value != target_value:
+                    differences.append((external_id, 'field_mismatch', field, source_value, target_value))
+    return differences
+
+def parse_args():
+    """Parse command line options"""
+    objects = {sobject: (output, key) for output, (sobject, key) in CHANGE_TRACKED_OUTPUTS.items()}
+    parser = argparse.ArgumentParser(description="Reconcile transformed Aralco records with a Salesforce export")
+    parser.add_argument('--object', required=True, choices=sorted(objects),
+                        help="Salesforce object to reconcile")
+    parser.add_argument('--target', required=True,
+                        help="Salesforce export CSV of the object (API field names as headers)")
+    parser.add_argument('--source',
+                        help="source records, CSV or Parquet, or a split import file's name "
+                             "(default: the object's import file, or its parts)")
+    parser.add_argument('--key', help="external ID field (default: the object's Aralco ID field)")
+    parser.add_argument('--field', action='append', dest='fields',
+                        help="field to compare (repeatable, default: all fields in both files)")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help="processes checksumming shards of each file")
+    args = parser.parse_args()
+    output, key = objects[args.object]
+    args.source = args.source or output
+    args.key = args.key or key
+    return args
+
+def main():
+    """Main reconciliation process"""
+    args = parse_args()
+    print("🚀 Starting Aralco to Salesforce Reconciliation...")
+
+    try:
+        reconcile(args.object, args.source, args.target, args.key, args.fields, max(1, args.workers))
+    except Exception as e:
+        print(f"❌ Error reconciling {args.object}: {e}")
+        return
+
+    print(f"\n✅ Reconciliation complete! Check {RECONCILE_DIR}/ for results.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""In-process Bulk API 2.0 ingest stub for load_salesforce.py tests.
+
+Serves create, PUT batches, PATCH state, job polling and the
+successfulResults/failedResults CSVs under
+/services/data/<version>/jobs/ingest. Upserts are kept per object by
+external ID, so a lookup column (``Order.Aralco_Transaction_ID__c``)
+fails its row unless the parent record was loaded first.
+"""
+
+import csv
+import io
+import itertools
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Bearer token the stub accepts
+ACCESS_TOKEN = 'stub-token'
+
+# Polls answered with InProgress before a job reports JobComplete
+POLLS_IN_PROGRESS = 1
+
+JOB_PATH = re.compile(r'^/services/data/[^/]+/jobs/ingest(?:/([^/]+)(?:/(batches|successfulResults|failedResults)/?)?)?$')
+
+class BulkApiStub:
+    """Bulk API 2.0 stub server on localhost.
+
+    ``fail`` is called with each uploaded record (a dict) and returns an
+    error message to fail it, or None. Lookups to ``existing`` objects
+    always resolve. ``records`` holds the loaded records as
+    ``{object: {external_id: salesforce_id}}``.
+    """
+
+    def __init__(self, fail=None, existing=('Pricebook2', 'RecordType')):
+        self.fail = fail or (lambda record: None)
+        self.existing = set(existing)
+        self.jobs = {}
+        self.records = {}
+        self.requests = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _handler(self))
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _new_id(self, prefix):
+        return f"{prefix}{next(self._ids):015d}"
+
+    def create(self, job):
+        with self._lock:
+            job_id = self._new_id('750')
+            self.jobs[job_id] = dict(job, id=job_id, state='Open', data=b'', polls=0,
+                                     successful=[], failed=[], header=[])
+        return self.jobs[job_id]
+
+    def process(self, job):
+        """Apply an uploaded job's records, parents first by external ID"""
+        reader = csv.reader(io.StringIO(job['data'].decode('utf-8'), newline=''))
+        job['header'] = next(reader, [])
+        with self._lock:
+            loaded = self.records.setdefault(job['object'], {})
+            for row in reader:
+                record = dict(zip(job['header'], row))
+                error = self.fail(record) or self._missing_parent(record)
+                if error:
+                    job['failed'].append(['', error] + row)
+                    continue
+                external_id = record.get(job.get('externalIdFieldName'), '')
+                created = external_id not in loaded
+                if created:
+                    loaded[external_id] = self._new_id('a00')
+                job['successful'].append([loaded[external_id], 'true' if created else 'false'] + row)
+        job['state'] = 'UploadComplete'
+
+    def _missing_parent(self, record):
+        for column, value in record.items():
+            if '.' in column and value:
+                sobject, field = column.split('.', 1)
+                if sobject not in self.existing and value not in self.records.get(sobject, {}):
+                    return f"INVALID_FIELD:Foreign key external ID: {value} not found for field {field} in entity {sobject}"
+        return None
+
+def _handler(stub):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _reply(self, status, body=b'', content_type='application/json'):
+            if isinstance(body, dict):
+                body = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _route(self):
+            stub.requests.append((self.command, self.path))
+            if self.headers.get('Authorization') != f"Bearer {ACCESS_TOKEN}":
+                self._reply(401, json.dumps([{'errorCode': 'INVALID_SESSION_ID'}]).encode('utf-8'))
+                return None
+            match = JOB_PATH.match(self.path)
+            # Only POST goes to the job collection; everything else names a job
+            if match is None or (self.command == 'POST') != (match.group(1) is None) or \
+                    (match.group(1) and match.group(1) not in stub.jobs):
+                self._reply(404, {'errorCode': 'NOT_FOUND'})
+                return None
+            body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+            return match.group(1), match.group(2), body
+
+        def do_POST(self):
+            route = self._route()
+            if route is None:
+                return
+            job = stub.create(json.loads(route[2]))
+            self._reply(200, _info(job))
+
+        def do_PUT(self):
+            route = self._route()
+            if route is None:
+                return
+            job = stub.jobs[route[0]]
+            if route[1] != 'batches' or job['state'] != 'Open':
+                self._reply(400, {'errorCode': 'INVALIDJOBSTATE'})
+                return
+            job['data'] += route[2]
+            self._reply(201)
+
+        def do_PATCH(self):
+            route = self._route()
+            if route is None:
+                return
+            job = stub.jobs[route[0]]
+            state = json.loads(route[2])['state']
+            if state == 'UploadComplete':
+                stub.process(job)
+            else:
+                job['state'] = state
+            self._reply(200, _info(job))
+
+        def do_GET(self):
+            route = self._route()
+            if route is None:
+                return
+            job = stub.jobs[route[0]]
+            if route[1] is None:
+                if job['state'] in ('UploadComplete', 'InProgress'):
+                    job['polls'] += 1
+                    job['state'] = 'JobComplete' if job['polls'] > POLLS_IN_PROGRESS else 'InProgress'
+                self._reply(200, _info(job))
+                return
+            kind = 'successful' if route[1] == 'successfulResults' else 'failed'
+            status = 'sf__Created' if kind == 'successful' else 'sf__Error'
+            out = io.StringIO()
+            writer = csv.writer(out)
+            writer.writerow(['sf__Id', status] + job['header'])
+            writer.writerows(job[kind])
+            self._reply(200, out.getvalue().encode('utf-8'), 'text/csv')
+
+    return Handler
+
+def _info(job):
+    info = {key: value for key, value in job.items() if key not in ('data', 'polls', 'successful', 'failed', 'header')}
+    info['numberRecordsProcessed'] = len(job['successful']) + len(job['failed'])
+    info['numberRecordsFailed'] = len(job['failed'])
+    return info
@@ -0,0 +1,115 @@
+"""Batch mode and sharded workers must write the same files as the row-by-row transform"""
+
+import csv
+import filecmp
+import itertools
+import os
+
+import pytest
+
+from dimension_cache import DimensionCache
+from field_validator import METADATA_DIR, FieldValidator, rejects_file
+from transform_data import ACCOUNTS_OUTPUT, PRICEBOOK_OUTPUT, PRODUCTS_OUTPUT, DataTransformer
+
+pytest.importorskip('pandas')
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Dirty values per input column
+CASES = {
+    'CustomerID': ['1', '42', ''],
+    'FirstName': ['', ' ', 'Bob', ' Alice '],
+    'LastName': ['', 'Smith ', 'O\'Neil'],
+    'CompanyName': ['', '  ', 'Acme Ltd', ' Co ', 'X' * 300],
+    'Email': ['', 'A@B.COM', ' a.b@c.co ', 'bad@', 'x@y.z', 'İ@x.com', 'a@b.com\n', 'foo bar@x.com', '\x1cq@w.io'],
+    'Phone': ['', '416-555-1234', '(416)5551234', '4165551234 ext 5', '555-1234', '+1 416 555 1234', '٤١٦٥٥٥١٢٣٤'],
+    'Cellular': ['', '905.555.0000', 'n/a'],
+    'Country': ['', 'Canada', 'USA'],
+    'CreditLimit': ['', '0', '$1,234.50', '12', '-3.456', '1e3', 'abc', ' 12 ', '$', 'nan', '1_000', '-0', '99999999999999999999.99'],
+    'AccountBalance': ['', '0.005', '-$5', '0012.30'],
+    'Points': ['', '5', '1.0'],
+    'LastPurchase': ['', '2024-01-05 10:11:12', '2024-01-05 10:11:12.123', '2024-01-05', '01/05/2024',
+                     '25/12/2024', '2024-02-30', '0999-01-01', 'garbage', '2024-1-5', '2024-01-05T10:00:00',
+                     '2024-01-05 25:00:00'],
+    'Remark': ['', 'multi\nline', 'quoted "text", with comma'],
+    'ProductID': ['7', ''],
+    'Code': ['', 'SKU-1'],
+    'Description': ['', 'Widget', 'Y' * 300],
+    'Status': ['A', 'I', ''],
+    'Cost': ['', '$2.50', 'x'],
+    'SellPrice': ['', '0', '19.99', '$1,000'],
+    'Category1': ['', 'HW', 'hw', 'Unknown'],
+    'Department': ['', 'R', ' R'],
+    'Supplier': ['', 'SUP001', 'SUP999']
+}
+
+CUSTOMER_COLUMNS = ['CustomerID', 'FirstName', 'LastName', 'CompanyName', 'Email', 'Phone', 'Cellular',
+                    'Country', 'CreditLimit', 'AccountBalance', 'Points', 'LastPurchase', 'Remark']
+PRODUCT_COLUMNS = ['ProductID', 'Code', 'Description', 'Status', 'Cost', 'SellPrice', 'Category1',
+                   'Department', 'Supplier']
+
+# Dimension labels the codes resolve against
+DIMENSIONS = {
+    'Category': {'checksum': None, 'labels': {'HW': 'Hardware'}},
+    'Department': {'checksum': None, 'labels': {'R': 'Retail'}},
+    'Supplier': {'checksum': None, 'labels': {'SUP001': 'Acme Supply'}}
+}
+
+OUTPUTS = [ACCOUNTS_OUTPUT, PRODUCTS_OUTPUT, PRICEBOOK_OUTPUT]
+
+# Uneven chunk size, so chunks end mid-way through the case cycles
+BATCH_SIZE = 257
+
+def write_cases(path, columns, rows=2000):
+    """Write a CSV combining CASES values for the given columns"""
+    cycles = [itertools.cycle(CASES[c]) for c in columns]
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for i in range(rows):
+            # Advance each column at a different rate to mix combinations
+            writer.writerow([next(cycle) for cycle in cycles])
+            for j, cycle in enumerate(cycles):
+                for _ in range(i % (j + 2)):
+                    next(cycle)
+
+@pytest.fixture(scope='module')
+def inputs(tmp_path_factory):
+    input_dir = tmp_path_factory.mktemp('inputs')
+    customers, products = str(input_dir / 'customers.csv'), str(input_dir / 'products.csv')
+    write_cases(customers, CUSTOMER_COLUMNS)
+    write_cases(products, PRODUCT_COLUMNS)
+    return customers, products
+
+def run_transform(work_dir, customers, products, batch=False, workers=1):
+    """Transform both inputs into ``work_dir``; returns the transformer's stats"""
+    for output in OUTPUTS:
+        os.makedirs(os.path.join(work_dir, os.path.dirname(output)), exist_ok=True)
+    transformer = DataTransformer()
+    transformer.dimensions = DimensionCache(DIMENSIONS)
+    transformer.validator = FieldValidator(os.path.join(REPO_DIR, METADATA_DIR))
+    cwd = os.getcwd()
+    os.chdir(work_dir)
+    try:
+        if workers > 1:
+            transformer.transform_parallel('accounts', customers, workers, batch, BATCH_SIZE)
+            transformer.transform_parallel('products', products, workers, batch, BATCH_SIZE)
+        else:
+            transformer.transform_accounts(customers, batch=batch, batch_size=BATCH_SIZE)
+            transformer.transform_products(products, batch=batch, batch_size=BATCH_SIZE)
+    finally:
+        os.chdir(cwd)
+    return transformer.stats
+
+@pytest.mark.parametrize('batch, workers', [(True, 1), (False, 3), (True, 3)],
+                         ids=['batch', 'workers', 'batch-workers'])
+def test_matches_row_transform(tmp_path, inputs, batch, workers):
+    row_dir, other_dir = tmp_path / 'row', tmp_path / 'other'
+    row_stats = run_transform(row_dir, *inputs)
+    other_stats = run_transform(other_dir, *inputs, batch=batch, workers=workers)
+
+    assert row_stats['accounts_processed'] > 0 and row_stats['rejected'] > 0
+    for output in OUTPUTS:
+        for path in (output, rejects_file(output)):
+            assert filecmp.cmp(row_dir / path, other_dir / path, shallow=False), path
+    assert other_stats == row_stats
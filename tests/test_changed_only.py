@@ -0,0 +1,104 @@
+"""--changed-only keeps records that did not make it into Salesforce out of the deletes and re-emits them"""
+
+import csv
+import os
+
+import pytest
+
+from field_validator import METADATA_DIR, FieldValidator
+from transform_data import PRICEBOOK_OUTPUT, PRODUCTS_OUTPUT, DataTransformer, commit_loaded, deletes_file
+from xref_index import XrefIndex
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEADER = ['ProductID', 'Code', 'Description', 'Cost', 'SellPrice']
+
+# Success file of the products process, as load_salesforce.py writes it
+SUCCESS_FILE = 'results/productsSuccess.csv'
+
+PROCESSES = {'products': {'input': PRODUCTS_OUTPUT, 'success': SUCCESS_FILE}}
+
+@pytest.fixture
+def work_dir(tmp_path):
+    os.makedirs(tmp_path / os.path.dirname(PRODUCTS_OUTPUT))
+    os.makedirs(tmp_path / 'results')
+    cwd = os.getcwd()
+    os.chdir(tmp_path)
+    yield tmp_path
+    os.chdir(cwd)
+
+def transform(rows, failing_cost=None, resolve_ids=False):
+    """Run the Product2 transform and --changed-only over ``rows``; returns the IDs written and deleted"""
+    with open('products.csv', 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        writer.writerows(rows)
+    transformer = DataTransformer()
+    transformer.validator = FieldValidator(os.path.join(REPO_DIR, METADATA_DIR))
+    if failing_cost:
+        clean_currency = transformer.clean_currency
+        def raising(value):
+            if value == failing_cost:
+                raise ValueError("unreadable cost")
+            return clean_currency(value)
+        transformer.clean_currency = raising
+    transformer.transform_products('products.csv')
+    if resolve_ids:
+        transformer.resolve_references([PRICEBOOK_OUTPUT])
+    transformer.write_changed_only([PRODUCTS_OUTPUT, PRICEBOOK_OUTPUT])
+    return external_ids(PRODUCTS_OUTPUT), external_ids(deletes_file(PRODUCTS_OUTPUT))
+
+def external_ids(path, id_field='Aralco_Product_ID__c'):
+    with open(path, newline='', encoding='utf-8') as f:
+        return [row[id_field] for row in csv.DictReader(f)]
+
+def load(ids, success_file=SUCCESS_FILE, id_field='Aralco_Product_ID__c', processes=PROCESSES):
+    """Write a success file for ``ids`` and commit it"""
+    with open(success_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['ID', id_field, 'STATUS'])
+        writer.writerows([f"01t{i:0>15}", i, 'Item Created'] for i in ids)
+    return commit_loaded(processes)
+
+ROWS = [['1', 'SKU-1', 'Widget', '1.00', '2.00'], ['2', 'SKU-2', 'Gadget', '2.00', '4.00'],
+        ['3', 'SKU-3', 'Gizmo', '3.00', '6.00']]
+
+def test_failed_and_rejected_records_are_not_deleted(work_dir):
+    assert transform(ROWS) == (['1', '2', '3'], [])
+    assert load(['1', '2', '3']) == {'Product2': 3}
+
+    # 2 hits a transform error, 3 fails validation (Name is required)
+    rows = [ROWS[0], ROWS[1], ['3', '', '', '3.00', '6.00']]
+    assert transform(rows, failing_cost='2.00') == ([], [])
+
+    # Gone from the source for real
+    assert transform(ROWS[:1]) == ([], ['2', '3'])
+
+def test_hashes_count_once_loaded(work_dir):
+    assert transform(ROWS) == (['1', '2', '3'], [])
+    # Only 1 and 3 made it into Salesforce
+    assert load(['1', '3']) == {'Product2': 2}
+    assert transform(ROWS) == (['2'], [])
+
+    changed = [ROWS[0], ROWS[1], ['3', 'SKU-3', 'Gizmo XL', '3.00', '6.00']]
+    assert transform(changed) == (['2', '3'], [])
+    # The load of that run failed altogether, so the same records come again
+    assert transform(changed) == (['2', '3'], [])
+    load(['2', '3'])
+    assert transform(changed) == ([], [])
+
+def test_orphans_are_not_deleted(work_dir):
+    entries = {'pricebook': {'input': PRICEBOOK_OUTPUT, 'success': 'results/pricebookSuccess.csv'}}
+    index = XrefIndex()
+    index.add('Product2', [('1', '01t1'), ('2', '01t2'), ('3', '01t3')])
+    transform(ROWS, resolve_ids=True)
+    assert load(['1-STD', '2-STD', '3-STD'], entries['pricebook']['success'], 'Aralco_Pricebook_Entry_ID__c',
+                entries) == {'PricebookEntry': 3}
+
+    # Product 2 is no longer in the cross-reference index, so its entry is orphaned
+    index.conn.execute("DELETE FROM xref WHERE external_id = '2'")
+    index.conn.commit()
+    index.close()
+    transform([ROWS[0], ROWS[1], ['3', 'SKU-3', 'Gizmo', '3.00', '7.00']], resolve_ids=True)
+    assert external_ids(PRICEBOOK_OUTPUT, 'Aralco_Pricebook_Entry_ID__c') == ['3-STD']
+    assert external_ids(deletes_file(PRICEBOOK_OUTPUT), 'Aralco_Pricebook_Entry_ID__c') == []
@@ -0,0 +1,79 @@
+"""A --checkpoint run that crashes resumes to the output of an uninterrupted run"""
+
+import json
+import os
+import sys
+
+import pytest
+
+import transform_data
+from generate_synthetic_data import generate
+from transform_data import (ACCOUNTS_OUTPUT, CHECKPOINT_FILE, ERRORS_OUTPUT, INVENTORY_OUTPUT, INVENTORY_ROLLUP_OUTPUT,
+                            ORDER_ITEMS_OUTPUT, ORDERS_OUTPUT, PRICEBOOK_OUTPUT, PRODUCTS_OUTPUT)
+
+OUTPUTS = [ACCOUNTS_OUTPUT, PRODUCTS_OUTPUT, PRICEBOOK_OUTPUT, ORDERS_OUTPUT, ORDER_ITEMS_OUTPUT,
+           INVENTORY_OUTPUT, INVENTORY_ROLLUP_OUTPUT]
+
+SUMMARY_FILE = 'exports/salesforce_ready/transformation_summary.json'
+
+@pytest.fixture(scope='module')
+def staging(tmp_path_factory):
+    input_dir, _ = generate(scale=0.01, output_dir=str(tmp_path_factory.mktemp('checkpoint') / 'staging'))
+    return input_dir
+
+def run(path, monkeypatch, staging, *options):
+    """Run transform_data.py in ``path``; returns the outputs, statistics and error messages"""
+    os.makedirs(path, exist_ok=True)
+    monkeypatch.chdir(path)
+    for output in OUTPUTS:
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    monkeypatch.setattr(sys, 'argv', ['transform_data.py', '--input-dir', staging] + list(options))
+    transform_data.main()
+    outputs = {}
+    for output in OUTPUTS:
+        with open(output, 'rb') as f:
+            outputs[output] = f.read()
+    with open(SUMMARY_FILE) as f:
+        statistics = json.load(f)['statistics']
+    with open(ERRORS_OUTPUT, encoding='utf-8') as f:
+        errors = [json.loads(line).get('error') for line in f]
+    return outputs, statistics, [error for error in errors if error]
+
+def crash(path, monkeypatch, staging, after, *options):
+    """Start a --checkpoint run that dies right after the ``after``-th chunk
+    append, before that chunk is committed"""
+    append_part = transform_data._append_part
+    calls = []
+    def failing(*args, **kwargs):
+        append_part(*args, **kwargs)
+        calls.append(args)
+        if len(calls) == after:
+            raise OSError("disk full")
+    monkeypatch.setattr(transform_data, '_append_part', failing)
+    with pytest.raises(OSError):
+        run(path, monkeypatch, staging, '--checkpoint', *options)
+    monkeypatch.setattr(transform_data, '_append_part', append_part)
+    assert os.path.exists(CHECKPOINT_FILE)
+
+# In the accounts, between the products and price book appends of a chunk,
+# in the orders and in the single inventory chunk
+@pytest.mark.parametrize('after', [3, 14, 40, 56])
+def test_resume_matches_an_uninterrupted_run(staging, tmp_path, monkeypatch, capsys, after):
+    expected = run(tmp_path / 'uninterrupted', monkeypatch, staging)
+
+    crash(tmp_path / 'crashed', monkeypatch, staging, after, '--checkpoint-rows', '40')
+    capsys.readouterr()
+    assert run(tmp_path / 'crashed', monkeypatch, staging, '--checkpoint', '--checkpoint-rows', '40') == expected
+    assert 'Resuming the interrupted run' in capsys.readouterr().out
+    assert not os.path.exists(CHECKPOINT_FILE)
+
+def test_changed_settings_start_over(staging, tmp_path, monkeypatch, capsys):
+    expected = run(tmp_path / 'uninterrupted', monkeypatch, staging)
+
+    crash(tmp_path / 'crashed', monkeypatch, staging, 7, '--checkpoint-rows', '40')
+    with open(CHECKPOINT_FILE) as f:
+        assert json.load(f)['stages']
+    capsys.readouterr()
+    assert run(tmp_path / 'crashed', monkeypatch, staging, '--checkpoint', '--checkpoint-rows', '60') == expected
+    out = capsys.readouterr().out
+    assert 'starting over' in out and 'Resuming' not in out
@@ -0,0 +1,68 @@
+"""dedupe_accounts.py only merges customers whose name and an email or phone agree"""
+
+import csv
+
+import pytest
+
+from dedupe_accounts import dedupe_customers, load_merge_map, match, match_profile
+from transform_data import DataTransformer
+
+HEADER = ['CustomerID', 'FirstName', 'LastName', 'CompanyName', 'Email', 'Phone', 'Cellular',
+          'Address1', 'PostalCode', 'LastUpdated']
+
+CUSTOMERS = [
+    ['1', 'John', 'Smith', '', 'john@example.com', '416-555-0001', '', '', 'M5V 1A1', '2020-01-01 09:00:00'],
+    # Re-entered at the till with a differently typed email
+    ['2', 'JOHN', 'Smith ', '', 'JOHN@EXAMPLE.COM', '', '', '', '', '2019-05-01 09:00:00'],
+    # Same household phone, different person
+    ['3', 'Mary', 'Smith', '', 'mary@example.com', '(416) 555-0001', '', '', 'M5V 1A1', '2020-01-01 09:00:00'],
+    # Namesake at the same postal code, nothing else shared
+    ['4', 'John', 'Smith', '', '', '905-555-0004', '', '', 'M5V 1A1', '2020-01-01 09:00:00'],
+    # Same name and phone as 1, the most complete record
+    ['5', 'John', 'Smith', '', '', '4165550001', '647-555-0005', '1 King St', 'M5V1A1', '2018-01-01 09:00:00'],
+    # Equally complete business duplicates; the later update survives
+    ['6', '', '', 'Acme Ltd', 'info@acme.com', '', '', '2 Bay St', 'M5J 2N8', '2021-03-01 09:00:00'],
+    ['7', '', '', 'Acme Ltd', 'info@acme.com', '', '', '2 Bay St', 'M5J 2N8', '2023-03-01 09:00:00']
+]
+
+@pytest.fixture
+def result(tmp_path):
+    input_file = tmp_path / 'Customer.csv'
+    with open(input_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        writer.writerows(CUSTOMERS)
+    survivors_file, merge_map_file = tmp_path / 'survivors.csv', tmp_path / 'merge_map.csv'
+    stats = dedupe_customers(str(input_file), str(survivors_file), str(merge_map_file), run_size=3)
+    with open(survivors_file, newline='', encoding='utf-8') as f:
+        survivors = {row['CustomerID']: row for row in csv.DictReader(f)}
+    with open(merge_map_file, newline='', encoding='utf-8') as f:
+        matched_on = {row['CustomerID']: row['MatchedOn'] for row in csv.DictReader(f)}
+    return stats, survivors, load_merge_map(str(merge_map_file)), matched_on
+
+def profile(row):
+    return match_profile(dict(zip(HEADER, row)), DataTransformer())
+
+def test_match_needs_name_and_email_or_phone():
+    assert match(profile(CUSTOMERS[0]), profile(CUSTOMERS[1])) == ['email']
+    assert match(profile(CUSTOMERS[0]), profile(CUSTOMERS[4])) == ['phone']
+    # Shared phone or shared name alone
+    assert match(profile(CUSTOMERS[0]), profile(CUSTOMERS[2])) is None
+    assert match(profile(CUSTOMERS[0]), profile(CUSTOMERS[3])) is None
+
+def test_clusters_and_merge_map(result):
+    stats, survivors, merge_map, matched_on = result
+    assert merge_map == {'1': '5', '2': '5', '6': '7'}
+    assert matched_on == {'1': 'email+phone', '2': 'email', '6': 'email'}
+    assert sorted(survivors, key=int) == ['3', '4', '5', '7']
+    assert stats['customers'] == 7 and stats['merged'] == 3 and stats['survivors'] == 4
+
+def test_survivor_is_filled_from_its_duplicates(result):
+    _, survivors, _, _ = result
+    john = survivors['5']
+    # Kept from the survivor
+    assert (john['Phone'], john['Address1'], john['PostalCode']) == ('4165550001', '1 King St', 'M5V1A1')
+    # Filled from the next most complete duplicate (1, then 2)
+    assert john['Email'] == 'john@example.com'
+    # Untouched customers are written as they were
+    assert [survivors['3'][column] for column in HEADER] == CUSTOMERS[2]
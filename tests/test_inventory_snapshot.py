@@ -0,0 +1,91 @@
+"""--changed-only diffs each Inventory snapshot against the last loaded one"""
+
+import csv
+import os
+
+import pytest
+
+from load_salesforce import PROCESS_CONF, load_process_conf
+from transform_data import INVENTORY_OUTPUT, INVENTORY_ROLLUP_OUTPUT, DataTransformer, commit_loaded, deletes_file
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEADER = ['ProductID', 'StoreID', 'OnHand', 'Available', 'OnOrder', 'LastSold']
+
+# LastSold 'garbage' makes a store row fail to transform
+SNAPSHOT = [
+    ['1', '1', '5', '4', '0', '2024-01-01'],
+    ['1', '2', '3', '3', '1', 'garbage'],
+    ['2', '1', '0', '0', '2', ''],
+    ['3', '1', '1', '1', '0', '']
+]
+
+PROCESSES = {
+    'storeInventoryImport': {'input': INVENTORY_OUTPUT, 'success': 'results/storeInventoryImportSuccess.csv'},
+    'productInventoryImport': {'input': INVENTORY_ROLLUP_OUTPUT, 'success': 'results/productInventoryImportSuccess.csv'}
+}
+
+@pytest.fixture
+def work_dir(tmp_path, monkeypatch):
+    os.makedirs(tmp_path / os.path.dirname(INVENTORY_OUTPUT))
+    os.makedirs(tmp_path / 'results')
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+def read_rows(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+def transform(rows):
+    """Transform a snapshot with --changed-only; returns the store IDs written and deleted and the rollup rows"""
+    with open('Inventory.csv', 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        writer.writerows(rows)
+    transformer = DataTransformer()
+    transform_date = transformer.transform_date
+    def raising(value, column=None):
+        if value == 'garbage':
+            raise ValueError("unreadable date")
+        return transform_date(value, column)
+    transformer.transform_date = raising
+    assert transformer.transform_inventory('Inventory.csv')
+    transformer.write_changed_only([INVENTORY_OUTPUT, INVENTORY_ROLLUP_OUTPUT])
+    stores = [row['Aralco_Inventory_ID__c'] for row in read_rows(INVENTORY_OUTPUT)]
+    deleted = [row['Aralco_Inventory_ID__c'] for row in read_rows(deletes_file(INVENTORY_OUTPUT))]
+    rollups = {row['Aralco_Product_ID__c']: (row['Quantity_On_Hand__c'], row['On_Order__c'], row['Stores_In_Stock__c'])
+               for row in read_rows(INVENTORY_ROLLUP_OUTPUT)}
+    return stores, deleted, rollups
+
+def load():
+    """Write success files holding every row of both import files and commit them"""
+    for process in PROCESSES.values():
+        rows = read_rows(process['input'])
+        with open(process['success'], 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['ID'] + list(rows[0]) + ['STATUS'] if rows else ['ID', 'STATUS'])
+            writer.writerows(['a00'] + list(row.values()) + ['Item Updated'] for row in rows)
+    return commit_loaded(PROCESSES)
+
+def test_rollup_is_loaded_by_a_product_process():
+    process = load_process_conf(os.path.join(REPO_DIR, PROCESS_CONF))['productInventoryImport']
+    assert (process['object'], process['external_id']) == ('Product2', 'Aralco_Product_ID__c')
+    assert os.path.normpath(process['input']).endswith(os.path.normpath(INVENTORY_ROLLUP_OUTPUT))
+
+def test_snapshot_diff(work_dir):
+    stores, deleted, rollups = transform(SNAPSHOT)
+    assert stores == ['1-1', '2-1', '3-1'] and deleted == []
+    # The store row that failed still counts towards its product
+    assert rollups == {'1': ('8', '1', '2'), '2': ('0', '2', '0'), '3': ('1', '0', '1')}
+    assert load() == {'Store_Inventory__c': 3, 'Product2 inventory': 3}
+
+    # Product 1 moved at store 1; product 3 left the snapshot
+    changed = [['1', '1', '6', '4', '0', '2024-01-01'], SNAPSHOT[1], SNAPSHOT[2]]
+    stores, deleted, rollups = transform(changed)
+    assert stores == ['1-1'] and deleted == ['3-1']
+    assert rollups == {'1': ('9', '1', '2'), '3': ('0', '0', '0')}
+
+    # Not loaded yet, so the rollup changes are written again
+    assert transform(changed)[2] == rollups
+    load()
+    assert transform(changed) == ([], [], {})
@@ -0,0 +1,123 @@
+"""load_salesforce.py end to end against the Bulk API 2.0 stub"""
+
+import csv
+import json
+import os
+import shutil
+import sys
+
+import pytest
+
+import load_salesforce
+from bulk_api_stub import ACCESS_TOKEN, BulkApiStub
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ACCOUNTS = [
+    ['Aralco_Customer_ID__c', 'Name', 'Phone'],
+    ['1', 'Acme Ltd', '(416) 555-0001'],
+    ['2', '', '(416) 555-0002'],
+    ['3', 'Jane Smith', '']
+]
+
+def missing_name(record):
+    if 'Name' in record and not record['Name']:
+        return "REQUIRED_FIELD_MISSING:Required fields are missing: [Name]:Name --"
+    return None
+
+def write_csv(path, rows):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        csv.writer(f).writerows(rows)
+
+def read_csv(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.reader(f))
+
+@pytest.fixture
+def work_dir(tmp_path, monkeypatch):
+    shutil.copytree(os.path.join(REPO_DIR, 'dataloader'), tmp_path / 'dataloader')
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(load_salesforce, 'ACCESS_TOKEN', ACCESS_TOKEN)
+    monkeypatch.setattr(load_salesforce, 'POLL_INITIAL', 0.01)
+    return tmp_path
+
+def run_main(monkeypatch, stub, *args):
+    monkeypatch.setattr(sys, 'argv', ['load_salesforce.py', '--instance-url', stub.url] + list(args))
+    load_salesforce.main()
+    with open('results/load_summary.json', encoding='utf-8') as f:
+        return json.load(f)
+
+def test_main_loads_through_the_bulk_api(work_dir, monkeypatch):
+    write_csv('exports/salesforce_ready/accounts/accounts_import.csv', ACCOUNTS)
+    with BulkApiStub(fail=missing_name) as stub:
+        summary = run_main(monkeypatch, stub, '--process', 'accountImport')
+
+        assert 'error' not in summary
+        assert summary['processes']['accountImport']['successes'] == 2
+        assert summary['processes']['accountImport']['errors'] == 1
+        success = read_csv('results/accountImportSuccess.csv')
+        assert success[0] == ['ID'] + ACCOUNTS[0] + ['STATUS']
+        assert [row[1:] for row in success[1:]] == [ACCOUNTS[1] + ['Item Created'], ACCOUNTS[3] + ['Item Created']]
+        assert [row[0] for row in success[1:]] == [stub.records['Account']['1'], stub.records['Account']['3']]
+        error = read_csv('results/accountImportError.csv')
+        assert error == [ACCOUNTS[0] + ['ERROR'], ACCOUNTS[2] + [missing_name({'Name': ''})]]
+
+        job_id = next(iter(stub.jobs))
+        assert stub.jobs[job_id]['state'] == 'JobComplete'
+        assert stub.jobs[job_id]['externalIdFieldName'] == 'Aralco_Customer_ID__c'
+        for method, path in [('PUT', f"/{job_id}/batches"), ('PATCH', f"/{job_id}"),
+                             ('GET', f"/{job_id}/successfulResults/"), ('GET', f"/{job_id}/failedResults/")]:
+            assert (method, f"/services/data/{load_salesforce.API_VERSION}/jobs/ingest{path}") in stub.requests
+
+        # Upserting again updates the same records
+        run_main(monkeypatch, stub, '--process', 'accountImport')
+        assert [row[-1] for row in read_csv('results/accountImportSuccess.csv')[1:]] == ['Item Updated'] * 2
+        assert len(stub.records['Account']) == 2
+
+def test_scheduler_splits_jobs(work_dir):
+    rows = [ACCOUNTS[0]] + [[str(i), f"Customer {i}", ''] for i in range(1, 201)]
+    write_csv('exports/salesforce_ready/accounts/accounts_import.csv', rows)
+    processes = load_salesforce.load_process_conf()
+    with BulkApiStub() as stub:
+        client = load_salesforce.BulkClient(stub.url, ACCESS_TOKEN)
+        summary = load_salesforce.LoadScheduler(client, processes, ['accountImport'], 2, 1024).run()
+
+    assert summary['accountImport']['jobs'] > 1
+    assert summary['accountImport']['successes'] == 200
+    assert sorted(stub.records['Account'], key=int) == [str(i) for i in range(1, 201)]
+
+def test_scheduler_loads_parents_before_children(work_dir):
+    products = [['Aralco_Product_ID__c', 'Name']] + [[str(i), f"Product {i}"] for i in range(1, 101)]
+    entries = [['Aralco_Pricebook_Entry_ID__c', 'Product2.Aralco_Product_ID__c', 'Pricebook2.Name', 'UnitPrice']]
+    entries += [[f"{i}-STD", str(i), 'Standard Price Book', '9.99'] for i in range(1, 101)]
+    write_csv('exports/salesforce_ready/products/products_import.csv', products)
+    write_csv('exports/salesforce_ready/products/pricebook_entries.csv', entries)
+    processes = load_salesforce.load_process_conf()
+    with BulkApiStub() as stub:
+        client = load_salesforce.BulkClient(stub.url, ACCESS_TOKEN)
+        summary = load_salesforce.LoadScheduler(client, processes, ['productImport', 'pricebookImport'],
+                                                3, 512).run()
+
+    assert summary['pricebookImport']['depends_on'] == ['productImport']
+    for name in ['productImport', 'pricebookImport']:
+        assert summary[name]['jobs'] > 1 and summary[name]['failed_jobs'] == 0
+        assert summary[name]['successes'] == 100 and summary[name]['errors'] == 0
+    assert len(stub.records['PricebookEntry']) == 100
+
+def test_rollup_updates_wait_for_their_products(work_dir):
+    products = [['Aralco_Product_ID__c', 'Name']] + [[str(i), f"Product {i}"] for i in range(1, 101)]
+    rollups = [['Aralco_Product_ID__c', 'Quantity_On_Hand__c']] + [[str(i), '5'] for i in range(1, 101)]
+    write_csv('exports/salesforce_ready/products/products_import.csv', products)
+    write_csv('exports/salesforce_ready/inventory/product_inventory.csv', rollups)
+    processes = load_salesforce.load_process_conf()
+    with BulkApiStub() as stub:
+        client = load_salesforce.BulkClient(stub.url, ACCESS_TOKEN)
+        summary = load_salesforce.LoadScheduler(client, processes, ['productImport', 'productInventoryImport'],
+                                                3, 512).run()
+
+    assert summary['productInventoryImport']['depends_on'] == ['productImport']
+    assert summary['productInventoryImport']['successes'] == 100
+    # Every rollup row updated a product the product load created
+    assert {row[-1] for row in read_csv('results/productInventoryImportSuccess.csv')[1:]} == {'Item Updated'}
+    assert len(stub.records['Product2']) == 100
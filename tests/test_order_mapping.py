@@ -0,0 +1,44 @@
+"""Order Type and Account come out of the mapping as 03_extract_transactions.sql defines them"""
+
+import pytest
+
+from transform_data import ORDER_FIELDS, ORDER_PLAN, DataTransformer
+
+# AccountCustomerID is the CustomerID the extraction resolved CustomerID (the POS code) to
+HEADER = ['POSTransHeadID', 'CustomerID', 'AccountCustomerID', 'TransType', 'Status']
+ROWS = [
+    ['1', '500001', '1', 'SALE', 'C'],
+    ['2', '500002', '2', 'return', 'C'],
+    ['3', '', '', 'LAYAWAY ', 'C'],
+    ['4', '500009', '', 'QUOTE', 'H'],
+    ['5', '500001', '1', 'S', 'C'],
+    ['6', '500003', '3', '', 'C']
+]
+
+def transformer(merges=None):
+    t = DataTransformer()
+    t.account_merge_map = merges or {}
+    return t
+
+def order_values(t, field):
+    position = ORDER_FIELDS.index(field)
+    order = ORDER_PLAN.row_function(t, HEADER)
+    return [order(row)[position] for row in ROWS]
+
+def test_order_type_picklist():
+    assert order_values(transformer(), 'Type') == ['Sale', 'Return', 'Layaway', 'Quote', 'Other', 'Other']
+
+def test_account_from_resolved_customer_or_walk_in():
+    assert order_values(transformer(), 'Account.Aralco_Customer_ID__c') == ['1', '2', 'WALK-IN', 'WALK-IN', '1', '3']
+
+def test_account_follows_dedupe_merges():
+    t = transformer(merges={'3': '1'})
+    assert order_values(t, 'Account.Aralco_Customer_ID__c') == ['1', '2', 'WALK-IN', 'WALK-IN', '1', '1']
+
+def test_column_plan_matches_row_function():
+    pd = pytest.importorskip('pandas')
+    t = transformer(merges={'3': '1'})
+    frame = pd.DataFrame(ROWS, columns=HEADER, dtype=object)
+    columns = [column.tolist() for column in ORDER_PLAN.columns(t, frame)]
+    order = ORDER_PLAN.row_function(t, HEADER)
+    assert [list(values) for values in zip(*columns)] == [order(row) for row in ROWS]
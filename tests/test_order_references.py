@@ -0,0 +1,82 @@
+"""Every Order and OrderItem lookup points at a record the same run writes"""
+
+import csv
+import os
+
+import pytest
+
+from field_validator import METADATA_DIR, FieldValidator, rejects_file
+from generate_synthetic_data import generate
+from transform_data import (ACCOUNTS_OUTPUT, ORDER_ITEMS_OUTPUT, ORDERS_OUTPUT, PRICEBOOK_OUTPUT, PRODUCTS_OUTPUT,
+                            WALK_IN_CUSTOMER, DataTransformer)
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PRODUCT_HEADER = ['ProductID', 'Code', 'Description', 'Cost', 'SellPrice']
+
+ORDER = {'POSTransHeadID': '1', 'TransDate': '2024-01-02 10:00:00', 'Status': 'C'}
+
+def column(path, field):
+    with open(path, newline='', encoding='utf-8') as f:
+        return [row[field] for row in csv.DictReader(f)]
+
+@pytest.fixture(scope='module')
+def outputs(tmp_path_factory):
+    work_dir = tmp_path_factory.mktemp('references')
+    cwd = os.getcwd()
+    os.chdir(work_dir)
+    try:
+        input_dir, _ = generate(scale=0.01, output_dir='staging')
+        for output in (ACCOUNTS_OUTPUT, PRODUCTS_OUTPUT, ORDERS_OUTPUT):
+            os.makedirs(os.path.dirname(output), exist_ok=True)
+        transformer = DataTransformer()
+        assert transformer.transform_accounts(os.path.join(input_dir, 'Customer.csv'))
+        assert transformer.transform_products(os.path.join(input_dir, 'Product.csv'))
+        assert transformer.transform_orders(os.path.join(input_dir, 'POSTransHead.csv'),
+                                            os.path.join(input_dir, 'POSTransItem.csv'))
+        yield work_dir
+    finally:
+        os.chdir(cwd)
+
+def test_every_item_has_a_pricebook_entry(outputs):
+    entries = set(column(outputs / PRICEBOOK_OUTPUT, 'Aralco_Pricebook_Entry_ID__c'))
+    references = column(outputs / ORDER_ITEMS_OUTPUT, 'PricebookEntry.Aralco_Pricebook_Entry_ID__c')
+    assert references and set(references) <= entries
+    # Products without a SellPrice are in the price book at 0.00
+    assert '0.00' in column(outputs / PRICEBOOK_OUTPUT, 'UnitPrice')
+
+def test_every_order_has_an_account(outputs):
+    accounts = column(outputs / ACCOUNTS_OUTPUT, 'Aralco_Customer_ID__c')
+    references = column(outputs / ORDERS_OUTPUT, 'Account.Aralco_Customer_ID__c')
+    assert accounts.count(WALK_IN_CUSTOMER['CustomerID']) == 1
+    assert WALK_IN_CUSTOMER['CustomerID'] in references
+    assert set(references) <= set(accounts)
+
+@pytest.mark.parametrize('batch', [False, True])
+def test_items_of_rejected_products_are_rejected(tmp_path, monkeypatch, batch):
+    if batch:
+        pytest.importorskip('pandas')
+    monkeypatch.chdir(tmp_path)
+    for output in (PRODUCTS_OUTPUT, ORDERS_OUTPUT):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open('Product.csv', 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(PRODUCT_HEADER)
+        # 2 has no Name, so validation rejects it
+        writer.writerows([['1', 'SKU-1', 'Widget', '1.00', '2.00'], ['2', '', '', '1.00', '2.00']])
+    transformer = DataTransformer()
+    transformer.validator = FieldValidator(os.path.join(REPO_DIR, METADATA_DIR))
+    assert transformer.transform_products('Product.csv', batch=batch)
+    assert transformer.errors.failed == {'Product2': {'2'}, 'PricebookEntry': {'2-STD'}}
+
+    items = [{'POSTransItemID': '10', 'POSTransHeadID': '1', 'ProductID': '1', 'Quantity': '1', 'SellPrice': '2'},
+             {'POSTransItemID': '11', 'POSTransHeadID': '1', 'ProductID': '2', 'Quantity': '1', 'SellPrice': '2'}]
+    assert transformer.transform_orders('POSTransHead', 'POSTransItem', header_rows=[ORDER],
+                                        item_rows=items)
+    assert column(ORDER_ITEMS_OUTPUT, 'Aralco_Line_Item_ID__c') == ['10']
+    with open(rejects_file(ORDER_ITEMS_OUTPUT), newline='', encoding='utf-8') as f:
+        rejected = list(csv.DictReader(f))
+    assert [row['Aralco_Line_Item_ID__c'] for row in rejected] == ['11']
+    assert 'Product2 2 was rejected' in rejected[0]['ERROR']
+    # Kept out of the --changed-only deletes like any other reject
+    assert transformer.errors.failed['OrderItem'] == {'11'}
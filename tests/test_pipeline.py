@@ -0,0 +1,90 @@
+"""pipeline.py writes what a transform of the staging files writes, and never strands its extractors"""
+
+import functools
+import os
+import threading
+
+import pytest
+
+from analyze_database import EXTRACT_TABLES, ConnectionPool, connect_sqlite
+from generate_synthetic_data import generate, write_sqlite
+from pipeline import run_pipeline
+from transform_data import (ACCOUNTS_OUTPUT, INVENTORY_OUTPUT, INVENTORY_ROLLUP_OUTPUT, ORDER_ITEMS_OUTPUT,
+                            ORDERS_OUTPUT, PRICEBOOK_OUTPUT, PRODUCTS_OUTPUT, DataTransformer)
+
+OUTPUTS = [ACCOUNTS_OUTPUT, PRODUCTS_OUTPUT, PRICEBOOK_OUTPUT, ORDERS_OUTPUT, ORDER_ITEMS_OUTPUT,
+           INVENTORY_OUTPUT, INVENTORY_ROLLUP_OUTPUT]
+
+@pytest.fixture(scope='module')
+def database(tmp_path_factory):
+    """Synthetic staging files and the SQLite stand-in loaded from them"""
+    work_dir = tmp_path_factory.mktemp('pipeline')
+    input_dir, _ = generate(scale=0.01, output_dir=str(work_dir / 'staging'))
+    write_sqlite(input_dir, str(work_dir / 'aralco.sqlite'))
+    return work_dir, input_dir
+
+def run_in(path, monkeypatch):
+    os.makedirs(path)
+    monkeypatch.chdir(path)
+    for output in OUTPUTS:
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+
+def pool(work_dir):
+    return ConnectionPool(len(EXTRACT_TABLES), functools.partial(connect_sqlite, str(work_dir / 'aralco.sqlite')))
+
+def read_outputs(path):
+    outputs = {}
+    for output in OUTPUTS:
+        with open(path / output, 'rb') as f:
+            outputs[output] = f.read()
+    return outputs
+
+@pytest.mark.parametrize('batch', [False, True])
+def test_pipeline_matches_the_staged_transform(database, tmp_path, monkeypatch, batch):
+    if batch:
+        pytest.importorskip('pandas')
+    work_dir, input_dir = database
+
+    run_in(tmp_path / 'staged', monkeypatch)
+    transformer = DataTransformer()
+    assert transformer.transform_accounts(os.path.join(input_dir, 'Customer.csv'), batch=batch)
+    assert transformer.transform_products(os.path.join(input_dir, 'Product.csv'), batch=batch)
+    assert transformer.transform_orders(os.path.join(input_dir, 'POSTransHead.csv'),
+                                        os.path.join(input_dir, 'POSTransItem.csv'))
+    assert transformer.transform_inventory(os.path.join(input_dir, 'Inventory.csv'))
+
+    run_in(tmp_path / 'pipelined', monkeypatch)
+    connections = pool(work_dir)
+    try:
+        # Small pages and a one-page queue keep every extractor waiting on its transform
+        timings = run_pipeline(connections, DataTransformer(), chunk_size=7, queue_size=1, batch=batch)
+    finally:
+        connections.close_all()
+    assert timings['succeeded']
+
+    staged, pipelined = read_outputs(tmp_path / 'staged'), read_outputs(tmp_path / 'pipelined')
+    for output in OUTPUTS:
+        assert pipelined[output] == staged[output], output
+
+def test_failed_transform_releases_its_extractors(database, tmp_path, monkeypatch):
+    work_dir, _ = database
+    run_in(tmp_path / 'failed', monkeypatch)
+
+    def failing(self, *args, **kwargs):
+        print("❌ Error transforming orders: injected")
+        return False
+    monkeypatch.setattr(DataTransformer, 'transform_orders', failing)
+
+    before = set(threading.enumerate())
+    connections = pool(work_dir)
+    result = {}
+    # The orders transform never reads its channels, so only closing them
+    # lets the POSTransHead/POSTransItem extractors finish
+    runner = threading.Thread(target=lambda: result.update(
+        run_pipeline(connections, DataTransformer(), chunk_size=5, queue_size=1)))
+    runner.start()
+    runner.join(timeout=120)
+    connections.close_all()
+    assert not runner.is_alive(), "run_pipeline is stuck on an extractor"
+    assert result['succeeded'] is False
+    assert set(threading.enumerate()) <= before
@@ -0,0 +1,76 @@
+"""--split writes the import parts directly, and the tools reading import files follow the manifest"""
+
+import csv
+import os
+
+import pytest
+
+from field_validator import METADATA_DIR, FieldValidator, rejects_file, validate_file
+from output_writer import RollingCsvWriter, import_parts, manifest_file, open_import, verify_parts
+from reconcile import reconcile
+from transform_data import PRODUCTS_OUTPUT, DataTransformer
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEADER = ['ProductID', 'Code', 'Description', 'Cost', 'SellPrice']
+
+ROWS = [[str(i), f"SKU-{i}", f"Item {i}", '1.00', '2.50'] for i in range(1, 8)]
+
+@pytest.fixture
+def work_dir(tmp_path, monkeypatch):
+    os.makedirs(tmp_path / os.path.dirname(PRODUCTS_OUTPUT))
+    monkeypatch.chdir(tmp_path)
+    with open('products.csv', 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        writer.writerows(ROWS)
+    return tmp_path
+
+def import_rows(output_file):
+    """Header and rows of an import file, read through its parts"""
+    header, rows = None, []
+    for path in import_parts(output_file):
+        with open_import(path) as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            rows += list(reader)
+    return header, rows
+
+def test_transform_writes_parts(work_dir):
+    DataTransformer().transform_products('products.csv')
+    expected = import_rows(PRODUCTS_OUTPUT)
+
+    transformer = DataTransformer()
+    transformer.split = {'files': {PRODUCTS_OUTPUT}, 'max_rows': 3, 'max_bytes': 0, 'compress': True}
+    transformer.transform_products('products.csv')
+    assert not os.path.exists(PRODUCTS_OUTPUT)
+    parts = import_parts(PRODUCTS_OUTPUT)
+    assert len(parts) == 3 and all(path.endswith('.gz') for path in parts)
+    assert import_rows(PRODUCTS_OUTPUT) == expected
+    assert verify_parts(PRODUCTS_OUTPUT) == []
+
+def test_validate_and_reconcile_read_the_parts(work_dir):
+    transformer = DataTransformer()
+    transformer.transform_products('products.csv')
+    header, rows = import_rows(PRODUCTS_OUTPUT)
+    target = work_dir / 'salesforce_products.csv'
+    os.rename(PRODUCTS_OUTPUT, target)
+
+    # Name is required, so the row without one is rejected
+    writer = RollingCsvWriter(PRODUCTS_OUTPUT, header, max_rows=4)
+    bad = list(rows[0])
+    bad[header.index('Name')] = ''
+    writer.writerows([bad] + rows)
+    writer.close()
+
+    validator = FieldValidator(os.path.join(REPO_DIR, METADATA_DIR))
+    assert validate_file(PRODUCTS_OUTPUT, 'Product2', validator) == (len(rows), 1)
+    assert import_rows(PRODUCTS_OUTPUT) == (header, rows)
+    assert verify_parts(PRODUCTS_OUTPUT) == []
+    with open(rejects_file(PRODUCTS_OUTPUT), newline='', encoding='utf-8') as f:
+        assert len(list(csv.reader(f))) == 2
+    assert os.path.exists(manifest_file(PRODUCTS_OUTPUT))
+
+    summary = reconcile('Product2', PRODUCTS_OUTPUT, str(target), 'Aralco_Product_ID__c', workers=1,
+                        output_dir=str(work_dir / 'reconciliation'))
+    assert summary['source_records'] == len(rows) and summary['differences'] == {}
@@ -4,36 +4,940 @@ Aralco to Salesforce Data Transformation Script
 Transforms exported Aralco data into Salesforce-ready format
 """
 
+import argparse
 import csv
+import functools
+import hashlib
+import io
+import itertools
 import json
+import operator
 import re
-from datetime import datetime
+import shutil
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack, contextmanager
+from datetime import date, datetime
+from decimal import Decimal
 import os
 
+from dimension_cache import DIMENSION_CACHE_FILE, DimensionCache
+from field_validator import METADATA_DIR, FieldValidator, checked_rows, rejects_file
+from instrumentation import PROFILERS, Instrumentation
+from mapping_plan import load_mapping_plans
+from output_writer import PART_MAX_BYTES, PART_MAX_ROWS, RollingCsvWriter, remove_parts, split_file
+from xref_index import XREF_INDEX_FILE, XrefIndex
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet staging is optional
+    pq = None
+
+try:
+    import numpy as np
+    import pandas as pd
+except ImportError:  # Batch (column-at-a-time) mode is optional
+    np = None
+    pd = None
+
+# Rows decoded per Parquet record batch when reading staging files
+STAGING_BATCH_SIZE = 10000
+
+# Rows per column chunk in batch mode
+BATCH_SIZE = 50000
+
+# File buffer of --split parts written straight from a transform or rewrite
+# pass; large, since every part of an object streams through one writer
+SPLIT_BUFFER_SIZE = 8 * 1024 * 1024
+
+# Output files
+ACCOUNTS_OUTPUT = 'exports/salesforce_ready/accounts/accounts_import.csv'
+PRODUCTS_OUTPUT = 'exports/salesforce_ready/products/products_import.csv'
+PRICEBOOK_OUTPUT = 'exports/salesforce_ready/products/pricebook_entries.csv'
+ORDERS_OUTPUT = 'exports/salesforce_ready/orders/orders_import.csv'
+ORDER_ITEMS_OUTPUT = 'exports/salesforce_ready/orders/order_items_import.csv'
+INVENTORY_OUTPUT = 'exports/salesforce_ready/inventory/store_inventory_import.csv'
+INVENTORY_ROLLUP_OUTPUT = 'exports/salesforce_ready/inventory/product_inventory.csv'
+
+# Hash index of previously written records, for --changed-only runs
+HASH_INDEX_FILE = 'exports/salesforce_ready/hash_index.sqlite'
+
+# Outputs filtered by --changed-only: (object, external ID field)
+CHANGE_TRACKED_OUTPUTS = {
+    ACCOUNTS_OUTPUT: ('Account', 'Aralco_Customer_ID__c'),
+    PRODUCTS_OUTPUT: ('Product2', 'Aralco_Product_ID__c'),
+    PRICEBOOK_OUTPUT: ('PricebookEntry', 'Aralco_Pricebook_Entry_ID__c'),
+    ORDERS_OUTPUT: ('Order', 'Aralco_Transaction_ID__c'),
+    ORDER_ITEMS_OUTPUT: ('OrderItem', 'Aralco_Line_Item_ID__c'),
+    INVENTORY_OUTPUT: ('Store_Inventory__c', 'Aralco_Inventory_ID__c'),
+    INVENTORY_ROLLUP_OUTPUT: ('Product2 inventory', 'Aralco_Product_ID__c')
+}
+
+# Outputs built from a full snapshot on every run (even a delta extraction),
+# so IDs missing since the last run are always deletions
+SNAPSHOT_OUTPUTS = [INVENTORY_OUTPUT]
+
+# Outputs that only update fields of records loaded elsewhere: IDs missing
+# since the last run are written once more with zeroed values, never deleted
+ZEROED_OUTPUTS = [INVENTORY_ROLLUP_OUTPUT]
+
+# External ID field of each change-tracked object
+TRACKED_ID_FIELDS = {sobject: id_field for sobject, id_field in CHANGE_TRACKED_OUTPUTS.values()}
+
+# Rows looked up in the hash index per query
+HASH_LOOKUP_BATCH = 500
+
+# Checkpoint manifest of an interrupted --checkpoint run, and the error
+# side file every run streams errors to as they occur
+CHECKPOINT_FILE = 'exports/salesforce_ready/checkpoint.json'
+ERRORS_OUTPUT = 'exports/salesforce_ready/transform_errors.jsonl'
+
+# Input records per committed chunk in --checkpoint runs
+CHECKPOINT_ROWS = 100000
+
+# Stage timings (and the optional profile) written next to transformation_summary.json
+INSTRUMENTATION_OUTPUT = 'exports/salesforce_ready/instrumentation.json'
+PROFILE_OUTPUT = 'exports/salesforce_ready/transform_profile'
+
+# Normalizers timed per call with --instrument
+NORMALIZERS = [
+    'clean_phone', 'clean_email', 'clean_currency', 'clean_quantity', 'transform_date', 'transform_datetime',
+    'transform_boolean', 'clean_phone_batch', 'clean_email_batch', 'clean_currency_batch',
+    'transform_date_batch'
+]
+
+# Outputs whose external-ID lookups --resolve-ids replaces with Salesforce Ids
+REFERENCE_OUTPUTS = [PRICEBOOK_OUTPUT, ORDERS_OUTPUT, ORDER_ITEMS_OUTPUT, INVENTORY_OUTPUT]
+
+# Compiled field mappings (see mapping_plan.py), keyed by (source table, target object)
+MAPPING_PLANS = load_mapping_plans()
+ACCOUNT_PLAN = MAPPING_PLANS[('Customer', 'Account')]
+PRODUCT_PLAN = MAPPING_PLANS[('Product', 'Product2')]
+PRICEBOOK_PLAN = MAPPING_PLANS[('Product', 'PricebookEntry')]
+ORDER_PLAN = MAPPING_PLANS[('POSTransHead', 'Order')]
+ORDER_ITEM_PLAN = MAPPING_PLANS[('POSTransItem', 'OrderItem')]
+INVENTORY_PLAN = MAPPING_PLANS[('Inventory', 'Store_Inventory__c')]
+
+# Import file columns, in mapping file order
+ACCOUNT_FIELDS = ACCOUNT_PLAN.fields
+PRODUCT_FIELDS = PRODUCT_PLAN.fields
+PRICEBOOK_FIELDS = PRICEBOOK_PLAN.fields
+ORDER_FIELDS = ORDER_PLAN.fields
+ORDER_ITEM_FIELDS = ORDER_ITEM_PLAN.fields
+INVENTORY_FIELDS = INVENTORY_PLAN.fields
+
+# Position of the external ID in a PricebookEntry row
+PRICEBOOK_ID_POSITION = PRICEBOOK_FIELDS.index(TRACKED_ID_FIELDS['PricebookEntry'])
+
+# Business account that orders without a known customer (walk-in sales) are
+# booked to: the default of the Order Account mapping, written with the accounts
+WALK_IN_CUSTOMER = {
+    'CustomerID': next(arg for field, _, _, _, arg in ORDER_PLAN.mappings if field == 'Account.Aralco_Customer_ID__c'),
+    'CompanyName': 'Walk-in Customers'
+}
+
+# Parents whose records were kept out of the import files (rejected, or failed
+# to transform) send the child rows referencing them to the child's rejects
+# file, which these objects therefore always get
+REJECTED_PARENTS = {'OrderItem': ['Product2', 'PricebookEntry']}
+
+# Store quantities summed per product by the inventory rollup
+INVENTORY_QUANTITIES = ['Quantity_On_Hand__c', 'Available_Quantity__c', 'On_Order__c']
+INVENTORY_ROLLUP_FIELDS = ['Aralco_Product_ID__c'] + INVENTORY_QUANTITIES + ['Stores_In_Stock__c']
+
+# Import files of mappings without a dedicated transform, e.g. Supplier -> Account
+MAPPED_OUTPUT = 'exports/salesforce_ready/mapped/{source}_{target}_import.csv'
+
+EMAIL_PATTERN = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
+
+_EMAIL_RE = re.compile(EMAIL_PATTERN)
+_NON_DIGITS_RE = re.compile(r'[^0-9]')
+_CURRENCY_SYMBOLS_RE = re.compile(r'[$,]')
+_THOUSANDS_RE = re.compile(r',')
+
+# Date formats accepted by transform_date, in order of precedence
+DATE_FORMATS = ['%Y-%m-%d %H:%M:%S', '%Y-%m-%d', '%m/%d/%Y', '%d/%m/%Y']
+
+# Formats that must still be tried before a sniffed format because they can
+# parse the same strings (03/04/2024 is read month-first)
+DATE_FORMAT_PRECEDENCE = {3: [2]}
+
+# Consecutive wins before a column is locked onto a date format
+DATE_SNIFF_HITS = 8
+
+# Entries per normalizer memo cache
+NORMALIZER_CACHE_SIZE = 65536
+
+# Strings that float() parses exactly like the vectorized fast path does
+_PLAIN_NUMBER_PATTERN = r'-?[0-9]+(?:\.[0-9]+)?'
+_ISO_DATETIME_PATTERN = r'[0-9]{4}-[0-9]{2}-[0-9]{2} [0-9]{2}:[0-9]{2}:[0-9]{2}'
+_ISO_DATE_PATTERN = r'[0-9]{4}-[0-9]{2}-[0-9]{2}'
+
+# What str.strip() removes from ASCII text
+_ASCII_WHITESPACE = '\t\n\x0b\x0c\r\x1c\x1d\x1e\x1f '
+
 # Create output directories
 os.makedirs('exports/salesforce_ready', exist_ok=True)
 os.makedirs('exports/salesforce_ready/accounts', exist_ok=True)
 os.makedirs('exports/salesforce_ready/products', exist_ok=True)
 os.makedirs('exports/salesforce_ready/orders', exist_ok=True)
+os.makedirs('exports/salesforce_ready/inventory', exist_ok=True)
+
+class _ByteRange(io.RawIOBase):
+    """Read-only view of the bytes ``[start, end)`` of a file"""
+
+    def __init__(self, path, start, end):
+        self._file = open(path, 'rb')
+        self._file.seek(start)
+        self._remaining = end - start
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        size = min(len(buffer), self._remaining)
+        if size <= 0:
+            return 0
+        data = self._file.read(size)
+        buffer[:len(data)] = data
+        self._remaining -= len(data)
+        return len(data)
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+@contextmanager
+def _open_csv(input_file, shard=None):
+    """Open a CSV input, or one byte-range shard of it, as text.
+
+    Yields ``(header, file)``; header is None when the file starts at the
+    header row. Shards are decoded exactly like ``open()`` would (UTF-8,
+    universal newlines) so sharded and whole-file runs read the same values.
+    """
+    if shard is None:
+        with open(input_file, 'r', encoding='utf-8') as infile:
+            yield None, infile
+        return
+
+    with open(input_file, 'r', encoding='utf-8') as infile:
+        header = next(csv.reader(infile), None)
+    start, end = shard
+    with io.TextIOWrapper(io.BufferedReader(_ByteRange(input_file, start, end)), encoding='utf-8') as infile:
+        yield header, infile
+
+def _parquet_batches(input_file, batch_size, shard=None):
+    """Record batches of a Parquet staging file, or of a row-group shard"""
+    if pq is None:
+        raise ImportError("pyarrow is required to read Parquet staging files")
+    parquet_file = pq.ParquetFile(input_file)
+    row_groups = range(*shard) if shard is not None else None
+    return parquet_file.iter_batches(batch_size=batch_size, row_groups=row_groups)
+
+def plan_shards(input_file, shards):
+    """Split a staging file into contiguous shards for parallel transforms.
+
+    CSV files are cut into byte ranges that end on record boundaries (a
+    quote-parity scan keeps quoted newlines intact); Parquet files are cut
+    into row-group ranges. Concatenating shard outputs in order reproduces
+    the whole-file output.
+    """
+    if input_file.endswith('.parquet'):
+        row_groups = pq.ParquetFile(input_file).num_row_groups
+        step = max(1, -(-row_groups // shards))
+        return [(i, min(i + step, row_groups)) for i in range(0, row_groups, step)] or [(0, 0)]
+
+    size = os.path.getsize(input_file)
+    with open(input_file, 'rb') as f:
+        f.readline()  # header
+        data_start = f.tell()
+        target = (size - data_start) / shards
+        bounds = [data_start]
+        position = data_start
+        in_quotes = False
+        for line in f:
+            position += len(line)
+            if line.count(b'"') % 2:
+                in_quotes = not in_quotes
+            if not in_quotes and len(bounds) < shards and position >= data_start + target * len(bounds):
+                bounds.append(position)
+    if bounds[-1] != size:
+        bounds.append(size)
+    if len(bounds) == 1:
+        bounds.append(size)
+    return list(zip(bounds, bounds[1:]))
+
+def _csv_records(input_file):
+    """Yield ``(start, end, lines)`` of every CSV record after the header row"""
+    with open(input_file, 'rb') as f:
+        f.readline()  # header
+        start = position = f.tell()
+        lines = []
+        in_quotes = False
+        for line in f:
+            position += len(line)
+            lines.append(line)
+            if line.count(b'"') % 2:
+                in_quotes = not in_quotes
+            if not in_quotes:
+                yield start, position, lines
+                start, lines = position, []
+
+def plan_chunks(input_file, rows=CHECKPOINT_ROWS):
+    """Split a staging file into consecutive shards of about ``rows`` records.
+
+    These are the units a --checkpoint run commits. CSV chunks are byte
+    ranges ending on record boundaries; Parquet chunks are row-group ranges.
+    """
+    if input_file.endswith('.parquet'):
+        metadata = pq.ParquetFile(input_file).metadata
+        chunks, start, count = [], 0, 0
+        for i in range(metadata.num_row_groups):
+            count += metadata.row_group(i).num_rows
+            if count >= rows:
+                chunks.append((start, i + 1))
+                start, count = i + 1, 0
+        if start < metadata.num_row_groups or not chunks:
+            chunks.append((start, metadata.num_row_groups))
+        return chunks
+
+    chunks, start, count = [], None, 0
+    for record_start, record_end, _ in _csv_records(input_file):
+        if start is None:
+            start = record_start
+        count += 1
+        if count >= rows:
+            chunks.append((start, record_end))
+            start, count = None, 0
+    if start is not None:
+        chunks.append((start, record_end))
+    return chunks or plan_shards(input_file, 1)
+
+def plan_order_chunks(header_file, item_file, rows=CHECKPOINT_ROWS):
+    """Checkpoint chunks of the order inputs as ``(header shard, item shard)`` pairs.
+
+    Each item shard starts at the first item of its header chunk's first
+    POSTransHeadID, so every pair merge-joins exactly as the whole files
+    would. Parquet order inputs are committed as a single chunk.
+    """
+    if header_file.endswith('.parquet') or item_file.endswith('.parquet'):
+        return [(None, None)]
+    header_chunks = plan_chunks(header_file, rows)
+    boundaries = []
+    for start, end in header_chunks[1:]:
+        first = next(read_staging_rows(header_file, shard=(start, end)))
+        boundaries.append(_join_key(first.get('POSTransHeadID', '')))
+
+    item_bounds = [plan_shards(item_file, 1)[0][0]]
+    with open(item_file, 'r', encoding='utf-8') as f:
+        position = next(csv.reader(f), []).index('POSTransHeadID')
+    for start, _, lines in _csv_records(item_file):
+        if len(item_bounds) > len(boundaries):
+            break
+        row = next(csv.reader(io.StringIO(b''.join(lines).decode('utf-8'), newline='')), None)
+        while row and len(item_bounds) <= len(boundaries) and \
+                _join_key(row[position]) >= boundaries[len(item_bounds) - 1]:
+            item_bounds.append(start)
+    item_end = os.path.getsize(item_file)
+    item_bounds += [item_end] * (len(boundaries) + 2 - len(item_bounds))
+    return list(zip(header_chunks, zip(item_bounds, item_bounds[1:])))
+
+def read_staging_rows(input_file, batch_size=STAGING_BATCH_SIZE, shard=None):
+    """Yield input rows as dicts from a CSV or typed Parquet staging file.
+
+    Parquet rows keep their native types (Decimal, datetime, int); NULLs are
+    mapped to '' so transforms see the same empty values as with CSV.
+    ``shard`` restricts reading to one range from ``plan_shards``.
+    """
+    if input_file.endswith('.parquet'):
+        for batch in _parquet_batches(input_file, batch_size, shard):
+            for row in batch.to_pylist():
+                yield {k: ('' if v is None else v) for k, v in row.items()}
+        return
+
+    with _open_csv(input_file, shard) as (header, infile):
+        yield from csv.DictReader(infile, fieldnames=header)
+
+@contextmanager
+def open_staging_rows(input_file, shard=None, rows=None):
+    """Open a staging file for a compiled row function as ``(header, rows)``.
+
+    CSV rows come as lists in ``header`` order, the way csv.DictReader
+    reads them (blank lines skipped, short rows padded with None) but
+    without building a dict per row. Parquet rows, and ``rows`` given in
+    place of the file, are dicts and ``header`` is None.
+    """
+    if rows is not None or input_file.endswith('.parquet'):
+        yield None, rows if rows is not None else read_staging_rows(input_file, shard=shard)
+        return
+
+    with _open_csv(input_file, shard) as (header, infile):
+        reader = csv.reader(infile)
+        if header is None:
+            header = next(reader, None)
+        if header is None:
+            yield None, iter(())
+            return
+        yield header, _padded_rows(reader, len(header))
+
+def _padded_rows(reader, width):
+    for row in reader:
+        if not row:  # csv.DictReader skips blank lines
+            continue
+        if len(row) < width:
+            row += [None] * (width - len(row))
+        yield row
+
+def _column_getter(header, column, default=None):
+    """``row -> value`` of one column for rows from open_staging_rows"""
+    if header is None:
+        return lambda row: row.get(column, default)
+    # Later duplicate columns win, as in csv.DictReader
+    positions = {name: i for i, name in enumerate(header)}
+    if column not in positions:
+        return lambda row: default
+    return operator.itemgetter(positions[column])
+
+def read_column_batches(input_file, batch_size=BATCH_SIZE, shard=None):
+    """Yield input chunks as DataFrames of string columns for batch mode.
+
+    Values match what ``read_staging_rows`` hands the row path once
+    stringified (NULL becomes ''). A CSV chunk containing short rows, where
+    csv.DictReader would fill in None, is yielded as a list of row dicts so
+    the caller can run it through the row path unchanged.
+    """
+    if input_file.endswith('.parquet'):
+        for batch in _parquet_batches(input_file, batch_size, shard):
+            columns = {}
+            for name, array in zip(batch.schema.names, batch.columns):
+                columns[name] = ['' if v is None else (v if isinstance(v, str) else str(v))
+                                 for v in array.to_pylist()]
+            yield pd.DataFrame(columns, dtype=object)
+        return
+
+    with _open_csv(input_file, shard) as (header, infile):
+        reader = csv.reader(infile)
+        if header is None:
+            header = next(reader, None)
+        if header is None:
+            return
+        width = len(header)
+        chunk = []
+        for row in reader:
+            if not row:  # csv.DictReader skips blank lines
+                continue
+            chunk.append(row)
+            if len(chunk) >= batch_size:
+                yield _column_chunk(header, width, chunk)
+                chunk = []
+        if chunk:
+            yield _column_chunk(header, width, chunk)
+
+def _column_chunk(header, width, rows):
+    """Turn raw CSV rows into a DataFrame, or row dicts if any row is short"""
+    if any(len(row) < width for row in rows):
+        return [dict(zip(header, row + [None] * (width - len(row)))) for row in rows]
+    columns = {}
+    for name, values in zip(header, zip(*(row[:width] for row in rows))):
+        columns[name] = values  # Later duplicate headers win, as in DictReader
+    return pd.DataFrame({k: list(v) for k, v in columns.items()}, dtype=object)
+
+def _fast_strings(values):
+    """Arrow-backed view of a string Series when pyarrow is available"""
+    if pq is None:
+        return values
+    return values.astype('string[pyarrow]')
+
+def _is_first_shard(input_file, shard):
+    """True unless ``shard`` starts after the first record of ``input_file``"""
+    if shard is None:
+        return True
+    if input_file.endswith('.parquet'):
+        return shard[0] == 0
+    with open(input_file, 'rb') as f:
+        f.readline()  # header
+        return shard[0] <= f.tell()
+
+def _join_key(value):
+    """Sort key for POSTransHeadID values, numeric IDs in numeric order"""
+    if isinstance(value, int):
+        return (0, value)
+    text = str(value).strip()
+    if text.isdigit():
+        return (0, int(text))
+    return (1, text)
+
+def _format_quantity(quantity):
+    """Plain decimal text of a quantity without trailing zeros (12.5000 -> 12.5)"""
+    return format(quantity.normalize() + 0, 'f')
+
+def _layout_hash(header):
+    """Hash state seeded with an import file's header, for _row_hash"""
+    return hashlib.blake2b('\x1f'.join(header).encode('utf-8'), digest_size=16)
+
+def _row_hash(layout, row):
+    """Hash of an output row under its file's header (see HashIndex)"""
+    digest = layout.copy()
+    digest.update('\x1f'.join(row).encode('utf-8'))
+    return digest.digest()
+
+def _sorted_by_head(rows, input_file):
+    """Pass rows through, failing if POSTransHeadID goes backwards"""
+    previous = None
+    for row in rows:
+        key = _join_key(row.get('POSTransHeadID', ''))
+        if previous is not None and key < previous:
+            raise ValueError(f"{input_file} is not sorted by POSTransHeadID "
+                             f"({row.get('POSTransHeadID')} after {previous[1]})")
+        previous = key
+        yield row
+
+class HashIndex:
+    """SQLite index of external ID -> hash of the last loaded output row.
+
+    ``record_changes`` stages the hashes of the rows it lets through in
+    ``pending_hash``; they replace the loaded hashes only when
+    ``commit_loaded`` finds the records in a load success file, so rows of
+    a failed load are written again by the next run. Every known ID a run
+    sees is marked with the run, so IDs left on an older run are the ones
+    that disappeared from the source.
+    """
+
+    def __init__(self, path=HASH_INDEX_FILE):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        for table in ['record_hash', 'pending_hash']:
+            self.conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                object TEXT NOT NULL,
+                external_id TEXT NOT NULL,
+                hash BLOB NOT NULL,
+                run TEXT NOT NULL,
+                PRIMARY KEY (object, external_id)
+            ) WITHOUT ROWID
+            """)
+        self.run = datetime.now().strftime('%Y%m%dT%H%M%S%f')
+
+    def record_changes(self, sobject, rows):
+        """Return the subset of ``(external_id, hash, row)`` that is new or changed.
+
+        The known IDs among ``rows`` are marked seen. New hashes are staged
+        until their load is committed.
+        """
+        changed = []
+        for start in range(0, len(rows), HASH_LOOKUP_BATCH):
+            batch = rows[start:start + HASH_LOOKUP_BATCH]
+            placeholders = ','.join('?' * len(batch))
+            known = dict(self.conn.execute(
+                f"SELECT external_id, hash FROM record_hash WHERE object = ? AND external_id IN ({placeholders})",
+                [sobject] + [external_id for external_id, _, _ in batch]))
+            changed.extend(r for r in batch if known.get(r[0]) != r[1])
+            self.mark_seen(sobject, list(known))
+        self.conn.executemany("""
+        INSERT INTO pending_hash (object, external_id, hash, run) VALUES (?, ?, ?, ?)
+        ON CONFLICT (object, external_id) DO UPDATE SET hash = excluded.hash, run = excluded.run
+        """, [(sobject, external_id, digest, self.run) for external_id, digest, _ in changed])
+        return changed
+
+    def mark_seen(self, sobject, external_ids):
+        """Mark known IDs as present in this run without changing their hash; returns how many were known"""
+        external_ids = list(external_ids)
+        marked = 0
+        for start in range(0, len(external_ids), HASH_LOOKUP_BATCH):
+            batch = external_ids[start:start + HASH_LOOKUP_BATCH]
+            placeholders = ','.join('?' * len(batch))
+            marked += self.conn.execute(
+                f"UPDATE record_hash SET run = ? WHERE object = ? AND external_id IN ({placeholders})",
+                [self.run, sobject] + batch).rowcount
+        return marked
+
+    def clear_pending(self, sobject):
+        """Drop the hashes staged for import files that are being rewritten"""
+        self.conn.execute("DELETE FROM pending_hash WHERE object = ?", (sobject,))
+
+    def commit_loaded(self, sobject, external_ids):
+        """Make the staged hashes of loaded records the known ones; returns how many were staged"""
+        keys = [(sobject, external_id) for external_id in external_ids]
+        self.conn.executemany("""
+        INSERT INTO record_hash (object, external_id, hash, run)
+        SELECT object, external_id, hash, run FROM pending_hash WHERE object = ? AND external_id = ?
+        ON CONFLICT (object, external_id) DO UPDATE SET hash = excluded.hash, run = excluded.run
+        """, keys)
+        return self.conn.executemany(
+            "DELETE FROM pending_hash WHERE object = ? AND external_id = ?", keys).rowcount
+
+    def missing(self, sobject):
+        """IDs of ``sobject`` not seen in this run"""
+        return [r[0] for r in self.conn.execute(
+            "SELECT external_id FROM record_hash WHERE object = ? AND run <> ? ORDER BY external_id",
+            (sobject, self.run))]
+
+    def pop_missing(self, sobject):
+        """Remove and return the IDs of ``sobject`` not seen in this run"""
+        missing = self.missing(sobject)
+        self.conn.execute("DELETE FROM record_hash WHERE object = ? AND run <> ?", (sobject, self.run))
+        return missing
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+def commit_loaded(processes, index_file=HASH_INDEX_FILE):
+    """Commit the staged hashes of the records in each loader process's success file.
+
+    Records that did not load keep their previous hash, so the next
+    --changed-only run writes them again. Returns the count per object.
+    """
+    if not os.path.exists(index_file):
+        return {}
+    tracked = {os.path.normpath(output): objects for output, objects in CHANGE_TRACKED_OUTPUTS.items()}
+    committed = {}
+    index = HashIndex(index_file)
+    try:
+        for process in processes.values():
+            if os.path.normpath(process['input']) not in tracked or not os.path.exists(process['success']):
+                continue
+            sobject, id_field = tracked[os.path.normpath(process['input'])]
+            with open(process['success'], 'r', newline='', encoding='utf-8') as f:
+                reader = csv.reader(f)
+                header = next(reader, None)
+                if header is None or id_field not in header:
+                    continue
+                position = header.index(id_field)
+                committed[sobject] = 0
+                while True:
+                    rows = list(itertools.islice(reader, BATCH_SIZE))
+                    if not rows:
+                        break
+                    committed[sobject] += index.commit_loaded(sobject, [row[position] for row in rows])
+            index.commit()
+    finally:
+        index.close()
+    return committed
+
+class Checkpoint:
+    """Atomic JSON manifest of the chunks a transform run has committed.
+
+    A manifest left by an interrupted run is resumed only when the inputs
+    (path, size, modification time) and settings are unchanged; otherwise
+    the run starts over.
+    """
+
+    def __init__(self, input_files, settings, path=CHECKPOINT_FILE):
+        self.path = path
+        fingerprint = {
+            'inputs': {f: [os.path.getsize(f), os.path.getmtime(f)] for f in input_files if f and os.path.exists(f)},
+            'settings': settings
+        }
+        manifest = _read_json(path)
+        self.resumed = manifest.get('fingerprint') == fingerprint
+        if manifest and not self.resumed:
+            print(f"⚠️  Inputs or settings changed since {path} was written, starting over")
+        if not self.resumed:
+            manifest = {'fingerprint': fingerprint, 'started': datetime.now().isoformat(),
+                        'stages': {}, 'stats': None, 'errors_size': 0}
+        self.manifest = manifest
+
+    def stage(self, name):
+        """Progress of one stage: chunks, chunks committed and output sizes"""
+        return self.manifest['stages'].setdefault(name, {'chunks': None, 'committed': 0, 'outputs': {}, 'complete': False})
+
+    def commit(self, stats, errors_size):
+        """Write the manifest atomically so a crash never leaves a partial file"""
+        self.manifest['stats'] = dict(stats)
+        self.manifest['errors_size'] = errors_size
+        self.manifest['updated'] = datetime.now().isoformat()
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        temp_file = f"{self.path}.tmp"
+        with open(temp_file, 'w') as f:
+            json.dump(self.manifest, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_file, self.path)
+
+    def clear(self):
+        """Remove the manifest once every checkpointed stage has finished"""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+class ErrorLog(list):
+    """Error messages, also appended to a JSON-lines side file once ``stream`` is called.
+
+    ``failed`` collects the external IDs, per object, of the records an
+    error kept out of the import files.
+    """
+
+    def __init__(self, messages=(), failed=None):
+        super().__init__(messages)
+        self.failed = {sobject: set(ids) for sobject, ids in (failed or {}).items()}
+        self._file = None
+
+    def stream(self, path, resume_at=None):
+        """Write errors to ``path`` as they occur.
+
+        With ``resume_at`` the first ``resume_at`` bytes of an existing file
+        (the errors of committed chunks) are kept and reloaded; anything
+        after them is discarded. Otherwise the file starts empty.
+        """
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        if resume_at is not None and os.path.exists(path):
+            os.truncate(path, min(resume_at, os.path.getsize(path)))
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        if 'error' in entry:
+                            super().append(entry['error'])
+                        self._record_failed(entry.get('failed', {}))
+            self._file = open(path, 'a', encoding='utf-8', buffering=1)
+        else:
+            self._file = open(path, 'w', encoding='utf-8', buffering=1)
+
+    def append(self, message, failed=None):
+        """Record an error; ``failed`` maps objects to the external ID the error kept out"""
+        super().append(message)
+        entry = {'time': datetime.now().isoformat(), 'error': message}
+        if failed:
+            entry['failed'] = {sobject: [external_id] for sobject, external_id in failed.items()}
+            self._record_failed(entry['failed'])
+        self._write(entry)
+
+    def extend(self, messages):
+        for message in messages:
+            self.append(message)
+        failed = {sobject: sorted(ids) for sobject, ids in getattr(messages, 'failed', {}).items() if ids}
+        if failed:
+            self._record_failed(failed)
+            self._write({'time': datetime.now().isoformat(), 'failed': failed})
+
+    def add_failed(self, sobject, external_ids):
+        """Record IDs an earlier error or reject also kept out, e.g. the PricebookEntry of a rejected product"""
+        external_ids = sorted(external_ids)
+        if external_ids:
+            self._record_failed({sobject: external_ids})
+            self._write({'time': datetime.now().isoformat(), 'failed': {sobject: external_ids}})
+
+    def _record_failed(self, failed):
+        for sobject, ids in failed.items():
+            self.failed.setdefault(sobject, set()).update(ids)
+
+    def _write(self, entry):
+        if self._file is not None:
+            self._file.write(json.dumps(entry) + '\n')
+
+    def sync(self):
+        """Flush the side file to disk and return its size"""
+        if self._file is None:
+            return 0
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return self._file.tell()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __reduce__(self):
+        # Process-pool workers send their errors back without the side file
+        return ErrorLog, (list(self), self.failed)
+
+def _append_part(part_file, output_file, first):
+    """Append a chunk's part file to its output (without its header unless ``first``)"""
+    with open(part_file, 'rb') as part, open(output_file, 'wb' if first else 'ab') as out:
+        if not first:
+            part.readline()  # header
+        shutil.copyfileobj(part, out, 1024 * 1024)
+        out.flush()
+        os.fsync(out.fileno())
+    os.remove(part_file)
+
+def deletes_file(output_file):
+    """Path of the deletes file written next to an import file"""
+    stem, ext = os.path.splitext(output_file)
+    return f"{stem}_deletes{ext}"
+
+def resolve_input(input_dir, table, fmt='csv'):
+    """Pick the staging file for a table, falling back to CSV"""
+    if fmt == 'parquet':
+        parquet_file = os.path.join(input_dir, f"{table}.parquet")
+        if pq is not None and os.path.exists(parquet_file):
+            return parquet_file
+        print(f"⚠️  No usable Parquet staging for {table}, falling back to CSV")
+    return os.path.join(input_dir, f"{table}.csv")
+
+class _ImportWriter:
+    """DictWriter stand-in the transforms write an import file through.
+
+    ``writer`` takes the rows (checked first, with a validator);
+    ``writeheader`` writes the header row, which --split parts already
+    carry; ``reject`` sends a row to the rejects file.
+    """
+
+    def __init__(self, output, fieldnames, writer, reject=None, header=True):
+        self._output = output
+        self.fieldnames = fieldnames
+        self.writer = writer
+        self._reject = reject
+        self._header = header
+
+    def writeheader(self):
+        if self._header:
+            self._output.writerow(self.fieldnames)
+
+    def reject(self, row, problems):
+        self._reject(row, problems)
+
+def _instrumented(method):
+    """Record a DataTransformer method as an instrumentation stage.
+
+    Rows are the growth of the ``*_processed`` counters during the call.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        def processed():
+            return sum(v for k, v in self.stats.items() if k.endswith('_processed'))
+        before = processed()
+        with self.instrumentation.stage(method.__name__) as record:
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                record['rows'] = processed() - before
+    return wrapper
 
 class DataTransformer:
     """Main data transformation class"""
     
-    def __init__(self):
-        self.errors = []
+    def __init__(self, cache_size=NORMALIZER_CACHE_SIZE, instrumentation=None):
+        self.errors = ErrorLog()
         self.stats = {
             'accounts_processed': 0,
             'products_processed': 0,
             'orders_processed': 0,
+            'order_items_processed': 0,
+            'inventory_processed': 0,
+            'unchanged_skipped': 0,
+            'accounts_merged': 0,
+            'orphans': 0,
+            'rejected': 0,
             'errors': 0
         }
+        
+        # Bounded memo caches for the normalizers. POS data repeats heavily
+        # (a few hundred distinct transaction days, shared phone numbers and
+        # amounts), so most values are answered without re-parsing. Empty
+        # values short-circuit before reaching the caches.
+        self._caches = {
+            'clean_phone': functools.lru_cache(maxsize=cache_size, typed=True)(self._clean_phone),
+            'clean_email': functools.lru_cache(maxsize=cache_size, typed=True)(self._clean_email),
+            'clean_currency': functools.lru_cache(maxsize=cache_size, typed=True)(self._clean_currency),
+            'clean_quantity': functools.lru_cache(maxsize=cache_size, typed=True)(self._clean_quantity),
+            'transform_date': functools.lru_cache(maxsize=cache_size, typed=True)(self._transform_date),
+            'transform_datetime': functools.lru_cache(maxsize=cache_size, typed=True)(self._transform_datetime)
+        }
+        # Per-column date format sniffing: {column: {'last': idx, 'streak': n, 'locked': idx}}
+        self._date_sniffing = {}
+        # Cache counters reported by process-pool workers (see transform_parallel)
+        self._worker_cache_stats = {}
+        # Merged CustomerID -> surviving CustomerID (see dedupe_accounts.py)
+        self.account_merge_map = {}
+        # Code -> name maps of the reference tables (see dimension_cache.py);
+        # empty unless loaded, in which case codes pass through unchanged
+        self.dimensions = DimensionCache()
+        # Field metadata checks applied as rows are written (see field_validator.py)
+        self.validator = None
+        # --split settings: {'files', 'max_rows', 'max_bytes', 'compress'}; the
+        # import files in 'files' are rolled into parts as they are written
+        self.split = None
+        
+        # Stage timings; per-call normalizer timers only when enabled
+        self.instrumentation = instrumentation or Instrumentation()
+        for name in NORMALIZERS:
+            setattr(self, name, self.instrumentation.timer(name, getattr(self, name)))
+    
+    @contextmanager
+    def _output_writer(self, output_file, fieldnames, sobject):
+        """Writer for an import file; with a validator, rows failing the
+        field checks go to the file's rejects file instead. Files being
+        split are written straight into their parts."""
+        with ExitStack() as stack:
+            split = self._splits(output_file)
+            if split:
+                output = stack.enter_context(self._rolled(output_file, fieldnames))
+            else:
+                output = csv.writer(stack.enter_context(open(output_file, 'w', newline='', encoding='utf-8')))
+            if self.validator is None and sobject not in REJECTED_PARENTS:
+                yield _ImportWriter(output, fieldnames, output, header=not split)
+                return
+            reject_writer = csv.writer(stack.enter_context(
+                open(rejects_file(output_file), 'w', newline='', encoding='utf-8')))
+            reject_writer.writerow(list(fieldnames) + ['ERROR'])
+            on_reject = self._reject_recorder(sobject, fieldnames)
+            
+            def reject(row, problems):
+                reject_writer.writerow(list(row) + ['; '.join(problems)])
+                on_reject(row, problems)
+            
+            writer = output if self.validator is None else \
+                checked_rows(output, reject_writer, fieldnames, sobject, self.validator, on_reject)
+            yield _ImportWriter(output, fieldnames, writer, reject, header=not split)
+    
+    def _reject_recorder(self, sobject, fieldnames):
+        # Rejected rows of change-tracked objects must not read as deletions
+        id_field = TRACKED_ID_FIELDS.get(sobject)
+        position = fieldnames.index(id_field) if id_field in fieldnames else None
+        return functools.partial(self._record_reject, sobject, position)
+    
+    def _splits(self, output_file):
+        """True when ``output_file`` is written as --split parts"""
+        return self.split is not None and output_file in self.split['files']
+    
+    @contextmanager
+    def _rolled(self, output_file, header):
+        """RollingCsvWriter replacing an import file (and any earlier parts) with parts and a manifest"""
+        remove_parts(output_file)
+        writer = RollingCsvWriter(output_file, header, self.split['max_rows'], self.split['max_bytes'],
+                                  self.split['compress'], SPLIT_BUFFER_SIZE)
+        try:
+            yield writer
+        finally:
+            manifest = writer.close()
+            # The loader reads a plain file in preference to the parts
+            if os.path.exists(output_file):
+                os.remove(output_file)
+        print(f"✅ {manifest['source']}: {manifest['rows']} rows in {len(manifest['parts'])} part(s)")
+    
+    @contextmanager
+    def _rewrite(self, output_file, header):
+        """csv writer replacing an import file the caller has finished reading
+        from: a temp file moved over it, or its --split parts"""
+        if self._splits(output_file):
+            with self._rolled(output_file, header) as writer:
+                yield writer
+            return
+        temp_file = f"{output_file}.tmp"
+        with open(temp_file, 'w', newline='', encoding='utf-8') as outfile:
+            writer = csv.writer(outfile)
+            writer.writerow(header)
+            yield writer
+        os.replace(temp_file, output_file)
+    
+    def _record_reject(self, sobject, position, row, problems):
+        failed = {sobject: row[position]} if position is not None and row[position] else None
+        self.errors.append(f"{sobject} {row[0] or 'Unknown'}: rejected, {'; '.join(problems)}", failed)
+        self.stats['rejected'] += 1
     
     def clean_phone(self, phone):
         """Standardize phone number format"""
         if not phone:
             return ''
+        return self._caches['clean_phone'](phone)
+    
+    def _clean_phone(self, phone):
         # Remove all non-numeric characters
-        clean = re.sub(r'[^0-9]', '', str(phone))
+        clean = _NON_DIGITS_RE.sub('', str(phone))
         # Format as (XXX) XXX-XXXX if 10 digits
         if len(clean) == 10:
             return f"({clean[:3]}) {clean[3:6]}-{clean[6:]}"
@@ -43,9 +947,12 @@ class DataTransformer:
         """Validate and clean email address"""
         if not email:
             return ''
+        return self._caches['clean_email'](email)
+    
+    def _clean_email(self, email):
         email = str(email).strip().lower()
         # Basic email validation
-        if re.match(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$', email):
+        if _EMAIL_RE.match(email):
             return email
         return ''
     
@@ -53,33 +960,90 @@ class DataTransformer:
         """Clean currency values"""
         if not value:
             return '0.00'
+        return self._caches['clean_currency'](value)
+    
+    def _clean_currency(self, value):
+        if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+            return f"{float(value):.2f}"
         try:
             # Remove currency symbols and commas
-            clean = re.sub(r'[$,]', '', str(value))
+            clean = _CURRENCY_SYMBOLS_RE.sub('', str(value))
             return f"{float(clean):.2f}"
         except:
             return '0.00'
     
-    def transform_date(self, date_str):
-        """Transform date to Salesforce format (YYYY-MM-DD)"""
+    def clean_quantity(self, value):
+        """Clean stock quantities, kept exact (no float rounding)"""
+        if not value:
+            return '0'
+        return self._caches['clean_quantity'](value)
+    
+    def _clean_quantity(self, value):
+        try:
+            quantity = value if isinstance(value, Decimal) else Decimal(_THOUSANDS_RE.sub('', str(value)).strip())
+        except ArithmeticError:
+            return '0'
+        if not quantity.is_finite():
+            return '0'
+        return _format_quantity(quantity)
+    
+    def transform_date(self, date_str, column=None):
+        """Transform date to Salesforce format (YYYY-MM-DD).
+
+        ``column`` names the source column so the format detected for it is
+        tried first on later values.
+        """
         if not date_str:
             return ''
+        if isinstance(date_str, date):
+            return date_str.strftime('%Y-%m-%d')
+        return self._caches['transform_date'](date_str, column)
+    
+    def _transform_date(self, date_str, column):
         try:
-            # Try various date formats
-            for fmt in ['%Y-%m-%d %H:%M:%S', '%Y-%m-%d', '%m/%d/%Y', '%d/%m/%Y']:
+            # Try various date formats, the column's sniffed format first
+            value = str(date_str).split('.')[0]
+            for index in self._date_format_order(column):
                 try:
-                    dt = datetime.strptime(str(date_str).split('.')[0], fmt)
-                    return dt.strftime('%Y-%m-%d')
-                except:
+                    dt = datetime.strptime(value, DATE_FORMATS[index])
+                except ValueError:
                     continue
+                self._record_date_format(column, index)
+                return dt.strftime('%Y-%m-%d')
             return str(date_str)[:10]  # Fallback: take first 10 chars
         except:
             return ''
     
-    def transform_datetime(self, datetime_str):
+    def _date_format_order(self, column):
+        """Indices of DATE_FORMATS to try, locked format first where it is safe"""
+        locked = self._date_sniffing.get(column, {}).get('locked')
+        if locked is None:
+            return range(len(DATE_FORMATS))
+        # Formats that can parse the same string as the locked one keep precedence
+        first = DATE_FORMAT_PRECEDENCE.get(locked, []) + [locked]
+        return first + [i for i in range(len(DATE_FORMATS)) if i not in first]
+    
+    def _record_date_format(self, column, index):
+        """Lock a column onto a format once it wins DATE_SNIFF_HITS times in a row"""
+        state = self._date_sniffing.setdefault(column, {'last': None, 'streak': 0, 'locked': None})
+        if state['locked'] is not None:
+            return
+        state['streak'] = state['streak'] + 1 if state['last'] == index else 1
+        state['last'] = index
+        if state['streak'] >= DATE_SNIFF_HITS:
+            state['locked'] = index
+    
+    def transform_datetime(self, datetime_str, column=None):
         """Transform datetime to Salesforce format (YYYY-MM-DD'T'HH:MM:SS.000Z)"""
         if not datetime_str:
             return ''
+        if isinstance(datetime_str, datetime):
+            return datetime_str.strftime('%Y-%m-%dT%H:%M:%S.000Z')
+        if isinstance(datetime_str, date):
+            return f"{datetime_str.strftime('%Y-%m-%d')}T00:00:00.000Z"
+        return self._caches['transform_datetime'](datetime_str, column)
+    
+    def _transform_datetime(self, datetime_str, column):
         try:
             # Parse datetime
             dt_str = str(datetime_str).split('.')[0]
@@ -87,11 +1051,32 @@ class DataTransformer:
             return dt.strftime('%Y-%m-%dT%H:%M:%S.000Z')
         except:
             # Try date only
-            date = self.transform_date(datetime_str)
-            if date:
-                return f"{date}T00:00:00.000Z"
+            date_part = self.transform_date(datetime_str, column)
+            if date_part:
+                return f"{date_part}T00:00:00.000Z"
             return ''
     
+    def cache_stats(self):
+        """Hit/miss counters of the normalizer caches, including worker processes"""
+        stats = {}
+        for name, cached in self._caches.items():
+            info = cached.cache_info()
+            worker = self._worker_cache_stats.get(name, {})
+            hits = info.hits + worker.get('hits', 0)
+            misses = info.misses + worker.get('misses', 0)
+            stats[name] = {
+                'hits': hits,
+                'misses': misses,
+                'hit_rate': round(hits / (hits + misses), 4) if hits + misses else 0.0,
+                'maxsize': info.maxsize,
+                'currsize': info.currsize
+            }
+        locked = {column: DATE_FORMATS[state['locked']]
+                  for column, state in self._date_sniffing.items()
+                  if column is not None and state['locked'] is not None}
+        stats['date_formats'] = locked
+        return stats
+    
     def transform_boolean(self, value):
         """Transform to Salesforce boolean"""
         if not value:
@@ -101,215 +1086,690 @@ class DataTransformer:
             return 'true'
         return 'false'
     
-    def transform_accounts(self, input_file='exports/analysis/customer_sample.csv'):
-        """Transform customer data to Salesforce Account format"""
+    def clean_phone_batch(self, values):
+        """Vectorized clean_phone over a Series of strings"""
+        digits = _fast_strings(values).str.replace(r'[^0-9]', '', regex=True)
+        formatted = '(' + digits.str[:3] + ') ' + digits.str[3:6] + '-' + digits.str[6:]
+        is_ten = (digits.str.len() == 10).to_numpy(dtype=bool)
+        return formatted.astype(object).where(is_ten, values)
+    
+    def clean_email_batch(self, values):
+        """Vectorized clean_email over a Series of strings.
+
+        ASCII values (nearly all of them) are trimmed, lowercased and matched
+        as whole arrays; other values use clean_email so Unicode case and
+        whitespace rules stay exactly Python's.
+        """
+        is_ascii = values.map(str.isascii).to_numpy(dtype=bool)
+        result = pd.Series('', index=values.index, dtype=object)
+        if is_ascii.any():
+            email = _fast_strings(values[is_ascii]).str.strip(_ASCII_WHITESPACE).str.lower()
+            valid = email.str.match(EMAIL_PATTERN).to_numpy(dtype=bool)
+            result[is_ascii] = email.astype(object).where(valid, '')
+        if not is_ascii.all():
+            result[~is_ascii] = values[~is_ascii].map(self.clean_email)
+        return result
+    
+    def clean_currency_batch(self, values):
+        """Vectorized clean_currency over a Series of strings.
+
+        Each distinct value is converted once. Plain decimal amounts are
+        parsed as an array; anything else (empty, malformed, exponents)
+        goes through clean_currency.
+        """
+        uniques = pd.Series(pd.unique(values), dtype=object)
+        stripped = _fast_strings(uniques).str.replace(r'[$,]', '', regex=True)
+        plain = stripped.str.fullmatch(_PLAIN_NUMBER_PATTERN).to_numpy(dtype=bool)
+        converted = pd.Series('', index=uniques.index, dtype=object)
+        if plain.any():
+            numbers = stripped[plain].astype('float64').tolist()
+            converted[plain] = [f"{n:.2f}" for n in numbers]
+        if not plain.all():
+            converted[~plain] = uniques[~plain].map(self.clean_currency)
+        return values.map(dict(zip(uniques, converted)))
+    
+    def transform_date_batch(self, values, column=None):
+        """Vectorized transform_date over a Series of strings.
+
+        Each distinct value is parsed once. ISO-shaped values are parsed as
+        arrays with pandas; the rest fall back to transform_date.
+        """
+        uniques = pd.Series(pd.unique(values), dtype=object)
+        base = uniques.str.split('.').str[0]
+        parsed = pd.Series(pd.NaT, index=uniques.index, dtype='datetime64[us]')
+        for pattern, fmt in [(_ISO_DATETIME_PATTERN, '%Y-%m-%d %H:%M:%S'),
+                             (_ISO_DATE_PATTERN, '%Y-%m-%d')]:
+            shaped = base.str.fullmatch(pattern).astype(bool)
+            if shaped.any():
+                parsed[shaped] = pd.to_datetime(base[shaped], format=fmt, errors='coerce')
+        # strftime does not zero-pad years before 1000, leave those to the row rules
+        ok = parsed.notna() & (parsed.dt.year >= 1000)
+        converted = pd.Series('', index=uniques.index, dtype=object)
+        if not ok.all():
+            converted[~ok] = uniques[~ok].map(lambda v: self.transform_date(v, column))
+        if ok.any():
+            converted[ok] = parsed[ok].dt.strftime('%Y-%m-%d')
+        return values.map(dict(zip(uniques, converted)))
+    
+    @_instrumented
+    def transform_accounts(self, input_file='exports/analysis/customer_sample.csv',
+                           output_file=ACCOUNTS_OUTPUT, batch=False, batch_size=BATCH_SIZE, shard=None,
+                           rows=None):
+        """Transform customer data to Salesforce Account format.
+
+        With ``batch=True`` whole column chunks are transformed at once with
+        pandas; the output is byte-identical to the row-by-row path.
+        ``rows`` replaces reading ``input_file``: row dicts, or column chunks
+        with ``batch=True`` (see pipeline.py). The walk-in account
+        (WALK_IN_CUSTOMER) is written ahead of the first shard's customers.
+        """
         print("🔄 Transforming Account data...")
         
-        output_file = 'exports/salesforce_ready/accounts/accounts_import.csv'
-        
-        # Define field mappings
-        fieldnames = [
-            'RecordType.DeveloperName',
-            'Aralco_Customer_ID__c',
-            'AccountNumber', 
-            'Name',
-            'Phone',
-            'Fax',
-            'Website',
-            'BillingStreet',
-            'BillingCity',
-            'BillingState',
-            'BillingPostalCode',
-            'BillingCountry',
-            'ShippingStreet',
-            'ShippingCity', 
-            'ShippingState',
-            'ShippingPostalCode',
-            'ShippingCountry',
-            'Description',
-            'Industry',
-            'AnnualRevenue',
-            'NumberOfEmployees',
-            'Credit_Limit__c',
-            'Account_Balance__c',
-            'Loyalty_Points__c',
-            'Last_Purchase_Date__c',
-            'Active__c',
-            'PersonEmail',
-            'PersonMobilePhone',
-            'PersonHomePhone',
-            'FirstName',
-            'LastName'
-        ]
-        
         try:
-            with open(input_file, 'r', encoding='utf-8') as infile, \
-                 open(output_file, 'w', newline='', encoding='utf-8') as outfile:
+            with self._output_writer(output_file, ACCOUNT_FIELDS, 'Account') as writer:
                 
-                reader = csv.DictReader(infile)
-                writer = csv.DictWriter(outfile, fieldnames=fieldnames)
                 writer.writeheader()
+                # Once per run, ahead of the first shard's customers
+                if WALK_IN_CUSTOMER['CustomerID'] and _is_first_shard(input_file, shard):
+                    writer.writer.writerow(ACCOUNT_PLAN.row_function(self)(WALK_IN_CUSTOMER))
                 
-                for row in reader:
-                    try:
-                        # Determine if business or person account
-                        is_person = not row.get('CompanyName') or row.get('CompanyName').strip() == ''
-                        
-                        # Build account name
-                        if is_person:
-                            fname = (row.get('FirstName') or '').strip()
-                            lname = (row.get('LastName') or '').strip()
-                            name = f"{fname} {lname}".strip()
-                            if not name:
-                                name = f"Customer {row.get('CustomerID', 'Unknown')}"
-                        else:
-                            name = row.get('CompanyName', '').strip()
-                        
-                        # Transform record
-                        transformed = {
-                            'RecordType.DeveloperName': 'PersonAccount' if is_person else 'Business_Account',
-                            'Aralco_Customer_ID__c': row.get('CustomerID', ''),
-                            'AccountNumber': row.get('CustomerNo', ''),
-                            'Name': name[:255],  # Salesforce limit
-                            'Phone': self.clean_phone(row.get('Phone', '')),
-                            'Fax': self.clean_phone(row.get('Fax', '')),
-                            'Website': '',
-                            'BillingStreet': row.get('Address1', ''),
-                            'BillingCity': row.get('City', ''),
-                            'BillingState': row.get('ProvinceState', ''),
-                            'BillingPostalCode': row.get('PostalCode', ''),
-                            'BillingCountry': row.get('Country', 'Canada'),
-                            'ShippingStreet': row.get('Address1', ''),
-                            'ShippingCity': row.get('City', ''),
-                            'ShippingState': row.get('ProvinceState', ''),
-                            'ShippingPostalCode': row.get('PostalCode', ''),
-                            'ShippingCountry': row.get('Country', 'Canada'),
-                            'Description': row.get('Remark', ''),
-                            'Industry': '',
-                            'AnnualRevenue': '',
-                            'NumberOfEmployees': '',
-                            'Credit_Limit__c': self.clean_currency(row.get('CreditLimit', 0)),
-                            'Account_Balance__c': self.clean_currency(row.get('AccountBalance', 0)),
-                            'Loyalty_Points__c': row.get('Points', '0'),
-                            'Last_Purchase_Date__c': self.transform_date(row.get('LastPurchase', '')),
-                            'Active__c': 'true',  # Assuming all exported are active
-                            'PersonEmail': self.clean_email(row.get('Email', '')) if is_person else '',
-                            'PersonMobilePhone': self.clean_phone(row.get('Cellular', '')) if is_person else '',
-                            'PersonHomePhone': self.clean_phone(row.get('Phone', '')) if is_person else '',
-                            'FirstName': row.get('FirstName', '') if is_person else '',
-                            'LastName': row.get('LastName', '') if is_person else ''
-                        }
-                        
-                        writer.writerow(transformed)
-                        self.stats['accounts_processed'] += 1
-                        
-                    except Exception as e:
-                        self.errors.append(f"Account {row.get('CustomerID', 'Unknown')}: {str(e)}")
-                        self.stats['errors'] += 1
+                if batch:
+                    for chunk in rows if rows is not None else read_column_batches(input_file, batch_size, shard):
+                        if isinstance(chunk, list):
+                            self._write_accounts(writer, None, chunk)
+                            continue
+                        columns = [c.tolist() for c in ACCOUNT_PLAN.columns(self, chunk)]
+                        writer.writer.writerows(zip(*columns))
+                        self.stats['accounts_processed'] += len(chunk)
+                else:
+                    with open_staging_rows(input_file, shard, rows) as (header, source):
+                        self._write_accounts(writer, header, source)
             
             print(f"✅ Transformed {self.stats['accounts_processed']} accounts")
+            return True
             
         except Exception as e:
             print(f"❌ Error transforming accounts: {e}")
+            return False
+    
+    def _write_accounts(self, writer, header, rows):
+        """Row-by-row Account transform"""
+        account = ACCOUNT_PLAN.row_function(self, header)
+        customer_id = _column_getter(header, 'CustomerID', 'Unknown')
+        for row in rows:
+            try:
+                writer.writer.writerow(account(row))
+                self.stats['accounts_processed'] += 1
+                
+            except Exception as e:
+                self.errors.append(f"Account {customer_id(row)}: {str(e)}", {'Account': customer_id(row)})
+                self.stats['errors'] += 1
+    
+    def _product_columns(self, frame):
+        """Build Product2 and PricebookEntry output columns for a chunk.
+
+        Returns the product columns (PRODUCT_FIELDS order) and the pricebook
+        columns (PRICEBOOK_FIELDS order). Every product gets a standard
+        PricebookEntry, at 0.00 without a SellPrice, so its line items load.
+        """
+        return PRODUCT_PLAN.columns(self, frame), PRICEBOOK_PLAN.columns(self, frame)
     
-    def transform_products(self, input_file='exports/analysis/product_sample.csv'):
-        """Transform product data to Salesforce Product2 format"""
+    @_instrumented
+    def transform_products(self, input_file='exports/analysis/product_sample.csv',
+                           output_file=PRODUCTS_OUTPUT, pricebook_file=PRICEBOOK_OUTPUT,
+                           batch=False, batch_size=BATCH_SIZE, shard=None, rows=None):
+        """Transform product data to Salesforce Product2 format.
+
+        With ``batch=True`` whole column chunks are transformed at once with
+        pandas; the output is byte-identical to the row-by-row path.
+        ``rows`` replaces reading ``input_file`` as in ``transform_accounts``.
+        """
         print("🔄 Transforming Product data...")
         
-        output_file = 'exports/salesforce_ready/products/products_import.csv'
-        pricebook_file = 'exports/salesforce_ready/products/pricebook_entries.csv'
-        
-        # Product fields
-        product_fields = [
-            'Aralco_Product_ID__c',
-            'ProductCode',
-            'Name',
-            'Description',
-            'Family',
-            'IsActive',
-            'Product_Category_2__c',
-            'Product_Category_3__c',
-            'Department__c',
-            'Cost__c',
-            'Quantity_On_Hand__c',
-            'Brand__c',
-            'UPC__c',
-            'Weight__c',
-            'Taxable__c',
-            'Discountable__c'
-        ]
-        
-        # PricebookEntry fields
-        pricebook_fields = [
-            'Product2.Aralco_Product_ID__c',
-            'Pricebook2.Name',
-            'UnitPrice',
-            'IsActive',
-            'UseStandardPrice'
-        ]
-        
         try:
-            with open(input_file, 'r', encoding='utf-8') as infile, \
-                 open(output_file, 'w', newline='', encoding='utf-8') as prod_out, \
-                 open(pricebook_file, 'w', newline='', encoding='utf-8') as price_out:
-                
-                reader = csv.DictReader(infile)
-                prod_writer = csv.DictWriter(prod_out, fieldnames=product_fields)
-                price_writer = csv.DictWriter(price_out, fieldnames=pricebook_fields)
+            with self._output_writer(output_file, PRODUCT_FIELDS, 'Product2') as prod_writer, \
+                 self._output_writer(pricebook_file, PRICEBOOK_FIELDS, 'PricebookEntry') as price_writer:
                 
                 prod_writer.writeheader()
                 price_writer.writeheader()
                 
-                for row in reader:
+                if batch:
+                    for chunk in rows if rows is not None else read_column_batches(input_file, batch_size, shard):
+                        if isinstance(chunk, list):
+                            self._write_products(prod_writer, price_writer, None, chunk)
+                            continue
+                        products, prices = self._product_columns(chunk)
+                        rejected = prod_writer.writer.writerows(zip(*[c.tolist() for c in products]))
+                        price_rows = list(zip(*[c.tolist() for c in prices]))
+                        if rejected:
+                            # No PricebookEntry for a rejected product
+                            self.errors.add_failed('PricebookEntry', (price_rows[n][PRICEBOOK_ID_POSITION] for n in rejected))
+                            price_rows = [row for n, row in enumerate(price_rows) if n not in rejected]
+                        price_writer.writer.writerows(price_rows)
+                        self.stats['products_processed'] += len(chunk)
+                else:
+                    with open_staging_rows(input_file, shard, rows) as (header, source):
+                        self._write_products(prod_writer, price_writer, header, source)
+            
+            print(f"✅ Transformed {self.stats['products_processed']} products")
+            return True
+            
+        except Exception as e:
+            print(f"❌ Error transforming products: {e}")
+            return False
+    
+    def _write_products(self, prod_writer, price_writer, header, rows):
+        """Row-by-row Product2/PricebookEntry transform"""
+        product = PRODUCT_PLAN.row_function(self, header)
+        price_entry = PRICEBOOK_PLAN.row_function(self, header)
+        product_id = _column_getter(header, 'ProductID', 'Unknown')
+        for row in rows:
+            try:
+                # Every product gets a PricebookEntry (0.00 without a SellPrice),
+                # so its line items load
+                entry = price_entry(row)
+                if prod_writer.writer.writerow(product(row)) is not False:
+                    price_writer.writer.writerow(entry)
+                else:
+                    self.errors.add_failed('PricebookEntry', [entry[PRICEBOOK_ID_POSITION]])
+                
+                self.stats['products_processed'] += 1
+                
+            except Exception as e:
+                self.errors.append(f"Product {product_id(row)}: {str(e)}",
+                                   {'Product2': product_id(row), 'PricebookEntry': f"{product_id(row)}-STD"})
+                self.stats['errors'] += 1
+    
+    @_instrumented
+    def transform_orders(self, header_file, item_file, output_file=ORDERS_OUTPUT,
+                         items_file=ORDER_ITEMS_OUTPUT, shards=(None, None), header_rows=None, item_rows=None):
+        """Transform POSTransHead/POSTransItem to Salesforce Order/OrderItem.
+
+        Both inputs must be sorted by POSTransHeadID, as the --extract
+        staging files are. Line items are merge-joined to their header while
+        both files stream, so memory stays flat however much history there
+        is. Items without a header are reported as errors and skipped.
+        ``shards`` is a ``(header shard, item shard)`` pair from
+        ``plan_order_chunks``; ``header_rows``/``item_rows`` replace reading
+        the files (see pipeline.py).
+        """
+        print("🔄 Transforming Order data...")
+        
+        try:
+            with self._output_writer(output_file, ORDER_FIELDS, 'Order') as order_writer, \
+                 self._output_writer(items_file, ORDER_ITEM_FIELDS, 'OrderItem') as item_writer:
+                
+                order_writer.writeheader()
+                item_writer.writeheader()
+                
+                header_shard, item_shard = shards
+                if item_rows is None:
+                    item_rows = read_staging_rows(item_file, shard=item_shard)
+                if header_rows is None:
+                    header_rows = read_staging_rows(header_file, shard=header_shard)
+                order = ORDER_PLAN.row_function(self)
+                order_item = ORDER_ITEM_PLAN.row_function(self)
+                parents = [(i, column.split('.', 1)[0]) for i, column in enumerate(ORDER_ITEM_FIELDS)
+                           if column.split('.', 1)[0] in REJECTED_PARENTS['OrderItem']]
+                items = _sorted_by_head(item_rows, item_file)
+                item = next(items, None)
+                for header in _sorted_by_head(header_rows, header_file):
+                    head_key = _join_key(header.get('POSTransHeadID', ''))
+                    
+                    # Items sorting before this header have no header at all
+                    while item is not None and _join_key(item.get('POSTransHeadID', '')) < head_key:
+                        self._orphan_item(item)
+                        item = next(items, None)
+                    
                     try:
-                        # Transform product
-                        product = {
-                            'Aralco_Product_ID__c': row.get('ProductID', ''),
-                            'ProductCode': row.get('Code', ''),
-                            'Name': (row.get('Description', '') or row.get('Code', 'Unknown'))[:255],
-                            'Description': row.get('ShortDescription', ''),
-                            'Family': row.get('Category1', ''),
-                            'IsActive': 'true' if row.get('Status') == 'A' else 'false',
-                            'Product_Category_2__c': row.get('Category2', ''),
-                            'Product_Category_3__c': row.get('Category3', ''),
-                            'Department__c': row.get('Department', ''),
-                            'Cost__c': self.clean_currency(row.get('Cost', 0)),
-                            'Quantity_On_Hand__c': row.get('OnHand', '0'),
-                            'Brand__c': row.get('Brand', ''),
-                            'UPC__c': row.get('UPC', ''),
-                            'Weight__c': row.get('Weight', ''),
-                            'Taxable__c': 'true',  # Default
-                            'Discountable__c': 'true'  # Default
-                        }
-                        prod_writer.writerow(product)
-                        
-                        # Create pricebook entry
-                        if row.get('SellPrice'):
-                            price_entry = {
-                                'Product2.Aralco_Product_ID__c': row.get('ProductID', ''),
-                                'Pricebook2.Name': 'Standard Price Book',
-                                'UnitPrice': self.clean_currency(row.get('SellPrice', 0)),
-                                'IsActive': 'true' if row.get('Status') == 'A' else 'false',
-                                'UseStandardPrice': 'false'
-                            }
-                            price_writer.writerow(price_entry)
-                        
-                        self.stats['products_processed'] += 1
-                        
+                        # A rejected order's items are reported as orphans
+                        written = order_writer.writer.writerow(order(header)) is not False
+                        self.stats['orders_processed'] += 1
                     except Exception as e:
-                        self.errors.append(f"Product {row.get('ProductID', 'Unknown')}: {str(e)}")
+                        self.errors.append(f"Order {header.get('POSTransHeadID', 'Unknown')}: {str(e)}",
+                                           {'Order': header.get('POSTransHeadID', 'Unknown')})
                         self.stats['errors'] += 1
+                        written = False
+                    
+                    while item is not None and _join_key(item.get('POSTransHeadID', '')) == head_key:
+                        if written:
+                            self._write_order_item(item_writer, order_item, parents, item)
+                        else:
+                            self._orphan_item(item)
+                        item = next(items, None)
+                
+                while item is not None:
+                    self._orphan_item(item)
+                    item = next(items, None)
             
-            print(f"✅ Transformed {self.stats['products_processed']} products")
+            print(f"✅ Transformed {self.stats['orders_processed']} orders, "
+                  f"{self.stats['order_items_processed']} order items")
+            return True
             
         except Exception as e:
-            print(f"❌ Error transforming products: {e}")
+            print(f"❌ Error transforming orders: {e}")
+            return False
+    
+    def _write_order_item(self, writer, order_item, parents, row):
+        """Write one OrderItem, recording failures.
+
+        Order, Product2 and PricebookEntry are referenced by external ID, so
+        nothing has to be looked up on this side. An item whose product or
+        price book entry was kept out of the import files goes to the
+        rejects file instead of failing the load. ``parents`` holds the
+        ``(position, object)`` of those lookup columns.
+        """
+        try:
+            record = order_item(row)
+            missing = [f"{sobject} {record[i]} was rejected or failed to transform"
+                       for i, sobject in parents if record[i] in self.errors.failed.get(sobject, ())]
+            if missing:
+                writer.reject(record, missing)
+                return
+            writer.writer.writerow(record)
+            self.stats['order_items_processed'] += 1
+        except Exception as e:
+            self.errors.append(f"OrderItem {row.get('POSTransItemID', 'Unknown')}: {str(e)}",
+                               {'OrderItem': row.get('POSTransItemID', 'Unknown')})
+            self.stats['errors'] += 1
+    
+    def _orphan_item(self, row):
+        """Record a line item whose Order is missing"""
+        self.errors.append(f"OrderItem {row.get('POSTransItemID', 'Unknown')}: "
+                           f"no transaction header {row.get('POSTransHeadID', '')}",
+                           {'OrderItem': row.get('POSTransItemID', 'Unknown')})
+        self.stats['errors'] += 1
+    
+    @_instrumented
+    def transform_inventory(self, input_file, output_file=INVENTORY_OUTPUT, rollup_file=INVENTORY_ROLLUP_OUTPUT,
+                            shard=None, rows=None):
+        """Transform the Inventory snapshot to Store_Inventory__c plus product rollups.
+
+        The snapshot holds one row per product and store, sorted by
+        ProductID as the --extract staging file is. Each product's rows are
+        grouped in a single pass: every store gets its own record and the
+        product's totals across stores are written to the rollup file as
+        the group ends, so memory stays flat however many products there
+        are. With --changed-only only the quantities that moved since the
+        last snapshot are re-emitted.
+        """
+        print("🔄 Transforming Inventory data...")
+        
+        try:
+            with self._output_writer(output_file, INVENTORY_FIELDS, 'Store_Inventory__c') as writer, \
+                 self._output_writer(rollup_file, INVENTORY_ROLLUP_FIELDS, 'Product2') as rollup_writer, \
+                 open_staging_rows(input_file, shard, rows) as (header, source):
+        
+                writer.writeheader()
+                rollup_writer.writeheader()
+        
+                record = INVENTORY_PLAN.row_function(self, header)
+                product_id = _column_getter(header, 'ProductID', '')
+                store_id = _column_getter(header, 'StoreID', 'Unknown')
+                # Totals come from the source quantities, so a store row that is
+                # rejected or fails to transform still counts towards its product
+                sources = {field: source for field, source, _, _, _ in INVENTORY_PLAN.mappings}
+                quantities = [_column_getter(header, sources[field], '') for field in INVENTORY_QUANTITIES]
+                on_hand = INVENTORY_QUANTITIES.index('Quantity_On_Hand__c')
+                previous = None
+                for key, group in itertools.groupby(source, key=lambda row: _join_key(product_id(row))):
+                    if previous is not None and key <= previous:
+                        raise ValueError(f"{input_file} is not sorted by ProductID ({key[1]} after {previous[1]})")
+                    previous = key
+        
+                    totals = [Decimal(0)] * len(quantities)
+                    in_stock = 0
+                    rollup_id = ''
+                    for row in group:
+                        rollup_id = str(product_id(row))
+                        amounts = [Decimal(self.clean_quantity(quantity(row))) for quantity in quantities]
+                        totals = [total + amount for total, amount in zip(totals, amounts)]
+                        in_stock += amounts[on_hand] > 0
+                        try:
+                            if writer.writer.writerow(record(row)) is not False:
+                                self.stats['inventory_processed'] += 1
+                        except Exception as e:
+                            self.errors.append(f"Store_Inventory__c {product_id(row)}-{store_id(row)}: {str(e)}",
+                                               {'Store_Inventory__c': f"{product_id(row)}-{store_id(row)}"})
+                            self.stats['errors'] += 1
+        
+                    if rollup_id:
+                        rollup_writer.writer.writerow([rollup_id] + [_format_quantity(t) for t in totals]
+                                                      + [str(in_stock)])
+        
+            print(f"✅ Transformed {self.stats['inventory_processed']} store inventory records")
+            return True
+        
+        except Exception as e:
+            print(f"❌ Error transforming inventory: {e}")
+            return False
+    
+    @_instrumented
+    def transform_mapped(self, source, target, input_file, output_file=None, batch=False, batch_size=BATCH_SIZE,
+                         shard=None, rows=None):
+        """Transform a staging table through its mapping plan alone.
+
+        Covers mappings that need no logic beyond the mapping file (a
+        Supplier -> Account vendor load, say): adding the rows with a Rule
+        to DATA_MAPPING_ARALCO_TO_SALESFORCE.csv is enough. Counted as
+        ``<source>_<target>_processed``.
+        """
+        plan = MAPPING_PLANS[(source, target)]
+        output_file = output_file or MAPPED_OUTPUT.format(source=source, target=target)
+        counter = f"{source.lower()}_{target.lower()}_processed"
+        self.stats.setdefault(counter, 0)
+        print(f"🔄 Transforming {source} data to {target}...")
+        
+        try:
+            os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+            with self._output_writer(output_file, plan.fields, target) as writer:
+                
+                writer.writeheader()
+                
+                if batch:
+                    for chunk in rows if rows is not None else read_column_batches(input_file, batch_size, shard):
+                        if isinstance(chunk, list):
+                            self._write_mapped(writer, plan, counter, None, chunk)
+                            continue
+                        writer.writer.writerows(zip(*[c.tolist() for c in plan.columns(self, chunk)]))
+                        self.stats[counter] += len(chunk)
+                else:
+                    with open_staging_rows(input_file, shard, rows) as (header, source_rows):
+                        self._write_mapped(writer, plan, counter, header, source_rows)
+            
+            print(f"✅ Transformed {self.stats[counter]} {source} rows to {target}")
+            return True
+            
+        except Exception as e:
+            print(f"❌ Error transforming {source} to {target}: {e}")
+            return False
+    
+    def _write_mapped(self, writer, plan, counter, header, rows):
+        """Row-by-row transform through a mapping plan"""
+        record = plan.row_function(self, header)
+        # Errors name the row by its first mapped column (the external ID)
+        row_id = _column_getter(header, plan.mappings[0][1], 'Unknown')
+        for row in rows:
+            try:
+                writer.writer.writerow(record(row))
+                self.stats[counter] += 1
+            except Exception as e:
+                self.errors.append(f"{plan.target} {row_id(row)}: {str(e)}")
+                self.stats['errors'] += 1
+    
+    @_instrumented
+    def transform_parallel(self, kind, input_file, workers, batch=False, batch_size=BATCH_SIZE):
+        """Run transform_accounts or transform_products over shards in a process pool.
+
+        Each worker transforms one shard into its own part files; the parts
+        are then concatenated in shard order, so the final files match a
+        single-process run. Worker stats and errors are folded into this
+        transformer in the same order.
+        """
+        print(f"🔄 Transforming {kind} with {workers} workers...")
+        outputs = TRANSFORM_OUTPUTS[kind]
+        try:
+            shards = plan_shards(input_file, workers)
+            tasks = [
+                (kind, input_file, shard, [f"{output}.part{i:03d}" for output in outputs],
+                 batch, batch_size, self._caches['clean_phone'].cache_info().maxsize, self.dimensions,
+                 self.validator)
+                for i, shard in enumerate(shards)
+            ]
+            
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(_transform_shard, tasks))
+            
+            for i, output in enumerate(outputs):
+                if self._splits(output):
+                    self._roll_parts([task[3][i] for task in tasks], output)
+                else:
+                    _merge_parts([task[3][i] for task in tasks], output)
+                if self.validator:
+                    _merge_parts([rejects_file(task[3][i]) for task in tasks], rejects_file(output))
+        except Exception as e:
+            print(f"❌ Error transforming {kind}: {e}")
+            return
+        
+        for stats, errors, cache_stats in results:
+            self.merge_results(stats, errors, cache_stats)
+        
+        print(f"✅ Merged {len(shards)} {kind} shard(s)")
+    
+    def _roll_parts(self, part_files, output_file):
+        """Roll the rows of worker part files, in order, into --split parts, then remove them"""
+        with self._rolled(output_file, _read_header(part_files[0])) as writer:
+            for part_file in part_files:
+                with open(part_file, 'r', newline='', encoding='utf-8') as part:
+                    reader = csv.reader(part)
+                    next(reader)
+                    writer.writerows(reader)
+                os.remove(part_file)
+    
+    def merge_results(self, stats, errors, cache_stats):
+        """Fold the stats, errors and cache counters of another transformer into this one"""
+        for key, value in stats.items():
+            self.stats[key] = self.stats.get(key, 0) + value
+        self.errors.extend(errors)
+        for name, counters in cache_stats.items():
+            if name in self._caches:
+                merged = self._worker_cache_stats.setdefault(name, {'hits': 0, 'misses': 0})
+                merged['hits'] += counters['hits']
+                merged['misses'] += counters['misses']
+    
+    def run_checkpointed(self, checkpoint, name, plan, outputs, transform):
+        """Run ``transform(shard, part_outputs)`` chunk by chunk, committing after each.
+
+        Each chunk is written to part files, appended to the outputs and
+        synced, then recorded in the manifest together with the stats and
+        the size of the error side file. A rerun truncates the outputs back
+        to the last commit and continues with the next chunk. Returns False
+        when a chunk fails.
+        """
+        stage = checkpoint.stage(name)
+        if stage['complete']:
+            print(f"✅ {name} already committed, skipping")
+            return True
+        if stage['chunks'] is None:
+            stage['chunks'] = plan()
+        chunks = stage['chunks']
+        if stage['committed']:
+            for output_file, size in stage['outputs'].items():
+                os.truncate(output_file, size)
+            print(f"🔄 Resuming {name} at chunk {stage['committed'] + 1} of {len(chunks)}")
+        
+        parts = [f"{output}.chunk" for output in outputs]
+        appended = list(zip(parts, outputs))
+        appended += [(rejects_file(part), rejects_file(output)) for part, output in zip(parts, outputs)
+                     if self.validator or CHANGE_TRACKED_OUTPUTS[output][0] in REJECTED_PARENTS]
+        for index in range(stage['committed'], len(chunks)):
+            if not transform(chunks[index], parts):
+                print(f"❌ {name} failed in chunk {index + 1} of {len(chunks)}; rerun with --checkpoint to resume")
+                return False
+            for part, output in appended:
+                _append_part(part, output, first=index == 0)
+            stage['committed'] = index + 1
+            stage['outputs'] = {output: os.path.getsize(output) for _, output in appended}
+            checkpoint.commit(self.stats, self.errors.sync())
+        
+        stage['complete'] = True
+        checkpoint.commit(self.stats, self.errors.sync())
+        print(f"✅ {name}: {len(chunks)} chunk(s) committed")
+        return True
+    
+    @_instrumented
+    def resolve_references(self, output_files, index_file=XREF_INDEX_FILE):
+        """Replace external-ID lookup columns with direct Salesforce Ids.
+
+        A column such as ``Product2.Aralco_Product_ID__c`` becomes
+        ``Product2Id``, filled from the cross-reference index built from the
+        parent loads. Rows referencing a parent that is not in the index are
+        moved to ``<output>_orphans.csv`` instead of failing in Salesforce;
+        like rejected rows, they are kept out of the --changed-only deletes.
+        """
+        print("🔄 Resolving parent references to Salesforce Ids...")
+        index = XrefIndex(index_file)
+        try:
+            for output_file in output_files:
+                if os.path.exists(output_file):
+                    self._resolve_file(index, output_file)
+        except Exception as e:
+            print(f"❌ Error resolving references: {e}")
+        finally:
+            index.close()
+    
+    def _resolve_file(self, index, output_file):
+        """Rewrite one import file with resolved parent Ids"""
+        stem, ext = os.path.splitext(output_file)
+        orphan_file = f"{stem}_orphans{ext}"
+        resolved = orphans = 0
+        header = _read_header(output_file)
+        # Only Aralco_* external IDs are indexed (not e.g. Pricebook2.Name)
+        lookups = [(i, column.split('.', 1)[0]) for i, column in enumerate(header)
+                   if '.' in column and column.split('.', 1)[1].startswith('Aralco_')]
+        new_header = list(header)
+        for i, sobject in lookups:
+            new_header[i] = f"{sobject}Id"
+        # Orphans are still in the source, so --changed-only must not delete them
+        tracked, id_field = CHANGE_TRACKED_OUTPUTS.get(output_file, (None, None))
+        position = header.index(id_field) if id_field in header else None
+        
+        with self._rewrite(output_file, new_header) as writer, \
+             open(output_file, 'r', newline='', encoding='utf-8') as infile, \
+             open(orphan_file, 'w', newline='', encoding='utf-8') as orphan_out:
+            reader = csv.reader(infile)
+            next(reader)
+            orphan_writer = csv.writer(orphan_out)
+            orphan_writer.writerow(header + ['ERROR'])
+            
+            while True:
+                rows = list(itertools.islice(reader, BATCH_SIZE))
+                if not rows:
+                    break
+                ids = {}
+                for i, sobject in lookups:
+                    ids[i] = index.lookup_many(sobject, {row[i] for row in rows if row[i]})
+                for row in rows:
+                    missing = [header[i] for i, _ in lookups if row[i] and row[i] not in ids[i]]
+                    if missing:
+                        orphan_writer.writerow(row + [f"No Salesforce Id for {', '.join(missing)}"])
+                        self.errors.append(f"{os.path.basename(output_file)} {row[0]}: missing parent {', '.join(missing)}",
+                                           {tracked: row[position]} if position is not None else None)
+                        orphans += 1
+                        continue
+                    for i, _ in lookups:
+                        if row[i]:
+                            row[i] = ids[i][row[i]]
+                    writer.writerow(row)
+                    resolved += 1
+        self.stats['orphans'] += orphans
+        print(f"✅ {os.path.basename(output_file)}: {resolved} resolved, {orphans} orphan(s)")
+        if orphans:
+            print(f"⚠️  Orphaned records written to {orphan_file}")
+    
+    @_instrumented
+    def write_changed_only(self, output_files, index_file=HASH_INDEX_FILE, track_deletes=True):
+        """Cut the import files down to new or changed records.
+
+        Every output row is hashed (together with the header, so a layout
+        change rewrites everything) and compared with the hash stored for
+        its external ID by the last successful load. Unchanged rows are
+        dropped; the hashes of the rest are staged until ``commit_loaded``
+        sees them in a success file. With ``track_deletes`` the IDs that
+        disappeared since the previous run are written to
+        ``<output>_deletes.csv``; pass False for partial (delta) inputs,
+        where absent IDs are not deletions. Records held back by a
+        transform error or rejected by validation are still in the source,
+        so they are never deletions. SNAPSHOT_OUTPUTS always track deletes;
+        ZEROED_OUTPUTS zero their missing records instead.
+        """
+        print("🔄 Filtering unchanged records...")
+        index = HashIndex(index_file)
+        try:
+            for output_file in output_files:
+                if not os.path.exists(output_file):
+                    continue
+                sobject, id_field = CHANGE_TRACKED_OUTPUTS[output_file]
+                index.clear_pending(sobject)
+                held_back = index.mark_seen(sobject, self.errors.failed.get(sobject, ()))
+                kept, total, zeroed = self._filter_unchanged(index, sobject, id_field, output_file,
+                                                             output_file in ZEROED_OUTPUTS)
+                self.stats['unchanged_skipped'] += total - kept
+                print(f"✅ {sobject}: {kept} new or changed of {total}")
+                if held_back:
+                    print(f"⚠️  {sobject}: {held_back} known record(s) held back by errors, kept in the index")
+                
+                if output_file in ZEROED_OUTPUTS:
+                    if zeroed:
+                        print(f"⚠️  {sobject}: {zeroed} record(s) no longer in the source, zeroed")
+                elif track_deletes or output_file in SNAPSHOT_OUTPUTS:
+                    missing = index.pop_missing(sobject)
+                    with open(deletes_file(output_file), 'w', newline='', encoding='utf-8') as f:
+                        writer = csv.writer(f)
+                        writer.writerow([id_field])
+                        writer.writerows([external_id] for external_id in missing)
+                    if missing:
+                        print(f"⚠️  {sobject}: {len(missing)} record(s) no longer in the source")
+                index.commit()
+        except Exception as e:
+            print(f"❌ Error filtering unchanged records: {e}")
+        finally:
+            index.close()
+    
+    def _filter_unchanged(self, index, sobject, id_field, output_file, zero_missing=False):
+        """Rewrite one import file with only its new or changed rows; with
+        ``zero_missing``, add a zeroed row for each ID that left the source,
+        once. Returns the rows kept and read and the zeroed count."""
+        kept = total = 0
+        header = _read_header(output_file)
+        position = header.index(id_field)
+        layout = _layout_hash(header)
+        with self._rewrite(output_file, header) as writer, \
+             open(output_file, 'r', newline='', encoding='utf-8') as infile:
+            reader = csv.reader(infile)
+            next(reader)
+            while True:
+                rows = list(itertools.islice(reader, BATCH_SIZE))
+                if not rows:
+                    break
+                hashed = [(row[position], _row_hash(layout, row), row) for row in rows]
+                changed = index.record_changes(sobject, hashed)
+                writer.writerows(row for _, _, row in changed)
+                kept += len(changed)
+                total += len(rows)
+            
+            zeroed = []
+            if zero_missing:
+                for external_id in index.missing(sobject):
+                    row = ['0'] * len(header)
+                    row[position] = external_id
+                    zeroed.append((external_id, _row_hash(layout, row), row))
+                # Already zeroed by an earlier run when the stored hash matches
+                zeroed = index.record_changes(sobject, zeroed)
+                writer.writerows(row for _, _, row in zeroed)
+        return kept, total, len(zeroed)
+    
+    @_instrumented
+    def split_outputs(self, output_files, max_rows=PART_MAX_ROWS, max_bytes=PART_MAX_BYTES, compress=False):
+        """Replace the import files with size-limited parts and a manifest (see
+        output_writer.py). Only for files not rolled into parts as they were
+        written, i.e. the outputs assembled from --checkpoint chunks."""
+        print("🔄 Splitting import files into parts...")
+        try:
+            for output_file in output_files:
+                if not os.path.exists(output_file):
+                    continue
+                manifest = split_file(output_file, max_rows, max_bytes, compress)
+                print(f"✅ {manifest['source']}: {manifest['rows']} rows in {len(manifest['parts'])} part(s)")
+        except Exception as e:
+            print(f"❌ Error splitting import files: {e}")
     
     def generate_summary(self):
         """Generate transformation summary"""
         summary = {
             'transformation_date': datetime.now().isoformat(),
             'statistics': self.stats,
+            'normalizer_cache': self.cache_stats(),
             'errors': self.errors[:100]  # First 100 errors
         }
         
@@ -320,23 +1780,262 @@ class DataTransformer:
         print(f"  - Accounts processed: {self.stats['accounts_processed']}")
         print(f"  - Products processed: {self.stats['products_processed']}")
         print(f"  - Orders processed: {self.stats['orders_processed']}")
+        print(f"  - Order items processed: {self.stats['order_items_processed']}")
+        print(f"  - Inventory records processed: {self.stats['inventory_processed']}")
+        print(f"  - Unchanged records skipped: {self.stats['unchanged_skipped']}")
+        print(f"  - Duplicate accounts merged: {self.stats['accounts_merged']}")
+        print(f"  - Orphaned records: {self.stats['orphans']}")
+        print(f"  - Rejected by field validation: {self.stats['rejected']}")
         print(f"  - Errors encountered: {self.stats['errors']}")
 
+# Output files written by each transform, in transform argument order
+TRANSFORM_OUTPUTS = {
+    'accounts': [ACCOUNTS_OUTPUT],
+    'products': [PRODUCTS_OUTPUT, PRICEBOOK_OUTPUT]
+}
+
+def _transform_shard(task):
+    """Process-pool worker: transform one shard into part files"""
+    kind, input_file, shard, outputs, batch, batch_size, cache_size, dimensions, validator = task
+    transformer = DataTransformer(cache_size)
+    transformer.dimensions = dimensions
+    transformer.validator = validator
+    if kind == 'accounts':
+        transformer.transform_accounts(input_file, *outputs, batch=batch, batch_size=batch_size, shard=shard)
+    else:
+        transformer.transform_products(input_file, *outputs, batch=batch, batch_size=batch_size, shard=shard)
+    return transformer.stats, transformer.errors, transformer.cache_stats()
+
+def _merge_parts(part_files, output_file):
+    """Concatenate part files under the first part's header, then remove them"""
+    with open(output_file, 'wb') as out:
+        for i, part_file in enumerate(part_files):
+            with open(part_file, 'rb') as part:
+                if i > 0:
+                    part.readline()  # header
+                shutil.copyfileobj(part, out, 1024 * 1024)
+            os.remove(part_file)
+
+def _read_header(path):
+    """Header row of a CSV file"""
+    with open(path, 'r', newline='', encoding='utf-8') as f:
+        return next(csv.reader(f))
+
+def _read_json(path):
+    """Load a JSON file, or {} when it does not exist"""
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Transform Aralco exports into Salesforce import files")
+    parser.add_argument('--input-dir',
+                        help="read full extraction staging files (e.g. exports/extract) "
+                             "instead of the analysis samples")
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv',
+                        help="staging format to read from --input-dir (falls back to CSV)")
+    parser.add_argument('--batch', action='store_true',
+                        help="transform column chunks with pandas instead of row by row")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                        help="rows per column chunk in --batch mode")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="transform shards of each input in this many processes")
+    parser.add_argument('--cache-size', type=int, default=NORMALIZER_CACHE_SIZE,
+                        help="entries per normalizer memo cache (0 disables caching)")
+    parser.add_argument('--dedupe', action='store_true',
+                        help="merge duplicate customers before the Account transform and point "
+                             "their orders at the surviving account")
+    parser.add_argument('--dimensions', default=DIMENSION_CACHE_FILE,
+                        help="dimension cache resolving store, employee, supplier and category codes to names "
+                             "(written by analyze_database.py --extract or dimension_cache.py)")
+    parser.add_argument('--validate', action='store_true',
+                        help=f"check every row against the field metadata in {METADATA_DIR} and write "
+                             "failing rows to <file>_rejects.csv instead of the import file")
+    parser.add_argument('--resolve-ids', action='store_true',
+                        help=f"write parent Salesforce Ids from {XREF_INDEX_FILE} instead of external-ID lookups")
+    parser.add_argument('--changed-only', action='store_true',
+                        help=f"write only records new or changed since the last load (hash index in {HASH_INDEX_FILE})")
+    parser.add_argument('--commit-loaded', action='store_true',
+                        help="mark the records in the loader's success files as loaded in the hash index and "
+                             "exit (load_salesforce.py does this itself; use after a Data Loader run)")
+    parser.add_argument('--checkpoint', action='store_true',
+                        help=f"commit output in chunks recorded in {CHECKPOINT_FILE}; "
+                             "rerun after a crash to resume from the last committed chunk")
+    parser.add_argument('--checkpoint-rows', type=int, default=CHECKPOINT_ROWS,
+                        help="input records per committed chunk with --checkpoint")
+    parser.add_argument('--split', action='store_true',
+                        help="replace each import file with <name>_partNNN.csv parts and a <name>_manifest.json "
+                             "of row counts and checksums, for parallel loading")
+    parser.add_argument('--part-rows', type=int, default=PART_MAX_ROWS,
+                        help="rows per part with --split (0: no row limit)")
+    parser.add_argument('--part-mb', type=float, default=PART_MAX_BYTES / (1024 * 1024),
+                        help="largest part with --split, in MB of uncompressed CSV")
+    parser.add_argument('--gzip', action='store_true', help="gzip the --split parts")
+    parser.add_argument('--instrument', action='store_true',
+                        help="also time every normalizer call (adds per-call overhead)")
+    parser.add_argument('--profile', choices=PROFILERS,
+                        help=f"profile the run with cProfile or pyinstrument into {PROFILE_OUTPUT}.*")
+    return parser.parse_args()
+
 def main():
     """Main transformation process"""
+    args = parse_args()
+    if args.commit_loaded:
+        # Lazy import: only this mode needs the loader configuration
+        from load_salesforce import PROCESS_CONF, load_process_conf
+        try:
+            committed = commit_loaded(load_process_conf(PROCESS_CONF))
+            for sobject, count in committed.items():
+                print(f"✅ {sobject}: {count} loaded record(s) committed to {HASH_INDEX_FILE}")
+            if not committed:
+                print(f"⚠️  No staged records found in the success files or {HASH_INDEX_FILE}")
+        except Exception as e:
+            print(f"❌ Error committing loaded record hashes: {e}")
+        return
+    
+    if args.batch and pd is None:
+        print("⚠️  pandas is not installed, using the row-by-row transform")
+        args.batch = False
+
+    if args.input_dir:
+        customer_file = resolve_input(args.input_dir, 'Customer', args.format)
+        product_file = resolve_input(args.input_dir, 'Product', args.format)
+        header_file = resolve_input(args.input_dir, 'POSTransHead', args.format)
+        item_file = resolve_input(args.input_dir, 'POSTransItem', args.format)
+        inventory_file = resolve_input(args.input_dir, 'Inventory', args.format)
+    else:
+        customer_file = 'exports/analysis/customer_sample.csv'
+        product_file = 'exports/analysis/product_sample.csv'
+        header_file = item_file = inventory_file = None
+
     print("🚀 Starting Aralco to Salesforce Data Transformation...")
     
-    transformer = DataTransformer()
+    instrumentation = Instrumentation(function_timers=args.instrument)
+    transformer = DataTransformer(args.cache_size, instrumentation)
     
-    # Transform each entity type
-    transformer.transform_accounts()
-    transformer.transform_products()
-    # transformer.transform_orders()  # Add when transaction data is available
+    with instrumentation.profile(args.profile, PROFILE_OUTPUT):
+        run_transforms(transformer, args, customer_file, product_file, header_file, item_file, inventory_file)
     
     # Generate summary
     transformer.generate_summary()
+    transformer.errors.close()
+    instrumentation.write(INSTRUMENTATION_OUTPUT)
     
     print("\n✅ Transformation complete! Check exports/salesforce_ready/ for results.")
 
+def run_transforms(transformer, args, customer_file, product_file, header_file, item_file, inventory_file=None):
+    """Run every transform step selected on the command line"""
+    transformer.dimensions = DimensionCache.load(args.dimensions)
+    if transformer.dimensions.dimensions:
+        print(f"✅ Resolving codes with {', '.join(transformer.dimensions.dimensions)} from {args.dimensions}")
+    else:
+        print(f"⚠️  No dimension cache at {args.dimensions}, store, employee and supplier names left blank")
+    
+    if args.validate:
+        transformer.validator = FieldValidator()
+    
+    if args.split:
+        # Each import file rolls into parts in the last pass that writes it
+        rewritten = set(CHANGE_TRACKED_OUTPUTS) if args.changed_only else \
+            set(REFERENCE_OUTPUTS) if args.resolve_ids else set()
+        transformer.split = {'files': set(CHANGE_TRACKED_OUTPUTS) - rewritten, 'max_rows': max(0, args.part_rows),
+                             'max_bytes': int(args.part_mb * 1024 * 1024), 'compress': args.gzip}
+    
+    checkpoint = None
+    if args.checkpoint:
+        settings = {'batch': args.batch, 'batch_size': args.batch_size, 'dedupe': args.dedupe,
+                    'validate': args.validate, 'checkpoint_rows': args.checkpoint_rows,
+                    'dimensions': transformer.dimensions.checksums()}
+        checkpoint = Checkpoint([customer_file, product_file, header_file, item_file, inventory_file], settings)
+        if checkpoint.resumed:
+            transformer.stats.update(checkpoint.manifest['stats'] or {})
+            print(f"🔄 Resuming the interrupted run from {CHECKPOINT_FILE}")
+        if args.workers > 1:
+            print("⚠️  --checkpoint commits chunks in order, transforming in a single process")
+    transformer.errors.stream(ERRORS_OUTPUT, checkpoint.manifest['errors_size'] if checkpoint and checkpoint.resumed else None)
+    
+    if args.dedupe:
+        from dedupe_accounts import MERGE_MAP_FILE, SURVIVORS_FILE, dedupe_customers, load_merge_map
+        with transformer.instrumentation.stage('dedupe_customers') as record:
+            record['rows'] = dedupe_customers(customer_file, transformer=transformer)['customers']
+        customer_file = SURVIVORS_FILE
+        transformer.account_merge_map = load_merge_map(MERGE_MAP_FILE)
+        transformer.stats['accounts_merged'] = len(transformer.account_merge_map)
+    
+    # Transform each entity type
+    has_orders = bool(header_file) and os.path.exists(header_file) and os.path.exists(item_file)
+    has_inventory = bool(inventory_file) and os.path.exists(inventory_file)
+    if checkpoint:
+        committed = transformer.run_checkpointed(
+            checkpoint, 'accounts', lambda: plan_chunks(customer_file, args.checkpoint_rows), [ACCOUNTS_OUTPUT],
+            lambda shard, parts: transformer.transform_accounts(
+                customer_file, *parts, batch=args.batch, batch_size=args.batch_size, shard=shard)
+        ) and transformer.run_checkpointed(
+            checkpoint, 'products', lambda: plan_chunks(product_file, args.checkpoint_rows),
+            [PRODUCTS_OUTPUT, PRICEBOOK_OUTPUT],
+            lambda shard, parts: transformer.transform_products(
+                product_file, *parts, batch=args.batch, batch_size=args.batch_size, shard=shard)
+        ) and (not has_orders or transformer.run_checkpointed(
+            checkpoint, 'orders', lambda: plan_order_chunks(header_file, item_file, args.checkpoint_rows),
+            [ORDERS_OUTPUT, ORDER_ITEMS_OUTPUT],
+            lambda shards, parts: transformer.transform_orders(header_file, item_file, *parts, shards=shards)
+        )) and (not has_inventory or transformer.run_checkpointed(
+            # One chunk, so no product's stores are split across rollup rows
+            checkpoint, 'inventory', lambda: [None], [INVENTORY_OUTPUT, INVENTORY_ROLLUP_OUTPUT],
+            lambda shard, parts: transformer.transform_inventory(inventory_file, *parts)
+        ))
+        if not committed:
+            return
+        checkpoint.clear()
+    elif args.workers > 1:
+        transformer.transform_parallel('accounts', customer_file, args.workers, args.batch, args.batch_size)
+        transformer.transform_parallel('products', product_file, args.workers, args.batch, args.batch_size)
+    else:
+        transformer.transform_accounts(customer_file, batch=args.batch, batch_size=args.batch_size)
+        transformer.transform_products(product_file, batch=args.batch, batch_size=args.batch_size)
+    outputs = [ACCOUNTS_OUTPUT, PRODUCTS_OUTPUT, PRICEBOOK_OUTPUT]
+    if has_orders:
+        if not checkpoint:
+            transformer.transform_orders(header_file, item_file)
+        outputs += [ORDERS_OUTPUT, ORDER_ITEMS_OUTPUT]
+    else:
+        print("⚠️  No POSTransHead/POSTransItem staging files, skipping orders")
+    if has_inventory:
+        if not checkpoint:
+            transformer.transform_inventory(inventory_file)
+        outputs += [INVENTORY_OUTPUT, INVENTORY_ROLLUP_OUTPUT]
+    else:
+        print("⚠️  No Inventory staging file, skipping store inventory")
+
+    # Mappings defined only in the mapping file, for the staging tables present
+    built_in = {(plan.source, plan.target) for plan in
+                (ACCOUNT_PLAN, PRODUCT_PLAN, PRICEBOOK_PLAN, ORDER_PLAN, ORDER_ITEM_PLAN, INVENTORY_PLAN)}
+    for source, target in MAPPING_PLANS:
+        if (source, target) in built_in or not args.input_dir:
+            continue
+        input_file = resolve_input(args.input_dir, source, args.format)
+        if os.path.exists(input_file):
+            transformer.transform_mapped(source, target, input_file, batch=args.batch, batch_size=args.batch_size)
+
+    if args.resolve_ids:
+        if args.split and not args.changed_only:
+            transformer.split['files'] |= set(REFERENCE_OUTPUTS)
+        transformer.resolve_references([f for f in REFERENCE_OUTPUTS if f in outputs])
+    
+    if args.changed_only:
+        if args.split:
+            transformer.split['files'] = set(CHANGE_TRACKED_OUTPUTS)
+        # A delta extraction only holds some IDs, so absent ones are not deletions
+        is_delta = bool(args.input_dir) and 'watermarks' in _read_json(
+            os.path.join(args.input_dir, 'extract_summary.json'))
+        transformer.write_changed_only(outputs, track_deletes=not is_delta)
+    
+    # Outputs assembled from --checkpoint chunks are still whole files
+    if args.split and any(os.path.exists(f) for f in outputs):
+        transformer.split_outputs(outputs, transformer.split['max_rows'], transformer.split['max_bytes'],
+                                  transformer.split['compress'])
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Aralco External ID to Salesforce ID Cross-Reference Index
+Builds an on-disk SQLite index of Aralco_*_ID__c -> Salesforce Id from the load success files
+"""
+
+import argparse
+import csv
+import os
+import sqlite3
+
+# Index location (next to the loader results it is built from)
+XREF_INDEX_FILE = 'results/xref_index.sqlite'
+
+# Rows written per transaction / IDs looked up per query
+XREF_WRITE_BATCH = 50000
+XREF_LOOKUP_BATCH = 500
+
+class XrefIndex:
+    """SQLite-backed map of (object, external ID) to Salesforce Id.
+
+    Lookups go through the table's primary key B-tree, so the index can
+    hold millions of IDs without loading them into memory.
+    """
+
+    def __init__(self, path=XREF_INDEX_FILE):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+        CREATE TABLE IF NOT EXISTS xref (
+            object TEXT NOT NULL,
+            external_id TEXT NOT NULL,
+            sf_id TEXT NOT NULL,
+            PRIMARY KEY (object, external_id)
+        ) WITHOUT ROWID
+        """)
+
+    def add(self, sobject, pairs):
+        """Insert or update ``(external_id, sf_id)`` pairs"""
+        self.conn.executemany("""
+        INSERT INTO xref (object, external_id, sf_id) VALUES (?, ?, ?)
+        ON CONFLICT (object, external_id) DO UPDATE SET sf_id = excluded.sf_id
+        """, ((sobject, external_id, sf_id) for external_id, sf_id in pairs))
+        self.conn.commit()
+
+    def lookup(self, sobject, external_id):
+        """Salesforce Id of one record, or None"""
+        row = self.conn.execute("SELECT sf_id FROM xref WHERE object = ? AND external_id = ?",
+                                (sobject, external_id)).fetchone()
+        return row[0] if row else None
+
+    def lookup_many(self, sobject, external_ids):
+        """Map the known external IDs among ``external_ids`` to their Salesforce Ids"""
+        external_ids = list(external_ids)
+        found = {}
+        for start in range(0, len(external_ids), XREF_LOOKUP_BATCH):
+            batch = external_ids[start:start + XREF_LOOKUP_BATCH]
+            placeholders = ','.join('?' * len(batch))
+            found.update(self.conn.execute(
+                f"SELECT external_id, sf_id FROM xref WHERE object = ? AND external_id IN ({placeholders})",
+                [sobject] + batch))
+        return found
+
+    def counts(self):
+        """Number of indexed records per object"""
+        return dict(self.conn.execute("SELECT object, COUNT(*) FROM xref GROUP BY object"))
+
+    def load_success_file(self, success_file, sobject, id_field):
+        """Index a Data Loader style success file (ID, <fields>, STATUS)"""
+        loaded = 0
+        with open(success_file, 'r', newline='', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if header is None or id_field not in header:
+                return 0
+            id_position, external_position = header.index('ID'), header.index(id_field)
+            batch = []
+            for row in reader:
+                if row[id_position] and row[external_position]:
+                    batch.append((row[external_position], row[id_position]))
+                if len(batch) >= XREF_WRITE_BATCH:
+                    self.add(sobject, batch)
+                    loaded += len(batch)
+                    batch = []
+            self.add(sobject, batch)
+            loaded += len(batch)
+        return loaded
+
+    def close(self):
+        self.conn.close()
+
+def build_from_results(processes, index_file=XREF_INDEX_FILE):
+    """Index the success files of every loader process that has an external ID"""
+    index = XrefIndex(index_file)
+    try:
+        for name, process in processes.items():
+            if not process['external_id'] or not os.path.exists(process['success']):
+                continue
+            loaded = index.load_success_file(process['success'], process['object'], process['external_id'])
+            print(f"✅ Indexed {loaded} {process['object']} IDs from {process['success']}")
+        return index.counts()
+    finally:
+        index.close()
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Build the external ID to Salesforce ID index from load results")
+    parser.add_argument('--config', default='dataloader/process-conf.xml',
+                        help="Data Loader process-conf.xml listing the success files")
+    parser.add_argument('--index', default=XREF_INDEX_FILE)
+    return parser.parse_args()
+
+def main():
+    """Build the cross-reference index"""
+    from load_salesforce import load_process_conf
+
+    args = parse_args()
+    print("🚀 Building external ID cross-reference index...")
+    try:
+        counts = build_from_results(load_process_conf(args.config), args.index)
+    except Exception as e:
+        print(f"❌ Error building index: {e}")
+        return
+
+    print("\n📊 Indexed records:")
+    for sobject, count in sorted(counts.items()):
+        print(f"  - {sobject}: {count}")
+
+if __name__ == "__main__":
+    main()